@@ -1,7 +1,7 @@
 import { spawn } from 'child_process'
 import * as fs from 'fs'
 import * as path from 'path'
-import * as os from 'os'
+import { isFormWorkerEnabled, runFormJob } from './form-worker'
 
 export interface DISC002FormData {
   // Attorney/Party Info (top left block)
@@ -44,19 +44,20 @@ export interface DISC002FormData {
 
 /**
  * Execute a command with proper argument handling (no shell escaping issues)
+ * The input is written to the process's stdin; stdout is returned as raw bytes
  */
-function execCommand(command: string, args: string[], cwd: string): Promise<{ stdout: string; stderr: string }> {
+function execCommand(command: string, args: string[], cwd: string, input: Buffer): Promise<{ stdout: Buffer; stderr: string }> {
   return new Promise((resolve, reject) => {
     const proc = spawn(command, args, {
       cwd,
       stdio: ['pipe', 'pipe', 'pipe']
     })
     
-    let stdout = ''
+    const stdoutChunks: Buffer[] = []
     let stderr = ''
     
-    proc.stdout.on('data', (data) => {
-      stdout += data.toString()
+    proc.stdout.on('data', (data: Buffer) => {
+      stdoutChunks.push(data)
     })
     
     proc.stderr.on('data', (data) => {
@@ -64,19 +65,25 @@ function execCommand(command: string, args: string[], cwd: string): Promise<{ st
     })
     
     proc.on('close', (code) => {
+      clearTimeout(timer)
       if (code === 0) {
-        resolve({ stdout, stderr })
+        resolve({ stdout: Buffer.concat(stdoutChunks), stderr })
       } else {
         reject(new Error(`Process exited with code ${code}: ${stderr}`))
       }
     })
     
     proc.on('error', (err) => {
+      clearTimeout(timer)
       reject(err)
     })
     
+    // Errors writing stdin surface through 'close'/'error' above
+    proc.stdin.on('error', () => {})
+    proc.stdin.end(input)
+    
     // Timeout after 60 seconds
-    setTimeout(() => {
+    const timer = setTimeout(() => {
       proc.kill()
       reject(new Error('Process timed out'))
     }, 60000)
@@ -90,12 +97,6 @@ function execCommand(command: string, args: string[], cwd: string): Promise<{ st
 export async function fillDISC002Form(data: DISC002FormData): Promise<Uint8Array> {
   console.log('Filling official DISC-002 PDF using PyMuPDF...')
   
-  // Create temp files for input JSON and output PDF
-  const tempDir = os.tmpdir()
-  const timestamp = Date.now()
-  const inputJsonPath = path.join(tempDir, `disc002-input-${timestamp}.json`)
-  const outputPdfPath = path.join(tempDir, `disc002-output-${timestamp}.pdf`)
-  
   // Convert TypeScript interface to Python-friendly format
   const pythonData = {
     attorney_name: data.attorneyName,
@@ -121,14 +122,23 @@ export async function fillDISC002Form(data: DISC002FormData): Promise<Uint8Array
     selected_sections: data.selectedSections
   }
   
+  // Prefer the persistent worker; fall back to one Python process per request
+  if (isFormWorkerEnabled()) {
+    try {
+      const reply = await runFormJob('fill_disc002', { data: pythonData })
+      const pdfBuffer = Buffer.from(reply.pdf || '', 'base64')
+      console.log('Generated PDF size:', pdfBuffer.length, 'bytes')
+      return new Uint8Array(pdfBuffer)
+    } catch (error) {
+      console.warn('Form worker fill failed, falling back to spawn:', error)
+    }
+  }
+  
   try {
-    // Write input JSON
-    fs.writeFileSync(inputJsonPath, JSON.stringify(pythonData, null, 2))
-    console.log('Wrote input JSON to:', inputJsonPath)
-    
     // Get the project root directory
     const projectRoot = process.cwd()
-    const pythonScript = path.join(projectRoot, 'scripts', 'fill_disc002.py')
+    // Startup-optimized entry point: runs fill_disc002.py, timing its imports
+    const pythonScript = path.join(projectRoot, 'scripts', 'form_cli.py')
     const venvPython = path.join(projectRoot, '.venv', 'bin', 'python3')
     
     // Check if venv exists, otherwise use system python
@@ -137,43 +147,25 @@ export async function fillDISC002Form(data: DISC002FormData): Promise<Uint8Array
     console.log('Python path:', pythonPath)
     console.log('Script path:', pythonScript)
     
-    // Execute Python script using spawn (handles spaces in paths properly)
+    // Execute Python script using spawn: JSON in on stdin, PDF bytes out on stdout
     const { stdout, stderr } = await execCommand(
       pythonPath,
-      [pythonScript, inputJsonPath, outputPdfPath],
-      projectRoot
+      [pythonScript, 'fill_disc002', '--stdin', '--stdout'],
+      projectRoot,
+      Buffer.from(JSON.stringify(pythonData))
     )
     
-    if (stdout) console.log('Python output:', stdout)
     if (stderr) console.warn('Python stderr:', stderr)
     
-    // Read the output PDF
-    if (!fs.existsSync(outputPdfPath)) {
-      throw new Error('Python script did not create output PDF')
+    if (stdout.length === 0) {
+      throw new Error('Python script did not return a PDF')
     }
     
-    const pdfBuffer = fs.readFileSync(outputPdfPath)
-    console.log('Generated PDF size:', pdfBuffer.length, 'bytes')
+    console.log('Generated PDF size:', stdout.length, 'bytes')
     
-    // Clean up temp files
-    try {
-      fs.unlinkSync(inputJsonPath)
-      fs.unlinkSync(outputPdfPath)
-    } catch {
-      // Ignore cleanup errors
-    }
-    
-    return new Uint8Array(pdfBuffer)
+    return new Uint8Array(stdout)
     
   } catch (error) {
-    // Clean up on error
-    try {
-      if (fs.existsSync(inputJsonPath)) fs.unlinkSync(inputJsonPath)
-      if (fs.existsSync(outputPdfPath)) fs.unlinkSync(outputPdfPath)
-    } catch {
-      // Ignore cleanup errors
-    }
-    
     console.error('Error filling DISC-002:', error)
     throw new Error(`Failed to fill DISC-002: ${error instanceof Error ? error.message : 'Unknown error'}`)
   }
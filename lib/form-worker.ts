@@ -0,0 +1,168 @@
+/**
+ * Persistent Form Worker Client
+ *
+ * Keeps one long-lived `scripts/form_worker.py` process and sends it
+ * DISC-001/DISC-002 fill/read/analyze jobs over a JSON-lines protocol,
+ * so each request skips Python startup and the PyMuPDF import.
+ *
+ * The worker is started lazily on the first job and restarted on the next
+ * job if it exits. It runs as a pre-forked pool (`--workers=`) with
+ * FORM_WORKER_PROCESSES processes (default "auto": one per usable CPU), so
+ * concurrent jobs run in parallel and replies may arrive out of order; set
+ * FORM_WORKER_PROCESSES=1 for a single process. Set FORM_WORKER_DISABLED=1
+ * to make callers fall back to spawning one Python process per request.
+ */
+
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as fs from 'fs';
+import * as path from 'path';
+import * as readline from 'readline';
+
+export type FormWorkerOp =
+  | 'fill_disc001'
+  | 'fill_disc002'
+  | 'read_disc001'
+  | 'read_disc002'
+  | 'read_form'
+  | 'analyze'
+  | 'ping'
+  | 'stats'
+  | 'pool';
+
+/** Per-phase timings and counters reported by a fill or read. */
+export interface FormJobMetrics {
+  total_ms: number;
+  timings_ms: Record<string, number>;
+  counters: Record<string, number>;
+}
+
+export interface FormWorkerReply {
+  id: string | null;
+  ok: boolean;
+  pdf?: string;
+  result?: any;
+  metrics?: FormJobMetrics;
+  error?: string;
+}
+
+interface PendingJob {
+  resolve: (reply: FormWorkerReply) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+// Timeout per job (matches the spawn-per-request path)
+const JOB_TIMEOUT_MS = 60000;
+
+let worker: ChildProcessWithoutNullStreams | null = null;
+let nextJobId = 1;
+const pendingJobs = new Map<string, PendingJob>();
+
+export function isFormWorkerEnabled(): boolean {
+  return process.env.FORM_WORKER_DISABLED !== '1';
+}
+
+function rejectAllPending(error: Error) {
+  for (const [id, job] of pendingJobs) {
+    clearTimeout(job.timer);
+    job.reject(error);
+    pendingJobs.delete(id);
+  }
+}
+
+function startWorker(): ChildProcessWithoutNullStreams {
+  const projectRoot = process.cwd();
+  const pythonScript = path.join(projectRoot, 'scripts', 'form_worker.py');
+  const venvPython = path.join(projectRoot, '.venv', 'bin', 'python3');
+
+  // Check if venv exists, otherwise use system python
+  const pythonPath = fs.existsSync(venvPython) ? venvPython : 'python3';
+
+  const processes = process.env.FORM_WORKER_PROCESSES || 'auto';
+  const args = processes === '1' ? [pythonScript] : [pythonScript, `--workers=${processes}`];
+
+  const proc = spawn(pythonPath, args, {
+    cwd: projectRoot,
+    stdio: ['pipe', 'pipe', 'pipe'],
+  });
+
+  const lines = readline.createInterface({ input: proc.stdout });
+  lines.on('line', (line) => {
+    let reply: FormWorkerReply;
+    try {
+      reply = JSON.parse(line);
+    } catch {
+      console.warn('Form worker wrote a non-protocol line:', line);
+      return;
+    }
+
+    if (reply.id === null) {
+      if (!reply.ok) console.warn('Form worker error:', reply.error);
+      return;
+    }
+
+    const job = pendingJobs.get(reply.id);
+    if (!job) return;
+    clearTimeout(job.timer);
+    pendingJobs.delete(reply.id);
+    job.resolve(reply);
+  });
+
+  proc.stderr.on('data', (data) => {
+    console.log('Form worker stderr:', data.toString());
+  });
+
+  // Writes to a dead worker are reported through 'exit' below
+  proc.stdin.on('error', () => {});
+
+  const onExit = (reason: string) => {
+    if (worker === proc) worker = null;
+    rejectAllPending(new Error(`Form worker ${reason}`));
+  };
+  proc.on('exit', (code) => onExit(`exited with code ${code}`));
+  proc.on('error', (err) => onExit(`failed: ${err.message}`));
+
+  return proc;
+}
+
+/**
+ * Send one job to the persistent worker and wait for its reply.
+ *
+ * @param op - Worker operation
+ * @param payload - Job fields (`data` for fills, base64 `pdf` or a file `path` for reads)
+ * @returns The worker reply; rejects if the worker reports an error
+ */
+export function runFormJob(
+  op: FormWorkerOp,
+  payload: Record<string, unknown> = {}
+): Promise<FormWorkerReply> {
+  if (!worker) {
+    worker = startWorker();
+  }
+  const proc = worker;
+  const id = String(nextJobId++);
+
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      pendingJobs.delete(id);
+      reject(new Error('Form worker job timed out'));
+      // A stuck worker would hold up every later job; replace it (a pool
+      // replaces its own stuck workers after FORM_POOL_JOB_TIMEOUT first)
+      proc.kill();
+    }, JOB_TIMEOUT_MS);
+
+    pendingJobs.set(id, {
+      resolve: (reply) => {
+        if (reply.ok) {
+          resolve(reply);
+        } else {
+          reject(new Error(reply.error || 'Form worker job failed'));
+        }
+      },
+      reject,
+      timer,
+    });
+
+    proc.stdin.write(JSON.stringify({ id, op, ...payload }) + '\n');
+  });
+}
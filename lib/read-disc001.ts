@@ -6,13 +6,16 @@
  * 
  * Uses PyMuPDF via a Python script to read PDF form fields without OCR.
  * 
- * Security: All processing is done in memory with temp files immediately deleted.
+ * Security: All processing is done in memory; the PDF is piped to Python over stdin
+ * and the result read back from stdout, so nothing is written to disk. A PDF
+ * that is already on disk is passed by path and memory-mapped by Python, so it
+ * is never copied into a Buffer.
  */
 
 import { spawn } from 'child_process';
 import * as fs from 'fs';
 import * as path from 'path';
-import * as os from 'os';
+import { isFormWorkerEnabled, runFormJob } from './form-worker';
 
 export interface DISC001ReadResult {
   success: boolean;
@@ -28,11 +31,13 @@ export interface DISC001ReadResult {
 
 /**
  * Execute a command with proper argument handling
+ * The input is written to the process's stdin
  */
 function execCommand(
   command: string,
   args: string[],
-  cwd: string
+  cwd: string,
+  input?: Buffer
 ): Promise<{ stdout: string; stderr: string }> {
   return new Promise((resolve, reject) => {
     const proc = spawn(command, args, {
@@ -52,6 +57,7 @@ function execCommand(
     });
 
     proc.on('close', (code) => {
+      clearTimeout(timer);
       if (code === 0) {
         resolve({ stdout, stderr });
       } else {
@@ -60,40 +66,62 @@ function execCommand(
     });
 
     proc.on('error', (err) => {
+      clearTimeout(timer);
       reject(err);
     });
 
+    // Errors writing stdin surface through 'close'/'error' above
+    proc.stdin.on('error', () => {});
+    proc.stdin.end(input);
+
     // Timeout after 60 seconds
-    setTimeout(() => {
+    const timer = setTimeout(() => {
       proc.kill();
       reject(new Error('Process timed out'));
     }, 60000);
   });
 }
 
+/**
+ * Convert the Python reader's JSON result to the TypeScript shape
+ */
+function fromPythonResult(result: any): DISC001ReadResult {
+  return {
+    success: result.success,
+    selectedInterrogatories: result.selected_interrogatories || [],
+    formData: result.form_data || {},
+    allCheckboxes: result.all_checkboxes || [],
+    error: result.error,
+  };
+}
+
 /**
  * Read a DISC-001 PDF and extract selected interrogatories
  * 
- * @param pdfBuffer - The PDF file as a Buffer
+ * @param pdf - The PDF file as a Buffer, or the path of a PDF file
  * @returns DISC001ReadResult with selected interrogatories
  */
-export async function readDISC001Form(pdfBuffer: Buffer): Promise<DISC001ReadResult> {
+export async function readDISC001Form(pdf: Buffer | string): Promise<DISC001ReadResult> {
   console.log('Reading DISC-001 PDF using PyMuPDF...');
 
-  // Create temp file for input PDF
-  const tempDir = os.tmpdir();
-  const timestamp = Date.now();
-  const inputPdfPath = path.join(tempDir, `disc001-input-${timestamp}.pdf`);
-  const outputJsonPath = path.join(tempDir, `disc001-output-${timestamp}.json`);
+  const pdfPath = typeof pdf === 'string' ? path.resolve(pdf) : null;
 
-  try {
-    // Write input PDF to temp file
-    fs.writeFileSync(inputPdfPath, pdfBuffer);
-    console.log('Wrote input PDF to:', inputPdfPath);
+  // Prefer the persistent worker; fall back to one Python process per request
+  if (isFormWorkerEnabled()) {
+    try {
+      const source = pdfPath ? { path: pdfPath } : { pdf: (pdf as Buffer).toString('base64') };
+      const reply = await runFormJob('read_disc001', source);
+      return fromPythonResult(reply.result);
+    } catch (error) {
+      console.warn('Form worker read failed, falling back to spawn:', error);
+    }
+  }
 
+  try {
     // Get the project root directory
     const projectRoot = process.cwd();
-    const pythonScript = path.join(projectRoot, 'scripts', 'read_disc001.py');
+    // Startup-optimized entry point: runs read_disc001.py, timing its imports
+    const pythonScript = path.join(projectRoot, 'scripts', 'form_cli.py');
     const venvPython = path.join(projectRoot, '.venv', 'bin', 'python3');
 
     // Check if venv exists, otherwise use system python
@@ -102,52 +130,27 @@ export async function readDISC001Form(pdfBuffer: Buffer): Promise<DISC001ReadRes
     console.log('Python path:', pythonPath);
     console.log('Script path:', pythonScript);
 
-    // Execute Python script
-    const { stdout, stderr } = await execCommand(
-      pythonPath,
-      [pythonScript, inputPdfPath, outputJsonPath],
-      projectRoot
-    );
+    // Execute Python script: PDF path as argument (or PDF in on stdin),
+    // compact JSON out on stdout
+    const { stdout, stderr } = pdfPath
+      ? await execCommand(pythonPath, [pythonScript, 'read_disc001', pdfPath, '--stdout'], projectRoot)
+      : await execCommand(pythonPath, [pythonScript, 'read_disc001', '--stdin', '--stdout'], projectRoot, pdf as Buffer);
 
     if (stderr) console.log('Python stderr:', stderr);
 
-    // Read the output JSON
-    if (!fs.existsSync(outputJsonPath)) {
-      throw new Error('Python script did not create output JSON');
+    if (!stdout.trim()) {
+      throw new Error('Python script did not return a result');
     }
 
-    const resultJson = fs.readFileSync(outputJsonPath, 'utf-8');
-    const result = JSON.parse(resultJson);
+    const result = JSON.parse(stdout);
 
     console.log('Read result:', {
       success: result.success,
       selectedCount: result.selected_interrogatories?.length || 0,
     });
 
-    // Clean up temp files
-    try {
-      fs.unlinkSync(inputPdfPath);
-      fs.unlinkSync(outputJsonPath);
-    } catch {
-      // Ignore cleanup errors
-    }
-
-    return {
-      success: result.success,
-      selectedInterrogatories: result.selected_interrogatories || [],
-      formData: result.form_data || {},
-      allCheckboxes: result.all_checkboxes || [],
-      error: result.error,
-    };
+    return fromPythonResult(result);
   } catch (error) {
-    // Clean up on error
-    try {
-      if (fs.existsSync(inputPdfPath)) fs.unlinkSync(inputPdfPath);
-      if (fs.existsSync(outputJsonPath)) fs.unlinkSync(outputJsonPath);
-    } catch {
-      // Ignore cleanup errors
-    }
-
     console.error('Error reading DISC-001:', error);
     return {
       success: false,
@@ -160,9 +163,8 @@ export async function readDISC001Form(pdfBuffer: Buffer): Promise<DISC001ReadRes
 }
 
 /**
- * Read DISC-001 from a file path (for testing)
+ * Read DISC-001 from a file path (memory-mapped by Python, never loaded into a Buffer)
  */
 export async function readDISC001FromFile(filePath: string): Promise<DISC001ReadResult> {
-  const buffer = fs.readFileSync(filePath);
-  return readDISC001Form(buffer);
+  return readDISC001Form(filePath);
 }
@@ -1,91 +1,107 @@
 #!/usr/bin/env python3
 """
 Analyze DISC-002 PDF to discover field names and positions
+
+A thin wrapper over the form-map compiler (form_map.py), which scans the
+widgets and checks the mapping tables for drift; use form_map.py directly
+to compile the map that the fill and read paths load.
 """
 
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
 import json
-from urllib.request import urlopen
 
-DISC002_URL = "https://courts.ca.gov/sites/default/files/courts/default/2024-11/disc002.pdf"
+from form_map import compile_template, find_drift, mapping_tables, scan_widgets
+from template_store import load_template
 
-def analyze_disc002():
-    """Download and analyze the DISC-002 PDF structure"""
-    print(f"Downloading DISC-002 from {DISC002_URL}...")
-    with urlopen(DISC002_URL) as response:
-        pdf_bytes = response.read()
-    
+# PyMuPDF widget type -> name used in the output
+FIELD_TYPE_NAMES = {
+    0: "UNKNOWN",
+    1: "BUTTON",
+    2: "CHECKBOX",
+    3: "RADIOBUTTON",
+    4: "TEXT",
+    5: "LISTBOX",
+    6: "COMBOBOX",
+    7: "SIGNATURE"
+}
+
+
+def analyze_disc002_from_bytes(pdf_bytes: bytes) -> dict:
+    """
+    Analyze a form PDF given as bytes (for in-memory processing).
+
+    Args:
+        pdf_bytes: PDF file content (bytes, or a buffer such as form_io.map_file())
+
+    Returns:
+        Dictionary with total_widgets, checkboxes and text_fields; each
+        widget carries the interrogatory number from its tooltip (or None)
+    """
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     print(f"Loaded PDF with {len(doc)} pages")
     print(f"Page size: {doc[0].rect.width} x {doc[0].rect.height}")
-    
+    widgets = scan_widgets(doc)
+    doc.close()
+
     all_widgets = []
     checkboxes = []
     text_fields = []
-    
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
-        print(f"\n{'='*60}")
-        print(f"PAGE {page_idx + 1}")
-        print(f"{'='*60}")
-        
-        for widget in page.widgets():
-            field_name = widget.field_name or ""
-            field_type = widget.field_type
-            field_type_name = {
-                0: "UNKNOWN",
-                1: "BUTTON",
-                2: "CHECKBOX", 
-                3: "RADIOBUTTON",
-                4: "TEXT",
-                5: "LISTBOX",
-                6: "COMBOBOX",
-                7: "SIGNATURE"
-            }.get(field_type, f"TYPE_{field_type}")
-            
-            rect = widget.rect
-            
-            widget_info = {
-                "page": page_idx + 1,
-                "name": field_name,
-                "type": field_type_name,
-                "type_id": field_type,
-                "rect": {
-                    "x0": round(rect.x0, 1),
-                    "y0": round(rect.y0, 1),
-                    "x1": round(rect.x1, 1),
-                    "y1": round(rect.y1, 1)
-                },
-                "value": widget.field_value
-            }
-            
-            all_widgets.append(widget_info)
-            
-            if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                checkboxes.append(widget_info)
-                print(f"  CHECKBOX: {field_name[:80]}")
-                print(f"    Rect: ({rect.x0:.1f}, {rect.y0:.1f}) to ({rect.x1:.1f}, {rect.y1:.1f})")
-            elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                text_fields.append(widget_info)
-                print(f"  TEXT: {field_name[:80]}")
-                print(f"    Rect: ({rect.x0:.1f}, {rect.y0:.1f}) to ({rect.x1:.1f}, {rect.y1:.1f})")
-    
-    doc.close()
-    
+    current_page = None
+
+    for widget in widgets:
+        if widget["page"] != current_page:
+            current_page = widget["page"]
+            print(f"\n{'='*60}")
+            print(f"PAGE {current_page + 1}")
+            print(f"{'='*60}")
+
+        field_name = widget["name"]
+        field_type = widget["type"]
+        rect = fitz.Rect(widget["rect"])
+
+        widget_info = {
+            "page": current_page + 1,
+            "name": field_name,
+            "type": FIELD_TYPE_NAMES.get(field_type, f"TYPE_{field_type}"),
+            "type_id": field_type,
+            "rect": {
+                "x0": round(rect.x0, 1),
+                "y0": round(rect.y0, 1),
+                "x1": round(rect.x1, 1),
+                "y1": round(rect.y1, 1)
+            },
+            "value": widget["value"],
+            "number": widget["number"]
+        }
+
+        all_widgets.append(widget_info)
+
+        if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+            checkboxes.append(widget_info)
+            print(f"  CHECKBOX: {field_name[:80]}")
+            print(f"    Rect: ({rect.x0:.1f}, {rect.y0:.1f}) to ({rect.x1:.1f}, {rect.y1:.1f})")
+        elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
+            text_fields.append(widget_info)
+            print(f"  TEXT: {field_name[:80]}")
+            print(f"    Rect: ({rect.x0:.1f}, {rect.y0:.1f}) to ({rect.x1:.1f}, {rect.y1:.1f})")
+
     print(f"\n{'='*60}")
     print("SUMMARY")
     print(f"{'='*60}")
     print(f"Total widgets: {len(all_widgets)}")
     print(f"Checkboxes: {len(checkboxes)}")
     print(f"Text fields: {len(text_fields)}")
-    
-    # Output checkbox patterns for easy mapping
+
+    # Output checkbox patterns with the interrogatory number from each tooltip
     print(f"\n{'='*60}")
     print("CHECKBOX FIELD NAMES (for mapping)")
     print(f"{'='*60}")
     for cb in checkboxes:
-        print(f'    "{cb["name"]}": "???",  # Page {cb["page"]}, y={cb["rect"]["y0"]}')
-    
+        print(f'    "{cb["name"]}": "{cb["number"] or "???"}",  # Page {cb["page"]}, y={cb["rect"]["y0"]}')
+
     # Output text field positions
     print(f"\n{'='*60}")
     print("TEXT FIELD POSITIONS (for coordinates)")
@@ -93,19 +109,32 @@ def analyze_disc002():
     for tf in text_fields:
         print(f'    # {tf["name"][:50]}')
         print(f'    # Rect: x0={tf["rect"]["x0"]}, y0={tf["rect"]["y0"]}, x1={tf["rect"]["x1"]}, y1={tf["rect"]["y1"]}')
-    
-    # Save to JSON for reference
-    output = {
+
+    return {
         "total_widgets": len(all_widgets),
         "checkboxes": checkboxes,
         "text_fields": text_fields
     }
-    
+
+
+def analyze_disc002():
+    """Analyze the DISC-002 PDF structure of the local template and report mapping drift"""
+    output = analyze_disc002_from_bytes(load_template("disc002"))
+
+    # Check the fill/read tables against the compiled map
+    tables, text_patterns = mapping_tables("disc002")
+    output["drift"] = find_drift(compile_template("disc002", save=False), tables, text_patterns)
+    print(f"\nMapping drift entries: {len(output['drift'])}")
+    for entry in output["drift"]:
+        print(f"  {entry['kind']}: {entry['number']} {entry['pattern'] or ''} - {entry['detail']}")
+
+    # Save to JSON for reference
     with open("disc002_fields.json", "w") as f:
         json.dump(output, f, indent=2)
     print(f"\nSaved field data to disc002_fields.json")
-    
+
     return output
 
+
 if __name__ == "__main__":
     analyze_disc002()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Batch Filler for DISC-001/DISC-002 Packets
+Fills many forms per invocation from a JSONL job file (one job per line,
+DISC-001 and DISC-002 mixed), reusing the verified templates and widget
+indexes across jobs. Each PDF is written as soon as it is done and one JSON
+result line per job is streamed to stdout in completion order.
+
+Job line:
+    {"id": "smith-001", "form": "disc001", "data": {...},
+     "output": "optional/path.pdf", "profile": "compact", "fill_mode": "deferred",
+     "revision": "2024-11"}
+
+"revision" picks a template revision from the manifest (default: the
+form's current revision).
+
+Result line:
+    {"id": "smith-001", "ok": true, "output": "out/smith-001.pdf",
+     "bytes": 195489, "metrics": {...}}
+    {"id": "smith-002", "ok": false, "error": "..."}
+
+A bad record only fails its own line; the rest of the batch carries on.
+
+    python3 scripts/batch_fill.py jobs.jsonl --output-dir out/ [--workers 4]
+    cat jobs.jsonl | python3 scripts/batch_fill.py - --output-dir out/
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import fill_disc001
+import fill_disc002
+from form_io import claim_stdout, write_json
+from instrumentation import PhaseTimer
+from template_store import open_template
+from widget_index import get_widget_index
+
+# form id -> (fill function, checkbox patterns, text patterns)
+FORMS = {
+    "disc001": (fill_disc001.fill_disc001_to_bytes, fill_disc001.UI_TO_CHECKBOX_FIELD, None),
+    "disc002": (fill_disc002.fill_disc002_to_bytes, fill_disc002.UI_TO_CHECKBOX_FIELD,
+                fill_disc002.TEXT_FIELD_PATTERNS),
+}
+
+# Set per process by _init_worker()
+_output_dir = None
+_default_profile = None
+_default_fill_mode = None
+
+
+def normalize_form_id(form: str) -> str:
+    """Accept "disc001", "DISC-001", "disc-001", ... and return the template id."""
+    form_id = (form or "").lower().replace("-", "").replace("_", "")
+    if form_id not in FORMS:
+        raise ValueError(f"Unknown form {form!r} (expected one of {', '.join(FORMS)})")
+    return form_id
+
+
+def warm_templates():
+    """Load, verify and parse every template and build its widget index once per process."""
+    for form_id, (_fill, checkbox_patterns, text_patterns) in FORMS.items():
+        open_template(form_id).close()
+        get_widget_index(form_id, checkbox_patterns, text_patterns)
+
+
+def _init_worker(output_dir: str, profile: str, fill_mode: str = None):
+    global _output_dir, _default_profile, _default_fill_mode
+    _output_dir = output_dir
+    _default_profile = profile
+    _default_fill_mode = fill_mode
+    warm_templates()
+
+
+def _output_path(job: dict, job_id: str, form_id: str) -> str:
+    if job.get("output"):
+        return job["output"]
+    safe_id = re.sub(r"[^A-Za-z0-9._-]", "_", job_id)
+    return os.path.join(_output_dir, f"{safe_id}-{form_id}.pdf")
+
+
+def run_job(item: tuple) -> dict:
+    """
+    Fill one job and write its PDF.
+
+    Args:
+        item: (line number, raw JSONL line)
+
+    Returns:
+        Result dictionary for the job (never raises)
+    """
+    line_no, line = item
+    job_id = str(line_no)
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("Job must be a JSON object")
+        job_id = str(job.get("id") or line_no)
+        form_id = normalize_form_id(job.get("form"))
+        fill = FORMS[form_id][0]
+
+        metrics = PhaseTimer()
+        pdf_bytes = fill(job.get("data") or {}, job.get("profile") or _default_profile, metrics,
+                         job.get("fill_mode") or _default_fill_mode, job.get("revision"))
+
+        output_path = _output_path(job, job_id, form_id)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, output_path)
+
+        return {
+            "id": job_id,
+            "ok": True,
+            "form": form_id,
+            "output": output_path,
+            "bytes": len(pdf_bytes),
+            "metrics": metrics.as_dict(),
+        }
+    except Exception as e:
+        return {"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def _read_jobs(stream):
+    """Yield (line number, line) for every non-blank line."""
+    for line_no, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_no, line
+
+
+def run_batch(stream, out, output_dir: str, workers: int = 1, profile: str = None,
+              fill_mode: str = None) -> dict:
+    """
+    Fill every job in a JSONL stream and write one result line per job.
+
+    Args:
+        stream: Text stream of JSONL jobs
+        out: Binary stream receiving JSONL results
+        output_dir: Directory for outputs of jobs without an "output" path
+        workers: Worker processes (1 = fill in this process)
+        profile: Default output profile for jobs without one
+        fill_mode: Default fill mode for jobs without one (widget_index.FILL_MODES)
+
+    Returns:
+        Summary with total/ok/failed counts and elapsed seconds
+    """
+    start = time.perf_counter()
+    summary = {"total": 0, "ok": 0, "failed": 0}
+
+    if workers <= 1:
+        _init_worker(output_dir, profile, fill_mode)
+        results = map(run_job, _read_jobs(stream))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(output_dir, profile, fill_mode))
+        results = pool.imap_unordered(run_job, _read_jobs(stream))
+
+    try:
+        for result in results:
+            summary["total"] += 1
+            summary["ok" if result["ok"] else "failed"] += 1
+            write_json(out, result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main():
+    """Main entry point - fill a JSONL batch and stream results to stdout."""
+    parser = argparse.ArgumentParser(description="Fill a JSONL batch of DISC-001/DISC-002 jobs")
+    parser.add_argument("jobs", nargs="?", default="-", help="JSONL job file ('-' for stdin)")
+    parser.add_argument("--output-dir", default="filled", help="Directory for jobs without an output path")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default 1)")
+    parser.add_argument("--profile", default=None, help="Default output profile (none, compact, max)")
+    parser.add_argument("--fill-mode", default=None, help="Default fill mode (widgets, deferred, viewer)")
+    args = parser.parse_args()
+
+    # Keep stdout for result lines; fill progress goes to stderr
+    results_out = claim_stdout()
+
+    if args.jobs == "-":
+        summary = run_batch(sys.stdin, results_out, args.output_dir, args.workers, args.profile, args.fill_mode)
+    else:
+        with open(args.jobs, "r") as f:
+            summary = run_batch(f, results_out, args.output_dir, args.workers, args.profile, args.fill_mode)
+
+    print(f"Batch done: {summary['ok']}/{summary['total']} filled, "
+          f"{summary['failed']} failed in {summary['seconds']}s", file=sys.stderr)
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the DISC-001/DISC-002 Fill and Read Engines
+Runs the fill, read and analyze paths in-process against the shipped
+templates and the test PDFs in the repo root, and writes machine-readable
+JSON so runs can be compared across commits.
+
+For every case it reports p50/p95/mean latency, throughput, peak RSS and a
+per-phase breakdown taken from the metrics each fill/read reports (template
+load, document open, widget scan, mapping, appearance update, save, other).
+The fill and read caches are disabled so every iteration does the full work.
+
+    python3 scripts/benchmark_forms.py [--iterations 20] [--warmup 2]
+                                       [--filter read_] [--output bench.json]
+                                       [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+# Measure the engines, not the caches (must be set before the caches are built)
+os.environ["FORM_FILL_CACHE_ENTRIES"] = "0"
+os.environ["FORM_FILL_CACHE_DIR"] = ""
+os.environ["FORM_READ_CACHE_ENTRIES"] = "0"
+os.environ["FORM_READ_CACHE_DIR"] = ""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+
+import analyze_disc002
+import fill_disc001
+import fill_disc002
+import read_disc001
+import read_disc002
+from instrumentation import PhaseTimer
+from template_store import load_template
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Test PDFs shipped in the repo root (read as DISC-001)
+ROOT_TEST_PDFS = [
+    "test-disc001-pymupdf.pdf",
+    "test-integrated-disc001.pdf",
+    "test-disc001-filled.pdf",
+]
+
+SAMPLE_DATA = {
+    "attorney_name": "John Smith",
+    "bar_number": "123456",
+    "firm_name": "Smith & Associates",
+    "street_address": "123 Main Street, Suite 500",
+    "city": "Los Angeles",
+    "state": "CA",
+    "zip": "90012",
+    "phone": "(213) 555-1234",
+    "fax": "(213) 555-1235",
+    "email": "john@smithlaw.com",
+    "attorney_for": "Plaintiff",
+    "county": "Los Angeles",
+    "plaintiff_name": "Jane Doe",
+    "defendant_name": "ABC Corporation",
+    "case_number": "23STCV12345",
+    "asking_party_name": "Jane Doe",
+    "answering_party_name": "ABC Corporation",
+    "set_number": 1,
+    "employee_name": "Jane Doe",
+    "employer_name": "ABC Corporation",
+}
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Return the RSS high-water mark in MB (since the last reset on Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _fill_data(sections: list) -> dict:
+    return dict(SAMPLE_DATA, selected_sections=sections)
+
+
+def _timed_fill(fill, data: dict, fill_mode: str = None) -> dict:
+    """Run a fill and return its phase timings."""
+    metrics = PhaseTimer()
+    fill(data, metrics=metrics, fill_mode=fill_mode)
+    return metrics.timings
+
+
+def _timed_read(read, pdf_bytes: bytes) -> dict:
+    """Run a read and return its phase timings (in seconds, like PhaseTimer)."""
+    timings = read(pdf_bytes)["metrics"]["timings_ms"]
+    return {phase: ms / 1000 for phase, ms in timings.items()}
+
+
+def _untimed(func, *args):
+    """Run a path that reports no phase timings."""
+    func(*args)
+    return None
+
+
+def build_cases() -> dict:
+    """
+    Build the benchmark cases.
+
+    Returns:
+        Dictionary mapping case name to a zero-argument callable that returns
+        its phase timings in seconds (or None when the path reports none)
+    """
+    disc001_sections = list(fill_disc001.UI_TO_CHECKBOX_FIELD)
+    disc002_sections = list(fill_disc002.UI_TO_CHECKBOX_FIELD)
+
+    cases = {}
+    for count_name, count in (("1", 1), ("10", 10), ("all", None)):
+        data001 = _fill_data(disc001_sections[:count])
+        data002 = _fill_data(disc002_sections[:count])
+        cases[f"fill_disc001_{count_name}"] = lambda d=data001: _timed_fill(fill_disc001.fill_disc001_to_bytes, d)
+        cases[f"fill_disc002_{count_name}"] = lambda d=data002: _timed_fill(fill_disc002.fill_disc002_to_bytes, d)
+    cases["fill_disc001_all_deferred"] = lambda d=data001: _timed_fill(fill_disc001.fill_disc001_to_bytes, d, "deferred")
+    cases["fill_disc002_all_deferred"] = lambda d=data002: _timed_fill(fill_disc002.fill_disc002_to_bytes, d, "deferred")
+
+    filled001 = fill_disc001.fill_disc001_to_bytes(_fill_data(disc001_sections))
+    filled002 = fill_disc002.fill_disc002_to_bytes(_fill_data(disc002_sections))
+    blank001 = load_template("disc001")
+    blank002 = load_template("disc002")
+
+    cases["read_disc001_filled"] = lambda: _timed_read(read_disc001.read_disc001_from_bytes, filled001)
+    cases["read_disc001_blank"] = lambda: _timed_read(read_disc001.read_disc001_from_bytes, blank001)
+    cases["read_disc002_filled"] = lambda: _timed_read(read_disc002.read_disc002_from_bytes, filled002)
+    cases["read_disc002_blank"] = lambda: _timed_read(read_disc002.read_disc002_from_bytes, blank002)
+
+    for name in ROOT_TEST_PDFS:
+        path = os.path.join(REPO_ROOT, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+            case_name = "read_" + os.path.splitext(name)[0].replace("-", "_")
+            cases[case_name] = lambda b=pdf_bytes: _timed_read(read_disc001.read_disc001_from_bytes, b)
+
+    cases["analyze_disc002_blank"] = lambda: _untimed(analyze_disc002.analyze_disc002_from_bytes, blank002)
+    return cases
+
+
+def run_case(func, iterations: int, warmup: int) -> dict:
+    """
+    Time one case.
+
+    Args:
+        func: Zero-argument callable to benchmark (returns phase timings or None)
+        iterations: Timed iterations
+        warmup: Untimed iterations run first
+
+    Returns:
+        Dictionary with latency percentiles (ms), throughput, peak RSS and phases (ms)
+    """
+    for _ in range(warmup):
+        func()
+
+    _reset_peak_rss()
+    latencies = []
+    phase_totals = {}
+    for _ in range(iterations):
+        start = time.perf_counter()
+        timings = func()
+        latencies.append(time.perf_counter() - start)
+        for phase, seconds in (timings or {}).items():
+            phase_totals[phase] = phase_totals.get(phase, 0.0) + seconds
+
+    latencies.sort()
+    total = sum(latencies)
+    phases = {phase: round(seconds / iterations * 1000, 3) for phase, seconds in sorted(phase_totals.items())}
+    phases["other"] = round(max(0.0, total - sum(phase_totals.values())) / iterations * 1000, 3)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(total / iterations * 1000, 3),
+        "min_ms": round(latencies[0] * 1000, 3),
+        "throughput_per_s": round(iterations / total, 2) if total else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "phases_ms": phases,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """
+    Compare p50/p95 latencies with a baseline run.
+
+    Returns:
+        Lines describing the change per case
+    """
+    lines = []
+    for name, result in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            lines.append(f"{name:32} (new)")
+            continue
+        p50 = (result["p50_ms"] / base["p50_ms"] - 1) * 100 if base["p50_ms"] else 0.0
+        p95 = (result["p95_ms"] / base["p95_ms"] - 1) * 100 if base["p95_ms"] else 0.0
+        lines.append(f"{name:32} p50 {base['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms ({p50:+6.1f}%)"
+                     f"  p95 {p95:+6.1f}%")
+    return lines
+
+
+def main():
+    """Main entry point - run the benchmark suite and write JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    args = parser.parse_args()
+
+    # The engines print progress; keep it out of the results
+    results_out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    cases = build_cases()
+    results = {}
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        results[name] = run_case(func, args.iterations, args.warmup)
+        print(f"{name}: p50 {results[name]['p50_ms']} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "cases": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(report, results_out, indent=2)
+        results_out.write("\n")
+        results_out.flush()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Bulk Reader for Served DISC-001/DISC-002 Forms
+Walks directories, .zip archives and .tar(.gz) archives of served PDFs,
+reads every one across a process pool and streams one JSON result line per
+file to stdout in completion order, with progress counters on stderr.
+
+Result line:
+    {"source": "intake/smith.pdf", "ok": true, "form": "disc001",
+     "footer_revision": "January 1, 2024", "selected_interrogatories": [...],
+     "form_data": {...}, "metrics": {...}}
+    {"source": "intake.zip:scan.pdf", "ok": false, "error": "..."}
+
+    python3 scripts/bulk_read.py intake/ backlog.zip [--workers 8]
+                                 [--form auto|disc001|disc002] [--all-checkboxes]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+
+from form_io import claim_stdout, map_file, write_json
+from memory_guard import MemoryGuard
+from read_form import FORM_READERS, read_form
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Print a progress line at most this often (seconds)
+PROGRESS_INTERVAL = 2.0
+
+# Sources handed to the pool per worker and per task
+CHUNK_SIZE = 4
+# Sources handed to the pool ahead of the results consumed, per worker; the
+# pool's feeder thread would otherwise read every archive member into memory
+# before the workers catch up (must stay >= CHUNK_SIZE)
+IN_FLIGHT_PER_WORKER = 8
+
+# Memory guard of this process (created on its first read); keeps the MuPDF
+# store from growing by every scanned page read
+_memory_guard = None
+
+
+def _error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _iter_directory(path: str):
+    # os.walk() reports unreadable directories through onerror and skips them
+    errors = []
+    for root, dirs, files in os.walk(path, onerror=errors.append):
+        while errors:
+            error = errors.pop(0)
+            yield error.filename or root, None, None, _error(error)
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                full_path = os.path.join(root, name)
+                yield full_path, full_path, None, None
+    for error in errors:
+        yield error.filename or path, None, None, _error(error)
+
+
+def _iter_zip(path: str):
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        yield path, None, None, _error(e)
+        return
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            source = f"{path}:{info.filename}"
+            try:
+                pdf_bytes = archive.read(info)
+            except Exception as e:  # bad CRC, truncated or unsupported member
+                yield source, None, None, _error(e)
+                continue
+            yield source, None, pdf_bytes, None
+
+
+def _iter_tar(path: str):
+    try:
+        archive = tarfile.open(path, "r:*")
+    except (OSError, tarfile.TarError) as e:
+        yield path, None, None, _error(e)
+        return
+    with archive:
+        members = iter(archive)
+        while True:
+            try:
+                member = next(members, None)
+            except (OSError, EOFError, tarfile.TarError) as e:
+                # A damaged header ends the archive; what was read so far stands
+                yield path, None, None, _error(e)
+                return
+            if member is None:
+                return
+            if not member.isfile() or not member.name.lower().endswith(".pdf"):
+                continue
+            source = f"{path}:{member.name}"
+            try:
+                pdf_bytes = archive.extractfile(member).read()
+            except (OSError, EOFError, tarfile.TarError) as e:
+                yield source, None, None, _error(e)
+                continue
+            yield source, None, pdf_bytes, None
+
+
+def iter_sources(paths: list):
+    """
+    Yield (source name, path or None, bytes or None, error or None) for every
+    PDF under the inputs.
+
+    Plain files are passed by path so workers read them; archive members are
+    read here and passed as bytes. An archive or directory that cannot be
+    read yields an item with the error instead of ending the run, as does
+    each archive member that cannot be extracted.
+    """
+    for path in paths:
+        lower = path.lower()
+        if os.path.isdir(path):
+            yield from _iter_directory(path)
+        elif lower.endswith(".zip"):
+            yield from _iter_zip(path)
+        elif lower.endswith(TAR_SUFFIXES):
+            yield from _iter_tar(path)
+        else:
+            yield path, path, None, None
+
+
+def read_source(item: tuple, form: str = "auto", all_checkboxes: bool = False) -> dict:
+    """
+    Read one PDF (never raises).
+
+    Args:
+        item: (source name, path or None, bytes or None, error or None) from iter_sources()
+        form: "auto" to detect, or a form id to force the reader
+        all_checkboxes: Keep the per-checkbox dump in the result
+
+    Returns:
+        Result dictionary for the file
+    """
+    source, path, pdf_bytes, error = item
+    if error is not None:
+        return {"source": source, "ok": False, "error": error}
+    try:
+        if pdf_bytes is None:
+            pdf_bytes = map_file(path)
+
+        result = read_form(pdf_bytes=pdf_bytes, form=None if form == "auto" else form,
+                           all_checkboxes=all_checkboxes)
+        ok = result.pop("success")
+        error = result.pop("error")
+        reply = {"source": source, "ok": ok}
+        if error:
+            reply["error"] = error
+        reply.update(result)
+        return reply
+    except Exception as e:
+        return {"source": source, "ok": False, "error": _error(e)}
+
+
+def _read_source_job(args: tuple) -> dict:
+    global _memory_guard
+    if _memory_guard is None:
+        _memory_guard = MemoryGuard()
+    item, form, all_checkboxes = args
+    _memory_guard.start_job()
+    result = read_source(item, form, all_checkboxes)
+    _memory_guard.end_job("read")
+    return result
+
+
+def _throttle(items, slots: threading.Semaphore, stop: threading.Event):
+    """Yield items, each once a slot is free (released as its result is consumed)."""
+    for item in items:
+        slots.acquire()
+        if stop.is_set():
+            return
+        yield item
+
+
+def iter_bulk_read(paths: list, workers: int = None, form: str = "auto", all_checkboxes: bool = False):
+    """
+    Read every PDF under the inputs and yield results in completion order.
+
+    Args:
+        paths: Files, directories, .zip or .tar(.gz) archives
+        workers: Worker processes (default: one per CPU; 1 reads in this process)
+        form: "auto", "disc001" or "disc002"
+        all_checkboxes: Keep the per-checkbox dump in each result
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        yield from map(_read_source_job, ((item, form, all_checkboxes) for item in iter_sources(paths)))
+        return
+
+    slots = threading.Semaphore(workers * IN_FLIGHT_PER_WORKER)
+    stop = threading.Event()
+    jobs = ((item, form, all_checkboxes) for item in _throttle(iter_sources(paths), slots, stop))
+    with multiprocessing.Pool(workers) as pool:
+        try:
+            for result in pool.imap_unordered(_read_source_job, jobs, chunksize=CHUNK_SIZE):
+                slots.release()
+                yield result
+        finally:
+            # Unblock the feeder thread so the pool can shut down
+            stop.set()
+            slots.release()
+
+
+def main():
+    """Main entry point - bulk-read served forms and stream JSONL results."""
+    parser = argparse.ArgumentParser(description="Read directories or archives of DISC-001/DISC-002 PDFs")
+    parser.add_argument("paths", nargs="+", help="PDF files, directories, .zip or .tar(.gz) archives")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--form", default="auto", choices=["auto", *FORM_READERS], help="Force the form type")
+    parser.add_argument("--all-checkboxes", action="store_true", help="Include the per-checkbox dump")
+    args = parser.parse_args()
+
+    # Keep stdout for result lines; reader diagnostics go to stderr
+    results_out = claim_stdout()
+
+    start = time.perf_counter()
+    last_progress = start
+    done = failed = 0
+    for result in iter_bulk_read(args.paths, args.workers, args.form, args.all_checkboxes):
+        done += 1
+        failed += 0 if result["ok"] else 1
+        write_json(results_out, result)
+
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            print(f"[bulk_read] {done} read, {failed} failed, {done / (now - start):.1f} files/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed else 0.0
+    print(f"[bulk_read] done: {done} read, {failed} failed in {elapsed:.1f}s ({rate:.1f} files/s)", file=sys.stderr)
+    sys.exit(0 if failed == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compiled Field-Name Matcher for DISC-001/DISC-002 Readers
+Turns a pattern -> value table (such as CHECKBOX_FIELD_TO_UI) into an
+exact-path/suffix lookup that is built once at import.
+
+A pattern matches a fully-qualified field name when it equals the trailing
+segments of that name, with or without the final "[n]" index:
+
+    "GenBkgrd[0]"      matches  "...List2\\.1[0].GenBkgrd[0]"
+    "GenBkgrd10"       matches  "...List2\\.10[0].item2\\.10[0].GenBkgrd10[0]"
+    "Page5[0].List12[0].#area[0].DisDiscrimComm"
+                       matches  "DISC-002[0].Page5[0].List12[0].#area[0].DisDiscrimComm[0]"
+
+When several patterns match, the longest one wins, so the result no longer
+depends on dict order ("GenBkgrd1" can never claim "GenBkgrd10"). A lookup
+only tries one candidate per name segment, so its cost is independent of the
+number of patterns.
+"""
+
+# Bound on memoized lookups per matcher (field names repeat across forms)
+_MEMO_LIMIT = 8192
+
+# Widget values that mean "not checked" (PyMuPDF reports "Off" for unchecked boxes)
+UNCHECKED_VALUES = (None, False, "", "Off")
+
+
+def is_checked(value) -> bool:
+    """Return True if a checkbox widget value means the box is checked."""
+    return value not in UNCHECKED_VALUES
+
+
+def _strip_index(name: str) -> str:
+    """Strip a trailing "[n]" index from a field name."""
+    if name.endswith("]"):
+        bracket = name.rfind("[")
+        if bracket > 0:
+            return name[:bracket]
+    return name
+
+
+def _segment_starts(name: str) -> list:
+    """Return the start offsets of each dotted segment, ignoring escaped dots."""
+    starts = [0]
+    for i, ch in enumerate(name):
+        if ch == "." and (i == 0 or name[i - 1] != "\\"):
+            starts.append(i + 1)
+    return starts
+
+
+class FieldMatcher:
+    """Deterministic longest-match lookup from field names to mapped values."""
+
+    def __init__(self, mapping: dict):
+        """
+        Compile a pattern -> value table.
+
+        Args:
+            mapping: Field name pattern -> value (e.g. UI interrogatory number)
+        """
+        self._lookup = {}
+        for pattern, value in mapping.items():
+            existing = self._lookup.get(pattern)
+            if existing is not None and existing != value:
+                raise ValueError(f"Conflicting mapping for field pattern {pattern!r}")
+            self._lookup[pattern] = value
+        self._max_len = max((len(p) for p in self._lookup), default=0)
+        self._memo = {}
+
+    def match(self, field_name: str):
+        """
+        Map a fully-qualified field name to its value.
+
+        Args:
+            field_name: Widget field name from the PDF
+
+        Returns:
+            The value of the longest matching pattern, or None
+        """
+        if field_name in self._memo:
+            return self._memo[field_name]
+
+        best = None
+        best_len = 0
+        for name in (field_name, _strip_index(field_name)):
+            # Suffixes are tried longest first, so the first hit is the best one
+            for start in _segment_starts(name):
+                candidate_len = len(name) - start
+                if candidate_len > self._max_len:
+                    continue
+                if candidate_len <= best_len:
+                    break
+                value = self._lookup.get(name[start:])
+                if value is not None:
+                    best = value
+                    best_len = candidate_len
+                    break
+
+        if len(self._memo) >= _MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[field_name] = best
+        return best
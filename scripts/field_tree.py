@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+AcroForm Field-Tree Reader for DISC-001/DISC-002 PDFs
+Walks the catalog's /AcroForm /Fields tree through xref access and returns
+every widget's fully-qualified name, type and value without loading or
+parsing any page content.
+
+Each field object is fetched once with xref_object() and its keys are read
+from the compact object text (per-key xref_get_key() calls cost more than
+the lookup itself). Only the page objects' /Annots arrays are read, to put
+widgets in page order and to check the tree against the pages: if the tree
+is missing, or it does not account for exactly the widget annotations on
+the pages, iter_fields() falls back to the page.widgets() path.
+
+iter_fields() is a generator: on the fallback path pages are loaded one at
+a time as the caller iterates. The readers consume every field (text fields
+are read to the end), so it does not end a read early.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import re
+
+_XREF_PATTERN = re.compile(r"(\d+) \d+ R")
+
+# Literal "(...)" and hex "<...>" strings; replaced by "\0<n>\0" placeholders
+# before keys are matched, so string contents (e.g. /TU tooltips) can never
+# be mistaken for keys
+_STRING_PATTERN = re.compile(r"\((?:\\.|[^\\()])*\)|<(?!<)[0-9A-Fa-f\s]*>", re.S)
+_LITERAL_ESCAPE = re.compile(r"\\([0-7]{1,3}|.)", re.S)
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f"}
+
+_NAME = r"/([^\s/<>\[\]()\x00]*)"
+_KIDS_KEY = re.compile(r"/Kids\s*\[([^\]]*)\]")
+_T_KEY = re.compile(r"/T\s*\x00(\d+)\x00")
+_FT_KEY = re.compile(r"/FT\s*" + _NAME)
+_FF_KEY = re.compile(r"/Ff\s+(\d+)")
+_V_KEY = re.compile(r"/V\s*(?:\x00(\d+)\x00|" + _NAME + r")")
+_V_PRESENT = re.compile(r"/V[\s/\x00\[<\d]")
+_AS_KEY = re.compile(r"/AS\s*" + _NAME)
+_WIDGET_SUBTYPE = re.compile(r"/Subtype\s*/Widget(?![^\s/<>\[\]()])")
+_NAME_ESCAPE = re.compile(r"#([0-9A-Fa-f]{2})")
+
+# /Ff flag bits for button fields (PDF 32000-1, 12.7.4.2)
+_FF_RADIO = 1 << 15
+_FF_PUSHBUTTON = 1 << 16
+
+# Guard against cyclic or absurdly deep /Kids chains in malformed files
+_MAX_DEPTH = 64
+
+
+def _xrefs(value: str) -> list:
+    return [int(x) for x in _XREF_PATTERN.findall(value)]
+
+
+def _unescape(match) -> str:
+    escape = match.group(1)
+    if escape[0] in "01234567":
+        return chr(int(escape, 8) & 0xFF)
+    return _ESCAPES.get(escape, escape)
+
+
+def _decode_string(token: str) -> str:
+    """Decode a PDF literal or hex string (PDFDocEncoding or UTF-16BE with BOM)."""
+    if token[0] == "<":
+        raw = bytes.fromhex("".join(token[1:-1].split()))
+    else:
+        raw = _LITERAL_ESCAPE.sub(_unescape, token[1:-1]).encode("latin-1", "replace")
+    if raw[:2] == b"\xfe\xff":
+        return raw[2:].decode("utf-16-be", "replace")
+    return raw.decode("latin-1")
+
+
+def _decode_name(name: str) -> str:
+    return _NAME_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), name) if "#" in name else name
+
+
+def _load(doc, xref: int) -> tuple:
+    """Return (object text with strings replaced by placeholders, list of strings)."""
+    strings = []
+
+    def keep(match):
+        strings.append(match.group(0))
+        return f"\x00{len(strings) - 1}\x00"
+
+    return _STRING_PATTERN.sub(keep, doc.xref_object(xref, compressed=True)), strings
+
+
+def _field_type(ft: str, flags: int) -> int:
+    """Map /FT and /Ff to the PyMuPDF widget type constants."""
+    if ft == "Tx":
+        return fitz.PDF_WIDGET_TYPE_TEXT
+    if ft == "Btn":
+        if flags & _FF_PUSHBUTTON:
+            return fitz.PDF_WIDGET_TYPE_BUTTON
+        if flags & _FF_RADIO:
+            return fitz.PDF_WIDGET_TYPE_RADIOBUTTON
+        return fitz.PDF_WIDGET_TYPE_CHECKBOX
+    if ft == "Ch":
+        return fitz.PDF_WIDGET_TYPE_COMBOBOX
+    if ft == "Sig":
+        return fitz.PDF_WIDGET_TYPE_SIGNATURE
+    return fitz.PDF_WIDGET_TYPE_UNKNOWN
+
+
+def _own_value(doc, xref: int, body: str, strings: list):
+    """
+    Return (has /V, value) for a field object.
+
+    Names and strings are decoded from the object text; anything else
+    (an indirect or array value) is left to xref_get_key().
+    """
+    match = _V_KEY.search(body)
+    if match:
+        if match.group(1) is not None:
+            return True, _decode_string(strings[int(match.group(1))])
+        return True, _decode_name(match.group(2))
+    if _V_PRESENT.search(body):
+        kind, value = doc.xref_get_key(xref, "V")
+        if kind == "name":
+            return True, value[1:]
+        if kind == "string":
+            return True, value
+        return True, None
+    return False, None
+
+
+def _page_annots(doc) -> dict:
+    """Return annotation xref -> (page index, position on page) from the /Annots arrays."""
+    positions = {}
+    for page_idx in range(len(doc)):
+        kind, value = doc.xref_get_key(doc.page_xref(page_idx), "Annots")
+        if kind == "xref":
+            # /Annots stored as an indirect array
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        elif kind != "array":
+            continue
+        for position, xref in enumerate(_xrefs(value)):
+            positions[xref] = (page_idx, position)
+    return positions
+
+
+def read_field_tree(doc):
+    """
+    Read every widget from the AcroForm field tree.
+
+    Args:
+        doc: Opened PDF document
+
+    Returns:
+        List of (page index, field name, field type, value) in page order,
+        or None when the tree is missing or does not match the pages
+    """
+    kind, fields = doc.xref_get_key(doc.pdf_catalog(), "AcroForm/Fields")
+    if kind != "array":
+        return None
+
+    annots = _page_annots(doc)
+    widgets = []
+    seen = set()
+    # (xref, parent name, inherited /FT, inherited /Ff, inherited /V, depth)
+    stack = [(xref, "", None, 0, None, 0) for xref in reversed(_xrefs(fields))]
+
+    while stack:
+        xref, parent_name, ft, flags, value, depth = stack.pop()
+        if xref in seen or depth > _MAX_DEPTH:
+            return None
+        seen.add(xref)
+        body, strings = _load(doc, xref)
+
+        match = _T_KEY.search(body)
+        if match:
+            title = _decode_string(strings[int(match.group(1))])
+            name = f"{parent_name}.{title}" if parent_name else title
+        else:
+            name = parent_name
+
+        match = _FT_KEY.search(body)
+        if match:
+            ft = match.group(1)
+        match = _FF_KEY.search(body)
+        if match:
+            flags = int(match.group(1))
+        has_value, own_value = _own_value(doc, xref, body, strings)
+        if has_value:
+            value = own_value
+
+        match = _KIDS_KEY.search(body)
+        if match:
+            for kid in reversed(_xrefs(match.group(1))):
+                stack.append((kid, name, ft, flags, value, depth + 1))
+            continue
+
+        if not _WIDGET_SUBTYPE.search(body):
+            continue
+        if xref not in annots:
+            # A widget the pages do not reference: the tree cannot be trusted
+            return None
+
+        widget_value = value
+        if widget_value is None and ft == "Btn":
+            match = _AS_KEY.search(body)
+            widget_value = _decode_name(match.group(1)) if match else None
+        page_idx, position = annots[xref]
+        widgets.append((page_idx, position, name, _field_type(ft, flags), widget_value))
+
+    # Every widget annotation on the pages must have been reached through the tree
+    for xref in annots:
+        if xref not in seen and _WIDGET_SUBTYPE.search(_load(doc, xref)[0]):
+            return None
+
+    widgets.sort(key=lambda w: (w[0], w[1]))
+    return [(page_idx, name, field_type, value) for page_idx, _pos, name, field_type, value in widgets]
+
+
+def iter_fields(doc, metrics=None):
+    """
+    Yield (page index, field name, field type, value) for every widget.
+
+    Args:
+        doc: Opened PDF document
+        metrics: Optional PhaseTimer ("field_tree" phase, "widget_fallback"
+            and "pages_touched" counters)
+    """
+    if metrics is None:
+        fields = read_field_tree(doc)
+    else:
+        with metrics.phase("field_tree"):
+            fields = read_field_tree(doc)
+    if fields is not None:
+        yield from fields
+        return
+
+    if metrics is not None:
+        metrics.count("widget_fallback")
+    for page_idx in range(len(doc)):
+        if metrics is not None:
+            metrics.count("pages_touched")
+        for widget in doc[page_idx].widgets():
+            yield page_idx, widget.field_name or "", widget.field_type, widget.field_value
@@ -4,14 +4,20 @@ DISC-001 Form Filler using PyMuPDF
 Fills the official California Judicial Council Form Interrogatories - General
 """
 
-import fitz  # PyMuPDF
 import sys
 import json
 import os
-from urllib.request import urlopen
+import logging
 
-# Official DISC-001 PDF URL
-DISC001_URL = "https://courts.ca.gov/sites/default/files/courts/default/2024-11/disc001.pdf"
+from form_io import claim_stdout, read_stdin_json, split_args
+from instrumentation import PhaseTimer, get_logger
+from interrogatory_catalog import DISC001
+from pdf_output import optimize_pdf, profile_from_flags, resolve_profile
+from result_cache import fill_cache_key, get_fill_cache, table_version
+from template_store import load_template, open_template, template_sha256
+from widget_index import fill_mode_from_flags, get_widget_index, resolve_fill_mode, set_widget_values
+
+log = get_logger("fill_disc001")
 
 # =====================================================
 # PAGE 1 FIELD COORDINATES (measured from TOP-LEFT)
@@ -141,34 +147,21 @@ UI_TO_CHECKBOX_FIELD = {
     "10.3": "MedHist3",       # 10.3
     
     # Section 11.x - Other Claims
-    "11.1": "OtherClaims[0]", # 11.1
-    "11.2": "OtherClaims2",   # 11.2
+    "11.1": "List11\\.1[0].OthPrvClaims",  # 11.1 (both widgets are named OthPrvClaims)
+    "11.2": "List11\\.2[0].OthPrvClaims",  # 11.2
     
     # Section 12.x - Investigation General
-    "12.1": "InvestGen[0]",   # 12.1
-    "12.2": "InvestGen2",     # 12.2
-    "12.3": "InvestGen3",     # 12.3
-    "12.4": "InvestGen4",     # 12.4
-    "12.5": "InvestGen5",     # 12.5
-    "12.6": "InvestGen6",     # 12.6
-    "12.7": "InvestGen7",     # 12.7
+    "12.1": "List12\\.1[0].InvestigatGen",  # 12.1 (12.4 is also InvestigatGen[0])
+    "12.2": "InvestigatGen2",  # 12.2
+    "12.3": "InvestigatGen3",  # 12.3
+    "12.4": "List12\\.4[0].InvestigatGen",  # 12.4
+    "12.5": "CheckBox34",      # 12.5
+    "12.6": "CheckBox35",      # 12.6
+    "12.7": "CheckBox36",      # 12.7
 }
 
-# Legacy mapping for backwards compatibility
-UI_TO_DISC001_MAPPING = {
-    "1": "1.1", "2": "2.1", "3": "2.2", "4": "2.3", "5": "2.4",
-    "6": "2.5", "7": "2.6", "8": "2.7", "9": "2.8", "10": "2.9",
-    "11": "2.10", "12": "2.11", "17": "4.1",
-    "6.1": "6.1", "6.2": "6.2", "6.3": "6.3", "6.4": "6.4",
-    "6.5": "6.5", "6.6": "6.6", "6.7": "6.7",
-    "7.1": "7.1", "7.2": "7.2", "7.3": "7.3",
-    "8.1": "8.1", "8.2": "8.2", "8.3": "8.3",
-    "9.1": "9.1", "9.2": "9.2",
-    "10.1": "10.1", "10.2": "10.2", "10.3": "10.3",
-    "11.1": "11.1", "11.2": "11.2",
-    "12.1": "12.1", "12.2": "12.2", "12.3": "12.3", "12.4": "12.4",
-    "12.5": "12.5", "12.6": "12.6", "12.7": "12.7",
-}
+# Legacy mapping for backwards compatibility (UI number -> DISC-001 number)
+UI_TO_DISC001_MAPPING = {ui: DISC001.canonical(ui) for ui in UI_TO_CHECKBOX_FIELD}
 
 # Checkbox positions for interrogatory sections on DISC-001
 # Format: section_number: (page_index, x, y) where page_index is 0-based
@@ -255,33 +248,57 @@ CHECKBOX_POSITIONS = {
     "17.1": (6, 318, 475),   # "17.1 Is your response..." (right col)
 }
 
+# Bump when the filled output changes for the same input (invalidates cached PDFs)
+FILLER_VERSION = "1"
+FILL_MAPPING_VERSION = table_version(UI_TO_CHECKBOX_FIELD, PAGE1_TEXT_FIELDS, FILLER_VERSION)
 
-def download_disc001():
-    """Download the official DISC-001 PDF"""
-    print(f"Downloading DISC-001 from {DISC001_URL}...")
-    with urlopen(DISC001_URL) as response:
-        return response.read()
 
-
-def fill_disc001(data: dict, output_path: str):
+def fill_disc001_to_bytes(data: dict, profile: str = None, metrics: PhaseTimer = None,
+                         fill_mode: str = None, revision: str = None) -> bytes:
     """
-    Fill the DISC-001 form with provided data
+    Fill the DISC-001 form and return the PDF (for in-memory processing).
+    
+    Equivalent inputs (same fields, same set of sections in any order) are
+    served from the fill cache without reopening the template.
     
     Args:
         data: Dictionary containing form data
-        output_path: Path to save the filled PDF
+        profile: Output profile from pdf_output.OUTPUT_PROFILES
+        metrics: Optional PhaseTimer that receives per-phase timings and counters
+        fill_mode: How widget values are written, from widget_index.FILL_MODES
+        revision: Template revision from the manifest (default: the current one)
+        
+    Returns:
+        The filled PDF as bytes
     """
-    # Download the template
-    pdf_bytes = download_disc001()
-    
-    # Open with PyMuPDF
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    print(f"Loaded PDF with {len(doc)} pages")
+    metrics = metrics if metrics is not None else PhaseTimer()
+    verbose = log.isEnabledFor(logging.DEBUG)
+    
+    with metrics.phase("cache_lookup"):
+        profile = resolve_profile(profile)
+        fill_mode = resolve_fill_mode(fill_mode)
+        cache = get_fill_cache()
+        cache_key = fill_cache_key("disc001", template_sha256("disc001", revision),
+                                   f"{FILL_MAPPING_VERSION}:{profile}:{fill_mode}", data)
+        cached = cache.get(cache_key)
+    if cached is not None:
+        metrics.count("cache_hit")
+        log.info("Serving filled PDF from cache")
+        return cached
+    
+    # Load the verified local template (see template_store.py)
+    with metrics.phase("template_load"):
+        pdf_bytes = load_template("disc001", revision)
+    
+    # Open a fresh copy of the parsed template (see template_store.open_template())
+    with metrics.phase("document_open"):
+        doc = open_template("disc001", revision)
+    log.debug(f"Loaded PDF with {len(doc)} pages")
     
     page0 = doc[0]
     page_height = page0.rect.height
     page_width = page0.rect.width
-    print(f"Page dimensions: {page_width} x {page_height}")
+    log.debug(f"Page dimensions: {page_width} x {page_height}")
     
     # Font settings
     fontname = "helv"  # Helvetica
@@ -290,6 +307,7 @@ def fill_disc001(data: dict, output_path: str):
     # Fill text fields on Page 1
     # ========================================
     page1 = doc[0]
+    pages_touched = set()
     
     # Helper to insert text at position
     def insert_field(field_name, value):
@@ -298,88 +316,134 @@ def fill_disc001(data: dict, output_path: str):
         if field_name in PAGE1_TEXT_FIELDS:
             x, y, fontsize = PAGE1_TEXT_FIELDS[field_name]
             page1.insert_text((x, y), str(value), fontsize=fontsize, fontname=fontname)
-            print(f"  Filled {field_name}: '{value}' at ({x}, {y})")
-    
-    # Attorney info
-    insert_field("attorney_name", data.get("attorney_name"))
-    insert_field("bar_number", data.get("bar_number"))
-    insert_field("firm_name", data.get("firm_name"))
-    insert_field("street_address", data.get("street_address"))
-    insert_field("city", data.get("city"))
-    insert_field("state", data.get("state"))
-    insert_field("zip", data.get("zip"))
-    insert_field("phone", data.get("phone"))
-    insert_field("fax", data.get("fax"))
-    insert_field("email", data.get("email"))
-    insert_field("attorney_for", data.get("attorney_for"))
-    
-    # Court info
-    insert_field("county", data.get("county", "").upper() if data.get("county") else None)
-    
-    # Case info - create short title from plaintiff/defendant
-    plaintiff = data.get("plaintiff_name", "")
-    defendant = data.get("defendant_name", "")
-    if plaintiff and defendant:
-        short_title = f"{plaintiff} vs. {defendant}"
-        insert_field("short_title", short_title)
-    
-    insert_field("case_number", data.get("case_number"))
-    
-    # Discovery parties
-    insert_field("asking_party", data.get("asking_party_name"))
-    insert_field("answering_party", data.get("answering_party_name"))
-    insert_field("set_number", data.get("set_number"))
+            pages_touched.add(0)
+            metrics.count("text_fields_filled")
+            if verbose:
+                log.debug(f"Filled {field_name}: '{value}' at ({x}, {y})")
+    
+    with metrics.phase("text_insert"):
+        # Attorney info
+        insert_field("attorney_name", data.get("attorney_name"))
+        insert_field("bar_number", data.get("bar_number"))
+        insert_field("firm_name", data.get("firm_name"))
+        insert_field("street_address", data.get("street_address"))
+        insert_field("city", data.get("city"))
+        insert_field("state", data.get("state"))
+        insert_field("zip", data.get("zip"))
+        insert_field("phone", data.get("phone"))
+        insert_field("fax", data.get("fax"))
+        insert_field("email", data.get("email"))
+        insert_field("attorney_for", data.get("attorney_for"))
+        
+        # Court info
+        insert_field("county", data.get("county", "").upper() if data.get("county") else None)
+        
+        # Case info - create short title from plaintiff/defendant
+        plaintiff = data.get("plaintiff_name", "")
+        defendant = data.get("defendant_name", "")
+        if plaintiff and defendant:
+            short_title = f"{plaintiff} vs. {defendant}"
+            insert_field("short_title", short_title)
+        
+        insert_field("case_number", data.get("case_number"))
+        
+        # Discovery parties
+        insert_field("asking_party", data.get("asking_party_name"))
+        insert_field("answering_party", data.get("answering_party_name"))
+        insert_field("set_number", data.get("set_number"))
     
     # ========================================
     # Check boxes for selected interrogatories using native PDF form fields
     # ========================================
     selected_sections = data.get("selected_sections", [])
-    print(f"\nChecking {len(selected_sections)} interrogatory sections using native PDF checkboxes...")
-    
-    # Build a list of checkbox field name patterns to match
-    checkbox_patterns = []
-    for section in selected_sections:
-        section_str = str(section)
-        if section_str in UI_TO_CHECKBOX_FIELD:
-            checkbox_patterns.append((section_str, UI_TO_CHECKBOX_FIELD[section_str]))
-        else:
-            print(f"  Warning: No checkbox field mapping for section {section_str}")
-    
-    # Find and check all matching checkbox widgets across all pages
-    checked_count = 0
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
-        for widget in page.widgets():
-            if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                field_name = widget.field_name
-                
-                # Check if this widget matches any of our patterns
-                for ui_section, pattern in checkbox_patterns:
-                    if pattern in field_name:
-                        # Check the checkbox by setting its value
-                        widget.field_value = True
-                        widget.update()
-                        print(f"  Checked UI:{ui_section} -> field \"{field_name[:60]}...\" on page {page_idx + 1}")
-                        checked_count += 1
-                        break  # Only match once per widget
-    
-    print(f"  Total checkboxes checked: {checked_count}")
+    metrics.count("sections_requested", len(selected_sections))
+    log.debug(f"Checking {len(selected_sections)} interrogatory sections using native PDF checkboxes...")
+    
+    # Look up the checkbox widgets for each section in the precompiled index
+    with metrics.phase("widget_scan"):
+        index = get_widget_index("disc001", UI_TO_CHECKBOX_FIELD, revision=revision)
+    
+    with metrics.phase("mapping"):
+        assignments = []
+        for section in selected_sections:
+            section_str = str(section)
+            if section_str not in UI_TO_CHECKBOX_FIELD:
+                log.warning(f"No checkbox field mapping for section {section_str}")
+                continue
+            metrics.count("sections_mapped")
+            for page_idx, xref, field_name in index["checkboxes"][section_str]:
+                assignments.append((page_idx, xref, True))
+                pages_touched.add(page_idx)
+                if verbose:
+                    log.debug(f"Checked UI:{section_str} -> field \"{field_name[:60]}...\" on page {page_idx + 1}")
+    
+    # Check the boxes, loading only the pages that hold them
+    with metrics.phase("appearance_update"):
+        checked_count = set_widget_values(doc, assignments, fill_mode, index, metrics)
+    metrics.count("widgets_visited", checked_count)
+    metrics.count("pages_touched", len(pages_touched))
+    
+    log.info(f"Total checkboxes checked: {checked_count}")
+    
+    template_size = len(pdf_bytes)
+    with metrics.phase("save"):
+        pdf_bytes = optimize_pdf(doc, profile)
+    doc.close()
+    metrics.count("output_bytes", len(pdf_bytes))
+    log.info(f"Output profile '{profile}': {len(pdf_bytes):,} bytes (template {template_size:,} bytes)")
+    cache.put(cache_key, pdf_bytes)
+    return pdf_bytes
+
+
+def fill_disc001(data: dict, output_path: str, profile: str = None, metrics: PhaseTimer = None,
+                fill_mode: str = None, revision: str = None):
+    """
+    Fill the DISC-001 form with provided data
+    
+    Args:
+        data: Dictionary containing form data
+        output_path: Path to save the filled PDF
+        profile: Output profile from pdf_output.OUTPUT_PROFILES
+        metrics: Optional PhaseTimer that receives per-phase timings and counters
+        fill_mode: How widget values are written, from widget_index.FILL_MODES
+        revision: Template revision from the manifest (default: the current one)
+    """
+    pdf_bytes = fill_disc001_to_bytes(data, profile, metrics, fill_mode, revision)
     
     # Save the filled PDF
-    doc.save(output_path)
-    doc.close()
-    print(f"\nSaved filled PDF to: {output_path}")
+    with open(output_path, "wb") as f:
+        f.write(pdf_bytes)
+    log.info(f"Saved filled PDF to: {output_path}")
     return output_path
 
 
 def main():
-    """Main entry point"""
+    """
+    Main entry point
+    
+    Usage:
+        fill_disc001.py <input_json> [output_pdf]
+        fill_disc001.py --stdin --stdout    (JSON on stdin, PDF bytes on stdout)
+    
+    Add --profile=none|compact|max to pick the output profile and
+    --fill-mode=widgets|deferred|viewer to pick how widget values are written.
+    """
+    args, flags = split_args(sys.argv[1:])
+    profile = profile_from_flags(flags)
+    fill_mode = fill_mode_from_flags(flags)
+    
+    # Keep stdout clean for the PDF bytes; progress output goes to stderr
+    pdf_out = claim_stdout() if "--stdout" in flags else None
+    
     # Check if JSON data is provided via stdin or argument
-    if len(sys.argv) > 1:
+    if "--stdin" in flags:
+        data = read_stdin_json()
+        output_path = args[0] if args else "filled_disc001.pdf"
+    elif args:
         # Read from file
-        with open(sys.argv[1], 'r') as f:
+        with open(args[0], 'r') as f:
             data = json.load(f)
-        output_path = sys.argv[2] if len(sys.argv) > 2 else "filled_disc001.pdf"
+        output_path = args[1] if len(args) > 1 else "filled_disc001.pdf"
     else:
         # Test data using UI interrogatory numbers
         data = {
@@ -417,7 +481,13 @@ def main():
         }
         output_path = "test-disc001-pymupdf.pdf"
     
-    fill_disc001(data, output_path)
+    metrics = PhaseTimer()
+    if pdf_out is not None:
+        pdf_out.write(fill_disc001_to_bytes(data, profile, metrics, fill_mode))
+        pdf_out.flush()
+    else:
+        fill_disc001(data, output_path, profile, metrics, fill_mode)
+    log.info(f"Metrics: {json.dumps(metrics.as_dict())}")
 
 
 if __name__ == "__main__":
@@ -6,14 +6,19 @@ Fills the official California Judicial Council Form Interrogatories - Employment
 Field names discovered by analyzing the actual DISC-002 PDF structure.
 """
 
-import fitz  # PyMuPDF
 import sys
 import json
 import os
-from urllib.request import urlopen
+import logging
 
-# Official DISC-002 PDF URL
-DISC002_URL = "https://courts.ca.gov/sites/default/files/courts/default/2024-11/disc002.pdf"
+from form_io import claim_stdout, read_stdin_json, split_args
+from instrumentation import PhaseTimer, get_logger
+from pdf_output import optimize_pdf, profile_from_flags, resolve_profile
+from result_cache import fill_cache_key, get_fill_cache, table_version
+from template_store import load_template, open_template, template_sha256
+from widget_index import fill_mode_from_flags, get_widget_index, resolve_fill_mode, set_widget_values
+
+log = get_logger("fill_disc002")
 
 # =====================================================
 # MAPPING FROM UI INTERROGATORY NUMBERS TO PDF CHECKBOX FIELD NAME PATTERNS
@@ -40,7 +45,7 @@ UI_TO_CHECKBOX_FIELD = {
     "201.7": "AdvEmpActContact",       # Failure to select?
     
     # Section 202.0 - Discrimination Interrogatories to Employee
-    "202.1": "Discrim[0]",             # Discriminatory adverse actions?
+    "202.1": ".Discrim[0]",            # Discriminatory adverse actions? (not DisDiscrim[0])
     "202.2": "DiscrimFacts",           # Facts supporting qualification?
     
     # Section 203.0 - Harassment Interrogatories to Employee
@@ -49,7 +54,7 @@ UI_TO_CHECKBOX_FIELD = {
     # Section 204.0 - Disability Discrimination
     "204.1": "DisDiscrim[0]",          # Name and describe disability
     "204.2": "DisDiscrimInjury",       # Injury/illness from employment?
-    "204.3": "DisDiscrimComm[0]",      # Communications about disability (Page 4)
+    "204.3": "List9[0].#area[0].DisDiscrimComm",  # Communications about disability (Page 4)
     "204.4": "DisDiscrimContact",      # Other info about disability?
     "204.5": "DisDiscrimAccomdn",      # Accommodation needed?
     "204.6": "Page5[0].List12",        # Communications about accommodation (Page 5)
@@ -134,33 +139,57 @@ TEXT_FIELD_PATTERNS = {
     "employer_name": "LI5[0].FillText1",    # Employer name (for definitions)
 }
 
-
-def download_disc002():
-    """Download the official DISC-002 PDF"""
-    print(f"Downloading DISC-002 from {DISC002_URL}...")
-    with urlopen(DISC002_URL) as response:
-        return response.read()
+# Bump when the filled output changes for the same input (invalidates cached PDFs)
+FILLER_VERSION = "1"
+FILL_MAPPING_VERSION = table_version(UI_TO_CHECKBOX_FIELD, TEXT_FIELD_PATTERNS, FILLER_VERSION)
 
 
-def fill_disc002(data: dict, output_path: str):
+def fill_disc002_to_bytes(data: dict, profile: str = None, metrics: PhaseTimer = None,
+                         fill_mode: str = None, revision: str = None) -> bytes:
     """
-    Fill the DISC-002 form with provided data
+    Fill the DISC-002 form and return the PDF (for in-memory processing).
+    
+    Equivalent inputs (same fields, same set of sections in any order) are
+    served from the fill cache without reopening the template.
     
     Args:
         data: Dictionary containing form data
-        output_path: Path to save the filled PDF
+        profile: Output profile from pdf_output.OUTPUT_PROFILES
+        metrics: Optional PhaseTimer that receives per-phase timings and counters
+        fill_mode: How widget values are written, from widget_index.FILL_MODES
+        revision: Template revision from the manifest (default: the current one)
+        
+    Returns:
+        The filled PDF as bytes
     """
-    # Download the template
-    pdf_bytes = download_disc002()
-    
-    # Open with PyMuPDF
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    print(f"Loaded PDF with {len(doc)} pages")
+    metrics = metrics if metrics is not None else PhaseTimer()
+    verbose = log.isEnabledFor(logging.DEBUG)
+    
+    with metrics.phase("cache_lookup"):
+        profile = resolve_profile(profile)
+        fill_mode = resolve_fill_mode(fill_mode)
+        cache = get_fill_cache()
+        cache_key = fill_cache_key("disc002", template_sha256("disc002", revision),
+                                   f"{FILL_MAPPING_VERSION}:{profile}:{fill_mode}", data)
+        cached = cache.get(cache_key)
+    if cached is not None:
+        metrics.count("cache_hit")
+        log.info("Serving filled PDF from cache")
+        return cached
+    
+    # Load the verified local template (see template_store.py)
+    with metrics.phase("template_load"):
+        pdf_bytes = load_template("disc002", revision)
+    
+    # Open a fresh copy of the parsed template (see template_store.open_template())
+    with metrics.phase("document_open"):
+        doc = open_template("disc002", revision)
+    log.debug(f"Loaded PDF with {len(doc)} pages")
     
     # ========================================
     # Fill text fields using native PDF form widgets
     # ========================================
-    print("\nFilling text fields...")
+    log.debug("Filling text fields...")
     
     # Build attorney info block
     attorney_lines = []
@@ -205,84 +234,126 @@ def fill_disc002(data: dict, output_path: str):
         "employer_name": data.get("employer_name", ""),
     }
     
-    # Fill text widgets across all pages
-    filled_text_count = 0
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
-        for widget in page.widgets():
-            if widget.field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                field_name = widget.field_name or ""
-                
-                # Try to match against our patterns
-                for key, pattern in TEXT_FIELD_PATTERNS.items():
-                    if pattern in field_name:
-                        value = text_values.get(key, "")
-                        if value:
-                            widget.field_value = value
-                            widget.update()
-                            print(f"  Filled '{key}': '{value[:40]}...' -> {field_name[:50]}")
-                            filled_text_count += 1
-                        break
-    
-    print(f"  Total text fields filled: {filled_text_count}")
+    # Look up text and checkbox widgets in the precompiled index
+    with metrics.phase("widget_scan"):
+        index = get_widget_index("disc002", UI_TO_CHECKBOX_FIELD, TEXT_FIELD_PATTERNS, revision=revision)
+    
+    with metrics.phase("mapping"):
+        text_assignments = []
+        for key, widgets in index["text"].items():
+            value = text_values.get(key, "")
+            if not value:
+                continue
+            for page_idx, xref, field_name in widgets:
+                text_assignments.append((page_idx, xref, value))
+                if verbose:
+                    log.debug(f"Filled '{key}': '{value[:40]}...' -> {field_name[:50]}")
+    
+    with metrics.phase("appearance_update"):
+        filled_text_count = set_widget_values(doc, text_assignments, fill_mode, index, metrics)
+    
+    log.info(f"Total text fields filled: {filled_text_count}")
     
     # ========================================
     # Check boxes for selected interrogatories
     # ========================================
     selected_sections = data.get("selected_sections", [])
-    print(f"\nChecking {len(selected_sections)} interrogatory checkboxes...")
-    
-    # Build list of patterns to match
-    checkbox_patterns = []
-    for section in selected_sections:
-        section_str = str(section)
-        if section_str in UI_TO_CHECKBOX_FIELD:
-            checkbox_patterns.append((section_str, UI_TO_CHECKBOX_FIELD[section_str]))
-        else:
-            print(f"  Warning: No checkbox mapping for section {section_str}")
-    
-    # Find and check matching checkbox widgets
-    checked_count = 0
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
-        for widget in page.widgets():
-            if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                field_name = widget.field_name or ""
-                
-                # Check if this widget matches any of our patterns
-                for ui_section, pattern in checkbox_patterns:
-                    if pattern in field_name:
-                        # Check the checkbox
-                        widget.field_value = True
-                        widget.update()
-                        print(f"  Checked {ui_section} -> '{field_name[:60]}' (page {page_idx + 1})")
-                        checked_count += 1
-                        # Remove from patterns to avoid double-checking
-                        checkbox_patterns.remove((ui_section, pattern))
-                        break
-    
-    print(f"  Total checkboxes checked: {checked_count}")
+    metrics.count("sections_requested", len(selected_sections))
+    log.debug(f"Checking {len(selected_sections)} interrogatory checkboxes...")
+    
+    with metrics.phase("mapping"):
+        checkbox_assignments = []
+        unmatched = []
+        for section in selected_sections:
+            section_str = str(section)
+            if section_str not in UI_TO_CHECKBOX_FIELD:
+                log.warning(f"No checkbox mapping for section {section_str}")
+                continue
+            widgets = index["checkboxes"][section_str]
+            if not widgets:
+                unmatched.append(section_str)
+                continue
+            # Each section checks only its first matching widget
+            page_idx, xref, field_name = widgets[0]
+            checkbox_assignments.append((page_idx, xref, True))
+            metrics.count("sections_mapped")
+            if verbose:
+                log.debug(f"Checked {section_str} -> '{field_name[:60]}' (page {page_idx + 1})")
+    
+    # Check the boxes, loading only the pages that hold them
+    with metrics.phase("appearance_update"):
+        checked_count = set_widget_values(doc, checkbox_assignments, fill_mode, index, metrics)
+    
+    metrics.count("text_fields_filled", filled_text_count)
+    metrics.count("widgets_visited", filled_text_count + checked_count)
+    metrics.count("pages_touched", len({a[0] for a in text_assignments + checkbox_assignments}))
+    log.info(f"Total checkboxes checked: {checked_count}")
     
     # Report any unchecked sections
-    if checkbox_patterns:
-        print(f"\n  Warning: {len(checkbox_patterns)} sections could not be matched:")
-        for ui_section, pattern in checkbox_patterns:
-            print(f"    - {ui_section} (pattern: {pattern})")
+    if unmatched:
+        log.warning(f"{len(unmatched)} sections could not be matched: "
+                    + ", ".join(f"{ui_section} (pattern: {UI_TO_CHECKBOX_FIELD[ui_section]})"
+                                for ui_section in unmatched))
+    
+    template_size = len(pdf_bytes)
+    with metrics.phase("save"):
+        pdf_bytes = optimize_pdf(doc, profile)
+    doc.close()
+    metrics.count("output_bytes", len(pdf_bytes))
+    log.info(f"Output profile '{profile}': {len(pdf_bytes):,} bytes (template {template_size:,} bytes)")
+    cache.put(cache_key, pdf_bytes)
+    return pdf_bytes
+
+
+def fill_disc002(data: dict, output_path: str, profile: str = None, metrics: PhaseTimer = None,
+                fill_mode: str = None, revision: str = None):
+    """
+    Fill the DISC-002 form with provided data
+    
+    Args:
+        data: Dictionary containing form data
+        output_path: Path to save the filled PDF
+        profile: Output profile from pdf_output.OUTPUT_PROFILES
+        metrics: Optional PhaseTimer that receives per-phase timings and counters
+        fill_mode: How widget values are written, from widget_index.FILL_MODES
+        revision: Template revision from the manifest (default: the current one)
+    """
+    pdf_bytes = fill_disc002_to_bytes(data, profile, metrics, fill_mode, revision)
     
     # Save the filled PDF
-    doc.save(output_path)
-    doc.close()
-    print(f"\nSaved filled PDF to: {output_path}")
+    with open(output_path, "wb") as f:
+        f.write(pdf_bytes)
+    log.info(f"Saved filled PDF to: {output_path}")
     return output_path
 
 
 def main():
-    """Main entry point"""
-    if len(sys.argv) > 1:
+    """
+    Main entry point
+    
+    Usage:
+        fill_disc002.py <input_json> [output_pdf]
+        fill_disc002.py --stdin --stdout    (JSON on stdin, PDF bytes on stdout)
+    
+    Add --profile=none|compact|max to pick the output profile and
+    --fill-mode=widgets|deferred|viewer to pick how widget values are written.
+    """
+    args, flags = split_args(sys.argv[1:])
+    profile = profile_from_flags(flags)
+    fill_mode = fill_mode_from_flags(flags)
+    
+    # Keep stdout clean for the PDF bytes; progress output goes to stderr
+    pdf_out = claim_stdout() if "--stdout" in flags else None
+    
+    # Check if JSON data is provided via stdin or argument
+    if "--stdin" in flags:
+        data = read_stdin_json()
+        output_path = args[0] if args else "filled_disc002.pdf"
+    elif args:
         # Read from file
-        with open(sys.argv[1], 'r') as f:
+        with open(args[0], 'r') as f:
             data = json.load(f)
-        output_path = sys.argv[2] if len(sys.argv) > 2 else "filled_disc002.pdf"
+        output_path = args[1] if len(args) > 1 else "filled_disc002.pdf"
     else:
         # Test data
         data = {
@@ -321,7 +392,13 @@ def main():
         }
         output_path = "test-disc002-pymupdf.pdf"
     
-    fill_disc002(data, output_path)
+    metrics = PhaseTimer()
+    if pdf_out is not None:
+        pdf_out.write(fill_disc002_to_bytes(data, profile, metrics, fill_mode))
+        pdf_out.flush()
+    else:
+        fill_disc002(data, output_path, profile, metrics, fill_mode)
+    log.info(f"Metrics: {json.dumps(metrics.as_dict())}")
 
 
 if __name__ == "__main__":
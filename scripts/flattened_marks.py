@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Checkbox Mark Detection for Flattened DISC-001/DISC-002 PDFs
+Served forms that were printed to PDF or flattened have no widgets left, so
+the readers see no checkboxes at all. This module finds the marks that were
+burned into the page instead: X / check glyphs (e.g. ZapfDingbats from a
+flattened appearance stream) and vector strokes (diagonal lines, curves,
+small filled shapes) inside the known checkbox squares.
+
+The checkbox squares come from the template's compiled form map
+(form_map.py): every checkbox widget's /TU tooltip starts with its
+interrogatory number ("6.1 Do you attribute any..."), and its /Rect is the
+exact square on the page. They are scaled to the served page size. Only
+those regions are examined: text is extracted with a clip per checkbox
+column, and vector paths are tested against the regions of their page only.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+
+from form_map import get_form_map
+from interrogatory_catalog import CATALOGS
+from template_store import template_sha256
+
+# Characters that mark a box when drawn inside it
+CHECK_GLYPHS = frozenset("Xx✓✔✕✖✗✘☒☑■●")
+
+# Symbol fonts whose glyphs inside a box are always a mark
+SYMBOL_FONTS = ("ZapfDingbats", "Dingbats", "Wingdings", "Symbol")
+
+# Points added around each checkbox square (marks often overshoot the box)
+REGION_MARGIN = 1.5
+
+# Regions of one column are clipped together when their x0 differ by less
+COLUMN_TOLERANCE = 20
+
+# A filled shape covering at least this share of a region is the box itself
+FILLED_BOX_SHARE = 0.9
+
+# (form id, template sha256) -> (template page rects, {page: [(number, rect)]})
+_region_cache = {}
+
+
+def checkbox_regions(form_id: str, revision: str = None):
+    """
+    Return the checkbox squares of a form template.
+
+    Args:
+        form_id: Template id ("disc001" or "disc002")
+        revision: Template revision (default: the current revision)
+
+    Returns:
+        (list of template page rects, {page index: [(interrogatory number, rect)]})
+    """
+    key = (form_id, template_sha256(form_id, revision))
+    cached = _region_cache.get(key)
+    if cached is not None:
+        return cached
+
+    form_map = get_form_map(form_id, revision)
+    page_rects = [fitz.Rect(rect) for rect in form_map.page_rects]
+    regions = {}
+    for _path, _xref, page_idx, rect, _type, number in form_map.of_type(fitz.PDF_WIDGET_TYPE_CHECKBOX):
+        if number:
+            regions.setdefault(page_idx, []).append((number, fitz.Rect(rect)))
+
+    _region_cache[key] = (page_rects, regions)
+    return _region_cache[key]
+
+
+def _scaled(rect, sx: float, sy: float):
+    return fitz.Rect(rect.x0 * sx, rect.y0 * sy, rect.x1 * sx, rect.y1 * sy) + (
+        -REGION_MARGIN, -REGION_MARGIN, REGION_MARGIN, REGION_MARGIN)
+
+
+def _columns(regions: list) -> list:
+    """Group regions into vertical strips and return the strip rects."""
+    strips = []
+    for _number, rect in sorted(regions, key=lambda r: r[1].x0):
+        if strips and rect.x0 - strips[-1].x0 < COLUMN_TOLERANCE:
+            strips[-1] |= rect
+        else:
+            strips.append(fitz.Rect(rect))
+    return strips
+
+
+def _region_at(regions: list, x: float, y: float):
+    for number, rect in regions:
+        if rect.x0 <= x <= rect.x1 and rect.y0 <= y <= rect.y1:
+            return number
+    return None
+
+
+def _glyph_marks(page, regions: list) -> set:
+    """Return the numbers whose squares contain a check glyph."""
+    marked = set()
+    for clip in _columns(regions):
+        for block in page.get_text("rawdict", clip=clip, flags=0)["blocks"]:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    symbol_font = any(font in span["font"] for font in SYMBOL_FONTS)
+                    for char in span["chars"]:
+                        if not (symbol_font or char["c"] in CHECK_GLYPHS) or char["c"].isspace():
+                            continue
+                        x0, y0, x1, y1 = char["bbox"]
+                        number = _region_at(regions, (x0 + x1) / 2, (y0 + y1) / 2)
+                        if number:
+                            marked.add(number)
+    return marked
+
+
+def _vector_marks(page, regions: list) -> set:
+    """Return the numbers whose squares contain a stroke or fill that is not the box outline."""
+    marked = set()
+    for path in page.get_cdrawings():
+        x0, y0, x1, y1 = path["rect"]
+        candidates = [(n, r) for n, r in regions if r.x0 <= x1 and x0 <= r.x1 and r.y0 <= y1 and y0 <= r.y1]
+        if not candidates:
+            continue
+        filled = path.get("fill") is not None
+        for item in path["items"]:
+            kind = item[0]
+            if kind == "l":
+                (ax, ay), (bx, by) = item[1], item[2]
+                if abs(bx - ax) < 0.5 or abs(by - ay) < 0.5:
+                    continue  # box outline or rule
+                number = _region_at(candidates, (ax + bx) / 2, (ay + by) / 2)
+            elif kind == "c":
+                (ax, ay), (bx, by) = item[1], item[4]
+                number = _region_at(candidates, (ax + bx) / 2, (ay + by) / 2)
+            elif kind in ("re", "qu") and filled:
+                rect = fitz.Rect(item[1]) if kind == "re" else fitz.Quad(item[1]).rect
+                number = _region_at(candidates, (rect.x0 + rect.x1) / 2, (rect.y0 + rect.y1) / 2)
+                if number:
+                    box = dict(candidates)[number] + (REGION_MARGIN, REGION_MARGIN, -REGION_MARGIN, -REGION_MARGIN)
+                    if rect.get_area() >= FILLED_BOX_SHARE * box.get_area():
+                        number = None  # shaded box background
+            else:
+                continue
+            if number:
+                marked.add(number)
+    return marked
+
+
+def find_marked_checkboxes(doc, form_id: str, metrics=None, revision: str = None) -> list:
+    """
+    Find checkbox squares with a burned-in mark on a flattened form.
+
+    Args:
+        doc: Opened PDF document (pages in template order)
+        form_id: Template id ("disc001" or "disc002")
+        metrics: Optional PhaseTimer ("pages_touched" counter)
+        revision: Template revision the form was made from (default: current)
+
+    Returns:
+        Marked interrogatory numbers in form order
+    """
+    page_rects, template_regions = checkbox_regions(form_id, revision)
+    marked = set()
+    for page_idx, regions in sorted(template_regions.items()):
+        if page_idx >= len(doc):
+            break
+        page = doc[page_idx]
+        template_rect = page_rects[page_idx]
+        sx = page.rect.width / template_rect.width
+        sy = page.rect.height / template_rect.height
+        regions = [(number, _scaled(rect, sx, sy)) for number, rect in regions]
+        if metrics is not None:
+            metrics.count("pages_touched")
+
+        found = _glyph_marks(page, regions)
+        # Only look for strokes in squares without a glyph mark
+        remaining = [(number, rect) for number, rect in regions if number not in found]
+        if remaining:
+            found |= _vector_marks(page, remaining)
+        marked |= found
+
+    return CATALOGS[form_id].sort(marked)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Startup-Optimized Entry Point for the DISC-001/DISC-002 Scripts
+Runs one fill/read script exactly as its own command line does, but imports
+the script only once the arguments show it will do work. `--help`, an
+unknown command and a fill's missing input JSON are answered from the
+standard library alone, without the PyMuPDF import every script pays up
+front. A read's missing PDF is left to the read script, which reports it as
+its usual JSON error result. This is the entry point for the
+spawn-per-request fallback, where the import is most of the time a user
+waits for.
+
+    python3 scripts/form_cli.py read_disc001 --stdin --stdout
+    python3 scripts/form_cli.py fill_disc002 jobs/smith.json out.pdf --profile=compact
+    python3 scripts/form_cli.py read_form --help
+
+The import of the script is timed and written to stderr, flagged when it
+takes longer than IMPORT_BUDGET_MS. `--check-imports` times the import of
+every command in a fresh interpreter and exits non-zero when one is over
+budget, so the budget can be enforced in CI:
+
+    python3 scripts/form_cli.py --check-imports [--json]
+"""
+
+import os
+import sys
+import time
+
+# Milliseconds a command's imports may take (FORM_IMPORT_BUDGET_MS)
+IMPORT_BUDGET_MS = float(os.environ.get("FORM_IMPORT_BUDGET_MS") or 250)
+
+# Command (the script module it runs) -> usage
+COMMANDS = {
+    "fill_disc001": "<input_json> [output_pdf] | --stdin --stdout  [--profile=...] [--fill-mode=...]",
+    "fill_disc002": "<input_json> [output_pdf] | --stdin --stdout  [--profile=...] [--fill-mode=...]",
+    "read_disc001": "<pdf_path> [output_json_path] | --stdin --stdout  [--all-checkboxes]",
+    "read_disc002": "<pdf_path> [output_json_path] | --stdin --stdout  [--debug] [--all-checkboxes]",
+    "read_form": "<pdf_path> [output_json_path] | --stdin --stdout  [--all-checkboxes]",
+}
+
+# Commands whose missing input file is reported here; the read commands
+# answer it with a JSON error result of their own
+PRECHECK_COMMANDS = ("fill_disc001", "fill_disc002")
+
+
+def usage() -> str:
+    """Return the usage text of every command."""
+    lines = ["Usage: form_cli.py <command> [args]    (form_cli.py --check-imports [--json])", ""]
+    lines += [f"  {command} {command_usage}" for command, command_usage in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def _missing_input(argv: list):
+    """Return the input JSON file named on the command line if it does not exist."""
+    positional = [arg for arg in argv if not arg.startswith("--")]
+    if "--stdin" in argv or not positional:
+        return None
+    return None if os.path.exists(positional[0]) else positional[0]
+
+
+def import_command(command: str):
+    """
+    Import a command's script module and time it.
+
+    Returns:
+        (module, milliseconds the import took)
+    """
+    start = time.perf_counter()
+    module = __import__(command)
+    return module, round((time.perf_counter() - start) * 1000, 1)
+
+
+def check_imports(commands=None) -> dict:
+    """
+    Time each command's import in a fresh interpreter.
+
+    Args:
+        commands: Command names (default: every command)
+
+    Returns:
+        Command -> {"import_ms", "over_budget"}
+    """
+    import subprocess
+
+    results = {}
+    for command in commands or COMMANDS:
+        probe = (f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+                 f"import form_cli; print(form_cli.import_command({command!r})[1])")
+        completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {command} failed: {completed.stderr.strip()}")
+        import_ms = float(completed.stdout.strip().splitlines()[-1])
+        results[command] = {"import_ms": import_ms, "over_budget": import_ms > IMPORT_BUDGET_MS}
+    return results
+
+
+def main():
+    """Main entry point - dispatch to a script, or check the import budget."""
+    argv = sys.argv[1:]
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage(), file=sys.stderr)
+        sys.exit(0 if argv else 2)
+
+    if argv[0] == "--check-imports":
+        results = check_imports([arg for arg in argv[1:] if not arg.startswith("--")])
+        if "--json" in argv:
+            import json
+            print(json.dumps({"budget_ms": IMPORT_BUDGET_MS, "commands": results}, indent=2))
+        for command, result in results.items():
+            status = "OVER BUDGET" if result["over_budget"] else "ok"
+            print(f"{command:14} {result['import_ms']:7.1f} ms  {status}", file=sys.stderr)
+        sys.exit(1 if any(result["over_budget"] for result in results.values()) else 0)
+
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+    if "-h" in args or "--help" in args:
+        print(f"Usage: form_cli.py {command} {COMMANDS[command]}", file=sys.stderr)
+        sys.exit(0)
+    missing = _missing_input(args) if command in PRECHECK_COMMANDS else None
+    if missing is not None:
+        print(f"File not found: {missing}", file=sys.stderr)
+        sys.exit(1)
+
+    module, import_ms = import_command(command)
+    if import_ms > IMPORT_BUDGET_MS:
+        print(f"Imported {command} in {import_ms} ms, over the {IMPORT_BUDGET_MS:g} ms budget "
+              f"(FORM_IMPORT_BUDGET_MS)", file=sys.stderr)
+    else:
+        print(f"Imported {command} in {import_ms} ms", file=sys.stderr)
+    sys.argv = [module.__file__] + args
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
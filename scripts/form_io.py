@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Byte-stream I/O helpers for the DISC-001/DISC-002 scripts
+Lets the fill/read CLIs and the form worker take their input on stdin and
+return PDF bytes or compact JSON on stdout with no filesystem round-trip.
+PDFs that are already on disk (templates, served packets) are memory-mapped
+instead of read, so their pages are shared through the OS page cache.
+"""
+
+import json
+import mmap
+import os
+import sys
+
+
+def claim_stdout():
+    """
+    Reserve the real stdout for machine-readable output.
+
+    File descriptor 1 is redirected to stderr, so print() calls and any
+    messages MuPDF writes to stdout cannot corrupt the PDF or JSON stream.
+
+    Returns:
+        Binary file object writing to the original stdout
+    """
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return out
+
+
+def read_stdin_bytes() -> bytes:
+    """Read all of stdin as bytes (e.g. a PDF piped in by the caller)."""
+    return sys.stdin.buffer.read()
+
+
+def map_file(path: str) -> memoryview:
+    """
+    Map a file read-only into memory.
+
+    Nothing is copied onto the heap: pages are read from the OS page cache
+    when touched, so every process mapping the same file shares one copy.
+    fitz.open(stream=...) and hashlib take the view without copying it. The
+    mapping stays valid when the file is replaced (os.replace) but not when
+    it is truncated in place, so files are only ever replaced.
+
+    Args:
+        path: File to map
+
+    Returns:
+        Read-only memoryview of the file content
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def read_stdin_json() -> dict:
+    """Read a JSON document from stdin."""
+    return json.loads(read_stdin_bytes())
+
+
+def write_json(out, obj):
+    """Write compact JSON followed by a newline to a binary stream."""
+    out.write(json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n")
+    out.flush()
+
+
+def split_args(argv: list) -> tuple:
+    """
+    Split command-line arguments into positionals and --flags.
+
+    Returns:
+        (positional arguments, set of flags)
+    """
+    positional = [a for a in argv if not a.startswith("--")]
+    flags = {a for a in argv if a.startswith("--")}
+    return positional, flags
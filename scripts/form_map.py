@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Compiled Form Maps for DISC-001/DISC-002 Templates
+Compiles a form template into a versioned map of its widgets:
+
+    (field path, xref, page, rect, field type, interrogatory number)
+
+The interrogatory number of a checkbox comes from its /TU tooltip, which
+starts with the number printed on the form ("6.1 Do you attribute any...").
+Every template revision in the manifest (template_store.py) gets its own
+map, written next to the template as <form_id>-<revision>.formmap (a
+marshal blob tagged with FORM_MAP_FORMAT and the template's SHA-256) and
+loaded by the fill and read paths on first use, so they bind
+interrogatories to widgets without scanning the template's pages. A
+missing or stale map is compiled in-process from the template, with a
+warning. Compiling a revision also writes its scanned-form reference
+(<form_id>-<revision>.rastermap, see raster_marks.py).
+
+A served form is matched to its revision by match_form_map(): first by the
+permanent half of the trailer /ID, which PDF writers keep when a form is
+filled and saved, then by the checkbox field names it shares with each
+revision.
+
+The hand-written mapping tables (the fill scripts' UI_TO_CHECKBOX_FIELD and
+TEXT_FIELD_PATTERNS, the readers' CHECKBOX_FIELD_TO_UI) are checked against
+the compiled map. Drift is reported when a pattern matches no widget or the
+wrong interrogatory, or when an interrogatory of the catalog has no
+checkbox, e.g. after the court publishes a new revision:
+
+    python3 scripts/form_map.py compile [disc001] [disc002] [--revision 2024-11]
+    python3 scripts/form_map.py drift [disc001] [disc002] [--pdf new-revision.pdf]
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import hashlib
+import json
+import marshal
+import os
+import re
+import sys
+
+from interrogatory_catalog import CATALOGS
+from template_store import TEMPLATE_DIR, current_revision, load_template, template_revisions, template_sha256
+
+# Bump when the map layout changes (maps of an older format are recompiled)
+FORM_MAP_FORMAT = 2
+
+FORM_MAP_MAGIC = b"FMAP"
+
+# Interrogatory number at the start of a checkbox tooltip ("6.1 Do...", "203.1Do...")
+TOOLTIP_NUMBER = re.compile(r"\s*(\d+\.\d+)(?![\d.])")
+
+# Drift kinds that mean a mapping table no longer fits the template
+# (the rest, e.g. "unmapped_number", are informational)
+DRIFT_ERRORS = frozenset({"stale_pattern", "wrong_widget", "missing_number", "unknown_number"})
+
+# (form_id, template sha256) -> FormMap
+_map_cache = {}
+
+
+class FormMap:
+    """Compiled widget map of one form template."""
+
+    def __init__(self, form_id: str, template_hash: str, page_rects: list, widgets: list, on_states: dict,
+                 revision: str = None, doc_id: str = None):
+        """
+        Build the map.
+
+        Args:
+            form_id: Template id ("disc001" or "disc002")
+            template_hash: SHA-256 of the compiled template
+            page_rects: (x0, y0, x1, y1) of every page
+            widgets: (field path, xref, page, rect, field type, number or None)
+                for every widget in page order
+            on_states: Checkbox xref -> (on state name, xref of the field holding /V)
+            revision: Manifest revision name of the template
+            doc_id: Permanent trailer /ID of the template (hex), if it has one
+        """
+        self.form_id = form_id
+        self.template_sha256 = template_hash
+        self.page_rects = page_rects
+        self.widgets = widgets
+        self.on_states = on_states
+        self.revision = revision
+        self.doc_id = doc_id
+        self.version = f"{FORM_MAP_FORMAT}.{template_hash[:12]}"
+        # Checkbox field path -> interrogatory number
+        self.numbers = {}
+        # Interrogatory number -> [(page, xref, field path)]
+        self.by_number = {}
+        for path, xref, page_idx, _rect, field_type, number in widgets:
+            if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX and number:
+                self.numbers[path] = number
+                self.by_number.setdefault(number, []).append((page_idx, xref, path))
+
+    def checkbox_lookup(self, mapped: frozenset, to_ui: dict = None) -> dict:
+        """
+        Return checkbox field path -> UI number for a reader.
+
+        Args:
+            mapped: UI numbers the reader reports (other checkboxes map to None)
+            to_ui: Interrogatory number -> legacy UI number (e.g. "4.1" -> "17")
+
+        Returns:
+            Dictionary holding every numbered checkbox of the template
+        """
+        lookup = {}
+        for path, number in self.numbers.items():
+            ui = (to_ui or {}).get(number, number)
+            lookup[path] = ui if ui in mapped else None
+        return lookup
+
+    def of_type(self, field_type: int) -> list:
+        """Return the widgets of one PyMuPDF field type."""
+        return [widget for widget in self.widgets if widget[4] == field_type]
+
+    def to_bytes(self) -> bytes:
+        return FORM_MAP_MAGIC + marshal.dumps((FORM_MAP_FORMAT, self.form_id, self.template_sha256,
+                                               self.page_rects, self.widgets, self.on_states,
+                                               self.revision, self.doc_id))
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Load a map written by to_bytes(), or return None if it is of another format."""
+        if not data.startswith(FORM_MAP_MAGIC):
+            return None
+        try:
+            fields = marshal.loads(data[len(FORM_MAP_MAGIC):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(fields, tuple) or len(fields) != 8 or fields[0] != FORM_MAP_FORMAT:
+            return None
+        return cls(*fields[1:])
+
+
+def document_id(doc):
+    """Return the permanent half of a document's trailer /ID as hex, or None."""
+    kind, value = doc.xref_get_key(-1, "ID")
+    if kind != "array":
+        return None
+    match = re.match(r"\[\s*<([0-9A-Fa-f]+)>", value)
+    return match.group(1).upper() if match else None
+
+
+def field_xref(doc, xref: int) -> int:
+    """Return the field object holding a widget's /V (its parent if the widget has no /T)."""
+    if doc.xref_get_key(xref, "T")[0] == "null" and doc.xref_get_key(xref, "Parent")[0] == "xref":
+        return int(doc.xref_get_key(xref, "Parent")[1].split()[0])
+    return xref
+
+
+def scan_widgets(doc) -> list:
+    """
+    Scan every widget of a document.
+
+    Args:
+        doc: Opened PDF document
+
+    Returns:
+        List of dictionaries with page (0-based), xref, name, type, rect,
+        value, tooltip, number (from the tooltip, checkboxes only) and
+        on_state (checkboxes only), in page order
+    """
+    widgets = []
+    for page in doc:
+        for widget in page.widgets():
+            checkbox = widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX
+            kind, tooltip = doc.xref_get_key(widget.xref, "TU")
+            tooltip = tooltip if kind == "string" else ""
+            match = TOOLTIP_NUMBER.match(tooltip) if checkbox else None
+            widgets.append({
+                "page": page.number,
+                "xref": widget.xref,
+                "name": widget.field_name or "",
+                "type": widget.field_type,
+                "rect": tuple(widget.rect),
+                "value": widget.field_value,
+                "tooltip": tooltip,
+                "number": match.group(1) if match else None,
+                "on_state": widget.on_state() if checkbox else None,
+            })
+    return widgets
+
+
+def compile_form_map(doc, form_id: str, template_hash: str, revision: str = None) -> FormMap:
+    """
+    Compile the widget map of an opened template.
+
+    Args:
+        doc: Opened template document
+        form_id: Template id ("disc001" or "disc002")
+        template_hash: SHA-256 of the template bytes
+        revision: Manifest revision name of the template
+
+    Returns:
+        The compiled FormMap
+    """
+    widgets = []
+    on_states = {}
+    for widget in scan_widgets(doc):
+        widgets.append((widget["name"], widget["xref"], widget["page"], widget["rect"],
+                        widget["type"], widget["number"]))
+        if widget["type"] == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+            on_states[widget["xref"]] = (widget["on_state"], field_xref(doc, widget["xref"]))
+    page_rects = [tuple(page.rect) for page in doc]
+    return FormMap(form_id, template_hash, page_rects, widgets, on_states, revision, document_id(doc))
+
+
+def form_map_path(form_id: str, revision: str = None) -> str:
+    """Return the path of a template revision's compiled map."""
+    return os.path.join(TEMPLATE_DIR, f"{form_id}-{revision or current_revision(form_id)}.formmap")
+
+
+def compile_template(form_id: str, revision: str = None, save: bool = True) -> FormMap:
+    """
+    Compile the map of a local template and optionally write it out.
+
+    Args:
+        form_id: Template id from the manifest
+        revision: Revision name (default: the current revision)
+        save: Write the map next to the template
+
+    Returns:
+        The compiled FormMap
+    """
+    revision = revision or current_revision(form_id)
+    doc = fitz.open(stream=load_template(form_id, revision), filetype="pdf")
+    form_map = compile_form_map(doc, form_id, template_sha256(form_id, revision), revision)
+    doc.close()
+
+    if save:
+        path = form_map_path(form_id, revision)
+        with open(path + ".tmp", "wb") as f:
+            f.write(form_map.to_bytes())
+        os.replace(path + ".tmp", path)
+    return form_map
+
+
+def load_form_map(form_id: str, revision: str = None):
+    """Load a template revision's compiled map, or return None if it is missing, stale or unreadable."""
+    revision = revision or current_revision(form_id)
+    try:
+        with open(form_map_path(form_id, revision), "rb") as f:
+            form_map = FormMap.from_bytes(f.read())
+    except OSError:
+        return None
+    if (form_map is None or form_map.form_id != form_id or form_map.revision != revision
+            or form_map.template_sha256 != template_sha256(form_id, revision)):
+        return None
+    return form_map
+
+
+def get_form_map(form_id: str, revision: str = None) -> FormMap:
+    """
+    Return the compiled map of a template revision, loading it once per process.
+
+    A missing or stale map is compiled from the template (not written out).
+    """
+    revision = revision or current_revision(form_id)
+    key = (form_id, template_sha256(form_id, revision))
+    form_map = _map_cache.get(key)
+    if form_map is None:
+        form_map = load_form_map(form_id, revision)
+        if form_map is None:
+            print(f"Form map for {form_id} ({revision}) is missing or stale; compiling it from the template "
+                  f"(run: python3 scripts/form_map.py compile {form_id} --revision {revision})", file=sys.stderr)
+            form_map = compile_template(form_id, revision, save=False)
+        _map_cache[key] = form_map
+    return form_map
+
+
+def form_revisions(form_id: str) -> list:
+    """Return the compiled maps of every registered revision of a form, the current one first."""
+    return [get_form_map(form_id, revision) for revision in template_revisions(form_id)]
+
+
+def registry_version(form_id: str) -> str:
+    """Return a version string that changes whenever a revision of the form is added or changed."""
+    return "+".join(form_map.version for form_map in form_revisions(form_id))
+
+
+def match_form_map(doc, form_id: str, field_names=None):
+    """
+    Return the map of the revision a served form was made from.
+
+    Args:
+        doc: Opened PDF document
+        form_id: Template id ("disc001" or "disc002")
+        field_names: Checkbox field names of the document; without them only
+            the trailer /ID is compared
+
+    Returns:
+        The FormMap of the matching revision, or None when neither the
+        trailer /ID nor any checkbox name matches a registered revision
+    """
+    revisions = form_revisions(form_id)
+    doc_id = document_id(doc)
+    if doc_id:
+        for form_map in revisions:
+            if form_map.doc_id == doc_id:
+                return form_map
+    if not field_names:
+        return None
+
+    # The revision sharing the most checkbox names (the current one on a tie)
+    names = set(field_names)
+    best, best_shared = None, 0
+    for form_map in revisions:
+        shared = len(names.intersection(form_map.numbers))
+        if shared > best_shared:
+            best, best_shared = form_map, shared
+    return best
+
+
+def mapping_tables(form_id: str, revision: str = None) -> tuple:
+    """
+    Return the hand-written mapping tables of a form.
+
+    The checkbox tables are written for the current revision; older
+    revisions bind checkboxes through their tooltip numbers, so only the
+    text patterns are returned for them.
+
+    Returns:
+        (list of (table name, {pattern: UI number}, match kind), text patterns),
+        where match kind is "substring" (fill scripts) or "suffix" (readers)
+    """
+    # Imported here: the fill and read scripts load their maps through this module
+    if form_id == "disc001":
+        import fill_disc001 as fill
+        import read_disc001 as read
+        text_patterns = {}
+    else:
+        import fill_disc002 as fill
+        import read_disc002 as read
+        text_patterns = fill.TEXT_FIELD_PATTERNS
+    tables = [
+        (f"{fill.__name__}.UI_TO_CHECKBOX_FIELD",
+         {pattern: ui for ui, pattern in fill.UI_TO_CHECKBOX_FIELD.items()}, "substring"),
+        (f"{read.__name__}.CHECKBOX_FIELD_TO_UI", dict(read.CHECKBOX_FIELD_TO_UI), "suffix"),
+    ]
+    if revision and revision != current_revision(form_id):
+        tables = []
+    return tables, text_patterns
+
+
+def _leaf(path: str) -> str:
+    return path.rsplit(".", 1)[-1]
+
+
+def find_drift(form_map: FormMap, tables: list, text_patterns: dict = None) -> list:
+    """
+    Check mapping tables against a compiled map.
+
+    Args:
+        form_map: Compiled map of the template (or of a candidate revision)
+        tables: (table name, {pattern: UI number}, match kind) as from mapping_tables()
+        text_patterns: Text field key -> field name pattern
+
+    Returns:
+        List of drift entries {"kind", "table", "pattern", "number", "detail"}
+    """
+    from field_matcher import FieldMatcher
+
+    catalog = CATALOGS[form_map.form_id]
+    checkboxes = form_map.of_type(fitz.PDF_WIDGET_TYPE_CHECKBOX)
+    drift = []
+
+    def flag(kind, table, pattern, number, detail):
+        drift.append({"kind": kind, "table": table, "pattern": pattern, "number": number, "detail": detail})
+
+    numbered = set(form_map.by_number)
+    for number in catalog.numbers:
+        if number not in numbered:
+            flag("missing_number", None, None, number, "no checkbox tooltip starts with this number")
+    for number in sorted(numbered, key=catalog.sort_key):
+        if catalog.canonical(number) is None:
+            flag("unknown_number", None, None, number, "checkbox is not in the interrogatory catalog")
+
+    reached = set()
+    for table, mapping, kind in tables:
+        for pattern, ui in mapping.items():
+            number = catalog.canonical(ui) or ui
+            if kind == "substring":
+                hits = [widget for widget in checkboxes if pattern in widget[0]]
+            else:
+                matcher = FieldMatcher({pattern: ui})
+                hits = [widget for widget in checkboxes if matcher.match(widget[0])]
+            if not hits:
+                candidates = [_leaf(path) for _page, _xref, path in form_map.by_number.get(number, [])]
+                flag("stale_pattern", table, pattern, number,
+                     f"matches no checkbox (the template has {', '.join(candidates) or 'no checkbox'})")
+            for widget in hits:
+                if widget[5] and widget[5] != number:
+                    flag("wrong_widget", table, pattern, number,
+                         f"also matches {_leaf(widget[0])}, which is {widget[5]}")
+                elif widget[5]:
+                    reached.add(widget[5])
+    if tables:
+        for number in sorted(numbered - reached, key=catalog.sort_key):
+            flag("unmapped_number", None, None, number, "no mapping table reaches the checkbox")
+
+    text_fields = form_map.of_type(fitz.PDF_WIDGET_TYPE_TEXT)
+    for key, pattern in (text_patterns or {}).items():
+        if not any(pattern in widget[0] for widget in text_fields):
+            flag("stale_pattern", "TEXT_FIELD_PATTERNS", pattern, key, "matches no text field")
+    return drift
+
+
+def print_drift(form_id: str, drift: list) -> int:
+    """Print drift entries to stderr and return the number of errors."""
+    errors = [entry for entry in drift if entry["kind"] in DRIFT_ERRORS]
+    for entry in errors:
+        where = f"{entry['table']} {entry['pattern']!r}: " if entry["pattern"] else ""
+        print(f"  [drift] {form_id} {entry['number']} {entry['kind']}: {where}{entry['detail']}", file=sys.stderr)
+    unmapped = [entry["number"] for entry in drift if entry["kind"] == "unmapped_number"]
+    if unmapped:
+        print(f"  [info] {form_id} checkboxes no mapping table reaches: {', '.join(unmapped)}", file=sys.stderr)
+    print(f"{form_id}: {len(errors)} drift errors", file=sys.stderr)
+    return len(errors)
+
+
+def compile_raster_reference(form_id: str, revision: str):
+    """Write the scanned-form reference of a template revision (raster_marks.py) next to its map."""
+    # Imported here: raster_marks builds on this module
+    from raster_marks import compile_reference, raster_map_path
+
+    compile_reference(form_id, revision)
+    print(f"Wrote {raster_map_path(form_id, revision)}", file=sys.stderr)
+
+
+def compile_and_check(form_id: str, revision: str = None) -> int:
+    """
+    Compile and write a template revision's map, then print its mapping drift.
+
+    Returns:
+        The number of drift errors
+    """
+    form_map = compile_template(form_id, revision)
+    print(f"Wrote {form_map_path(form_id, form_map.revision)} ({len(form_map.widgets)} widgets, "
+          f"version {form_map.version})", file=sys.stderr)
+    compile_raster_reference(form_id, form_map.revision)
+    tables, text_patterns = mapping_tables(form_id, form_map.revision)
+    return print_drift(form_id, find_drift(form_map, tables, text_patterns))
+
+
+def main():
+    """Main entry point - compile form maps or report mapping drift."""
+    import argparse  # only the CLI needs it; the fill/read paths import this module
+
+    parser = argparse.ArgumentParser(description="Compile DISC-001/DISC-002 form maps and check mapping drift")
+    parser.add_argument("command", choices=["compile", "drift"])
+    parser.add_argument("forms", nargs="*", help="Form ids (default: every form in the catalog)")
+    parser.add_argument("--pdf", help="Check drift against this PDF (e.g. a new revision) instead of the template")
+    parser.add_argument("--revision", help="Template revision (default: compile every revision, "
+                                           "check the current one)")
+    parser.add_argument("--json", action="store_true", help="Print the drift entries as JSON on stdout")
+    args = parser.parse_args()
+
+    forms = args.forms or list(CATALOGS)
+    if args.pdf and len(forms) != 1:
+        parser.error("--pdf needs exactly one form id")
+
+    errors = 0
+    report = {}
+    for form_id in forms:
+        if args.pdf:
+            with open(args.pdf, "rb") as f:
+                pdf_bytes = f.read()
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            form_map = compile_form_map(doc, form_id, hashlib.sha256(pdf_bytes).hexdigest())
+            doc.close()
+        elif args.command == "compile":
+            compiled = {}
+            for revision in [args.revision] if args.revision else template_revisions(form_id):
+                compiled[revision] = compile_template(form_id, revision)
+                print(f"Wrote {form_map_path(form_id, revision)} ({len(compiled[revision].widgets)} widgets, "
+                      f"version {compiled[revision].version})", file=sys.stderr)
+                compile_raster_reference(form_id, revision)
+            # The mapping tables are written for the current revision
+            form_map = compiled[args.revision or current_revision(form_id)]
+        else:
+            form_map = compile_template(form_id, args.revision, save=False)
+        tables, text_patterns = mapping_tables(form_id, form_map.revision)
+        report[form_id] = find_drift(form_map, tables, text_patterns)
+        errors += print_drift(form_id, report[form_id])
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if args.command == "drift" and errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Persistent DISC-001/DISC-002 Form Worker
+Serves fill/read/analyze jobs over a JSON-lines stdin/stdout protocol so the
+interpreter startup, the fitz import and the mapping-table build are paid once
+per process instead of once per request.
+
+Protocol - one JSON object per line in each direction:
+
+  Request:  {"id": "42", "op": "fill_disc001", "data": {...}, "profile": "max"}
+            Fill ops take "fill_mode": "deferred" (see widget_index.FILL_MODES)
+            and "revision": "2024-11" (default: the form's current revision).
+            {"id": "43", "op": "read_disc002", "pdf": "<base64>", "debug": false}
+            {"id": "43", "op": "read_form", "pdf": "<base64>"}      (detects DISC-001/002)
+            {"id": "43", "op": "read_form", "path": "/srv/packets/smith.pdf"}
+            Read ops take "all_checkboxes": true to include the per-checkbox dump.
+            A "path" is memory-mapped instead of shipped inline, so a large
+            packet is neither copied into the request nor onto the heap.
+            {"id": "44", "op": "analyze", "pdf": "<base64>"}
+            {"id": "45", "op": "ping"}
+            {"id": "46", "op": "stats"}
+            {"id": "47", "op": "shutdown"}
+
+  Reply:    {"id": "42", "ok": true, "pdf": "<base64>", "metrics": {...}}  (fill jobs)
+            {"id": "43", "ok": true, "result": {...}}                      (read/analyze jobs)
+            {"id": "44", "ok": false, "error": "..."}
+
+On startup the worker writes {"id": null, "ok": true, "ready": true} once the
+fill/read modules are imported. Every reply carries the id of its request.
+All diagnostic output goes to stderr; stdout carries protocol lines only.
+
+Pool mode (--workers=N, or "auto" for one per usable CPU) serves the same
+protocol from N processes. The supervisor imports everything, runs one
+warm-up fill and read of each form (templates verified, form maps and
+widget indexes built, fonts loaded), freezes the garbage collector and only
+then forks the workers, so they share that state copy-on-write instead of
+each building its own. The supervisor queues jobs and hands each to an
+idle worker, so replies can arrive out of order. A worker that dies or runs
+past FORM_POOL_JOB_TIMEOUT seconds is replaced by a fresh fork. Its job
+fails with an error reply. The pool answers {"op": "pool"} itself with its
+worker pids and counters, and "ready" is sent once every worker is up:
+
+    {"id": null, "ok": true, "ready": true, "pid": 123, "workers": 8}
+
+Every worker samples its memory after each job (memory_guard.py): the
+MuPDF store is emptied once the worker holds FORM_STORE_LIMIT_MB above its
+warm baseline, and a pool worker above FORM_WORKER_MAX_RSS_MB is recycled
+after its reply. "stats" (one process) and "pool" report the peak RSS per
+job type.
+
+`--check` runs the pool warm-up once (a fill in every fill mode of each
+form, read back) with the fill cache off and exits non-zero if any failed:
+
+    python3 scripts/form_worker.py --check
+"""
+
+import base64
+import collections
+import gc
+import json
+import os
+import selectors
+import signal
+import sys
+import time
+
+from form_io import claim_stdout, map_file, write_json
+
+# Claim stdout for the protocol before anything else can write to it. Any
+# print() in the fill/read modules (and any warning MuPDF writes to fd 1)
+# is sent to stderr instead.
+_protocol_out = claim_stdout()
+
+from fill_disc001 import fill_disc001_to_bytes  # noqa: E402
+from fill_disc002 import fill_disc002_to_bytes  # noqa: E402
+from read_disc001 import read_disc001_from_bytes  # noqa: E402
+from read_disc002 import read_disc002_from_bytes  # noqa: E402
+from read_form import read_form  # noqa: E402
+from analyze_disc002 import analyze_disc002_from_bytes  # noqa: E402
+from instrumentation import PhaseTimer  # noqa: E402
+from memory_guard import MemoryGuard, merge_job_stats, rss_bytes, trim_store  # noqa: E402
+from raster_marks import prepare as prepare_raster  # noqa: E402
+from widget_index import FILL_MODES  # noqa: E402
+from result_cache import get_fill_cache, get_read_cache  # noqa: E402
+
+# Seconds a pooled job may run before its worker is killed and replaced
+# (below the Node client's 60 s timeout, so one stuck job does not cost the pool)
+POOL_JOB_TIMEOUT = float(os.environ.get("FORM_POOL_JOB_TIMEOUT") or 55)
+
+# Bytes read from a pipe at a time by the pool supervisor
+PIPE_CHUNK = 1 << 16
+
+# Prefix of the memory sample a pool worker writes before each reply
+MEMORY_LINE = b'{"memory":'
+
+# Warm-up fill data per form: a text field and a checkbox, so every branch of
+# each fill mode runs and the read-back can be checked
+WARM_UP_DATA = {
+    "disc001": {"attorney_name": "Warm Up", "selected_sections": ["1"]},
+    "disc002": {"attorney_name": "Warm Up", "selected_sections": ["200.1"]},
+}
+
+# Memory guard of this worker process (set once it starts serving)
+_memory_guard = None
+
+
+def _decode_pdf(job: dict):
+    """Return the PDF of a job: the file at "path" (memory-mapped) or the inline "pdf" bytes."""
+    if job.get("path"):
+        return map_file(job["path"])
+    # Popped so the base64 text is freed before the PDF is read
+    pdf = job.pop("pdf", None)
+    if not pdf:
+        raise ValueError("Job is missing a 'path' or the inline 'pdf' field")
+    return base64.b64decode(pdf)
+
+
+def _encode_pdf(pdf_bytes: bytes) -> str:
+    return base64.b64encode(pdf_bytes).decode("ascii")
+
+
+def _fill_disc001(job: dict) -> dict:
+    metrics = PhaseTimer()
+    pdf_bytes = fill_disc001_to_bytes(job.get("data") or {}, job.get("profile"), metrics, job.get("fill_mode"),
+                                      job.get("revision"))
+    return {"pdf": _encode_pdf(pdf_bytes), "metrics": metrics.as_dict()}
+
+
+def _fill_disc002(job: dict) -> dict:
+    metrics = PhaseTimer()
+    pdf_bytes = fill_disc002_to_bytes(job.get("data") or {}, job.get("profile"), metrics, job.get("fill_mode"),
+                                      job.get("revision"))
+    return {"pdf": _encode_pdf(pdf_bytes), "metrics": metrics.as_dict()}
+
+
+def _read_disc001(job: dict) -> dict:
+    return {"result": read_disc001_from_bytes(_decode_pdf(job), all_checkboxes=bool(job.get("all_checkboxes")))}
+
+
+def _read_disc002(job: dict) -> dict:
+    return {"result": read_disc002_from_bytes(_decode_pdf(job), debug=bool(job.get("debug")),
+                                              all_checkboxes=bool(job.get("all_checkboxes")))}
+
+
+def _read_form(job: dict) -> dict:
+    return {"result": read_form(pdf_bytes=_decode_pdf(job), form=job.get("form"),
+                                all_checkboxes=bool(job.get("all_checkboxes")))}
+
+
+def _analyze(job: dict) -> dict:
+    return {"result": analyze_disc002_from_bytes(_decode_pdf(job))}
+
+
+def _ping(job: dict) -> dict:
+    return {"result": {"pid": os.getpid()}}
+
+
+def _stats(job: dict) -> dict:
+    return {"result": {"fill_cache": get_fill_cache().stats(), "read_cache": get_read_cache().stats(),
+                       "memory": _memory_guard.stats() if _memory_guard else None}}
+
+
+# Maps protocol op -> handler returning the reply payload
+JOB_HANDLERS = {
+    "fill_disc001": _fill_disc001,
+    "fill_disc002": _fill_disc002,
+    "read_disc001": _read_disc001,
+    "read_disc002": _read_disc002,
+    "read_form": _read_form,
+    "analyze": _analyze,
+    "ping": _ping,
+    "stats": _stats,
+}
+
+
+def write_reply(reply: dict):
+    """Write one protocol line to the real stdout."""
+    write_json(_protocol_out, reply)
+
+
+def handle_job(job: dict) -> dict:
+    """
+    Run a single job and build its reply.
+
+    Args:
+        job: Decoded request object
+
+    Returns:
+        Reply dictionary (always carries the request id)
+    """
+    job_id = job.get("id")
+    op = job.get("op")
+    handler = JOB_HANDLERS.get(op)
+    if handler is None:
+        return {"id": job_id, "ok": False, "error": f"Unknown op: {op}"}
+
+    try:
+        reply = {"id": job_id, "ok": True}
+        reply.update(handler(job))
+        return reply
+    except Exception as e:
+        print(f"Job {job_id} ({op}) failed: {e}", file=sys.stderr)
+        return {"id": job_id, "ok": False, "error": str(e)}
+
+
+def warm_up() -> list:
+    """
+    Fill each form in every fill mode and read it back in this process, and
+    load what scanned reads need (NumPy and the template raster references).
+
+    Also serves as a check of the fill modes that are rarely used: a mode
+    that fails or loses the checked section is reported.
+
+    Returns:
+        Error messages (empty when every warm-up job succeeded)
+    """
+    errors = []
+    for form_id, fill, read in (("disc001", fill_disc001_to_bytes, read_disc001_from_bytes),
+                                ("disc002", fill_disc002_to_bytes, read_disc002_from_bytes)):
+        data = WARM_UP_DATA[form_id]
+        for fill_mode in FILL_MODES:
+            try:
+                result = read(fill(data, metrics=PhaseTimer(), fill_mode=fill_mode))
+                if not result["success"]:
+                    errors.append(f"{read.__name__} ({fill_mode}): {result['error']}")
+                elif result["selected_interrogatories"] != data["selected_sections"]:
+                    errors.append(f"{fill.__name__} ({fill_mode}): read back "
+                                  f"{result['selected_interrogatories']}, expected {data['selected_sections']}")
+            except Exception as e:
+                errors.append(f"{fill.__name__} ({fill_mode}): {type(e).__name__}: {e}")
+    for form_id in ("disc001", "disc002"):
+        try:
+            prepare_raster(form_id)
+        except Exception as e:
+            errors.append(f"prepare_raster({form_id}): {e}")
+    return errors
+
+
+def pool_size(value: str = None) -> int:
+    """Return the worker count for a --workers value ("auto": one per usable CPU)."""
+    if value and value != "auto":
+        return max(1, int(value))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+class _PoolWorker:
+    """Supervisor-side state of one forked worker."""
+
+    def __init__(self, pid: int, job_fd: int, reply_fd: int):
+        self.pid = pid
+        self.job_fd = job_fd
+        self.reply_fd = reply_fd
+        self.buffer = b""
+        self.ready = False
+        # (job id, op, start time) of the job in flight
+        self.job = None
+        self.killed = None
+        # Set when the worker asked to be recycled after its current job
+        self.retiring = False
+
+
+class WorkerPool:
+    """Pre-forked pool of form workers behind one JSON-lines stream."""
+
+    def __init__(self, size: int, job_timeout: float = POOL_JOB_TIMEOUT):
+        self.size = size
+        self.job_timeout = job_timeout
+        self.workers = []
+        self.queue = collections.deque()
+        self.selector = selectors.DefaultSelector()
+        self.counters = {"completed": 0, "crashed": 0, "restarts": 0, "timeouts": 0,
+                         "recycled": 0, "store_trims": 0}
+        # op -> {"jobs", "peak_mb"} over every worker
+        self.memory = {}
+        self.announced = False
+        self.closing = False
+        # Reply to a shutdown op, sent once the jobs in flight are done
+        self.shutdown_reply = None
+
+    def _fork(self):
+        job_r, job_w = os.pipe()
+        reply_r, reply_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child: keep only its own pipe ends (EOF detection depends on it)
+            try:
+                for worker in self.workers:
+                    os.close(worker.job_fd)
+                    os.close(worker.reply_fd)
+                os.close(job_w)
+                os.close(reply_r)
+                os.close(sys.stdin.fileno())
+                _protocol_out.close()
+                _worker_loop(job_r, reply_w)
+            finally:
+                os._exit(0)
+        os.close(job_r)
+        os.close(reply_w)
+        worker = _PoolWorker(pid, job_w, reply_r)
+        self.workers.append(worker)
+        self.selector.register(reply_r, selectors.EVENT_READ, worker)
+
+    def start(self):
+        """Fork the workers (call after warm-up)."""
+        gc.collect()
+        # Keep the warm objects out of later collections, so the workers'
+        # garbage collector never writes to (and copies) the shared pages
+        gc.freeze()
+        for _ in range(self.size):
+            self._fork()
+
+    def stats(self) -> dict:
+        rss = rss_bytes()
+        return {
+            "workers": [worker.pid for worker in self.workers],
+            "busy": sum(1 for worker in self.workers if worker.job),
+            "queued": len(self.queue),
+            **self.counters,
+            "supervisor_rss_mb": round(rss / (1 << 20), 1) if rss else None,
+            "memory": {op: dict(stats) for op, stats in self.memory.items()},
+        }
+
+    def _accept(self, line: bytes):
+        """Queue one request line (or answer it here)."""
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            write_reply({"id": None, "ok": False, "error": f"Invalid JSON: {e}"})
+            return
+        if not isinstance(job, dict):
+            write_reply({"id": None, "ok": False, "error": "Job must be a JSON object"})
+            return
+        op = job.get("op")
+        if op == "shutdown":
+            self.closing = True
+            self.shutdown_reply = {"id": job.get("id"), "ok": True}
+        elif op == "pool":
+            write_reply({"id": job.get("id"), "ok": True, "result": self.stats()})
+        elif not self.closing:
+            self.queue.append((job.get("id"), op, line))
+
+    def _dispatch(self):
+        for worker in self.workers:
+            if not self.queue:
+                return
+            if worker.ready and worker.job is None and worker.killed is None and not worker.retiring:
+                job_id, op, line = self.queue.popleft()
+                try:
+                    view = memoryview(line + b"\n")
+                    while view:
+                        view = view[os.write(worker.job_fd, view):]
+                except OSError:
+                    # Worker already gone; its reaping replaces it
+                    self.queue.appendleft((job_id, op, line))
+                    worker.killed = "died"
+                    continue
+                worker.job = (job_id, op, time.monotonic())
+
+    def _reap(self, worker: _PoolWorker):
+        """Replace a worker whose reply pipe closed, failing its job in flight."""
+        self.selector.unregister(worker.reply_fd)
+        os.close(worker.reply_fd)
+        os.close(worker.job_fd)
+        _pid, status = os.waitpid(worker.pid, 0)
+        self.workers.remove(worker)
+        if worker.job is not None:
+            job_id, op, _started = worker.job
+            reason = worker.killed or f"exited with status {status}"
+            self.counters["crashed"] += 1
+            write_reply({"id": job_id, "ok": False, "error": f"Pool worker {worker.pid} {reason} during {op}"})
+        if self.closing:
+            return
+        if worker.retiring and worker.job is None:
+            self.counters["recycled"] += 1
+        else:
+            print(f"Pool worker {worker.pid} exited (status {status}); forking a replacement", file=sys.stderr)
+            self.counters["restarts"] += 1
+        self._fork()
+
+    def _read_worker(self, worker: _PoolWorker):
+        chunk = os.read(worker.reply_fd, PIPE_CHUNK)
+        if not chunk:
+            self._reap(worker)
+            return
+        worker.buffer += chunk
+        while b"\n" in worker.buffer:
+            line, worker.buffer = worker.buffer.split(b"\n", 1)
+            if not worker.ready:
+                worker.ready = True
+                continue
+            if line.startswith(MEMORY_LINE):
+                sample = json.loads(line)["memory"]
+                merge_job_stats(self.memory, sample)
+                self.counters["store_trims"] += sample["trimmed"]
+                worker.retiring = sample["recycle"]
+                continue
+            # Forward the reply as written; its id belongs to the job in flight
+            _protocol_out.write(line + b"\n")
+            _protocol_out.flush()
+            worker.job = None
+            self.counters["completed"] += 1
+
+    def _expire(self):
+        """Kill workers whose job ran past the timeout."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.job and worker.killed is None and now - worker.job[2] > self.job_timeout:
+                worker.killed = f"timed out after {self.job_timeout:g} s"
+                self.counters["timeouts"] += 1
+                os.kill(worker.pid, signal.SIGKILL)
+
+    def _next_deadline(self):
+        started = [worker.job[2] for worker in self.workers if worker.job and worker.killed is None]
+        if not started:
+            return None
+        return max(0.0, min(started) + self.job_timeout - time.monotonic())
+
+    def serve(self):
+        """Serve the protocol on stdin/stdout until stdin closes or a shutdown op arrives."""
+        stdin_fd = sys.stdin.fileno()
+        self.selector.register(stdin_fd, selectors.EVENT_READ, None)
+        pending = b""
+        while not (self.closing and not self.queue and not any(worker.job for worker in self.workers)):
+            for key, _events in self.selector.select(self._next_deadline()):
+                if key.data is not None:
+                    self._read_worker(key.data)
+                    continue
+                chunk = os.read(stdin_fd, PIPE_CHUNK)
+                if not chunk:
+                    self.closing = True
+                    self.selector.unregister(stdin_fd)
+                    continue
+                pending += chunk
+                while b"\n" in pending and not self.closing:
+                    line, pending = pending.split(b"\n", 1)
+                    if line.strip():
+                        self._accept(line.strip())
+            if not self.announced and all(worker.ready for worker in self.workers):
+                self.announced = True
+                write_reply({"id": None, "ok": True, "ready": True, "pid": os.getpid(),
+                             "workers": len(self.workers)})
+            self._expire()
+            self._dispatch()
+
+        # Closing the job pipes ends the workers' loops
+        for worker in list(self.workers):
+            os.close(worker.job_fd)
+            os.close(worker.reply_fd)
+            os.waitpid(worker.pid, 0)
+        self.workers = []
+        if self.shutdown_reply is not None:
+            write_reply(self.shutdown_reply)
+
+
+def _worker_loop(job_fd: int, reply_fd: int):
+    """Serve jobs from the supervisor's pipe (runs in a forked worker)."""
+    global _memory_guard
+    _memory_guard = MemoryGuard()
+    replies = os.fdopen(reply_fd, "wb")
+    write_json(replies, {"id": None, "ok": True, "ready": True, "pid": os.getpid()})
+    with os.fdopen(job_fd, "rb") as jobs:
+        for line in jobs:
+            job = json.loads(line)
+            del line  # an inline PDF is held by the job alone
+            _memory_guard.start_job()
+            reply = handle_job(job)
+            sample = _memory_guard.end_job(job.get("op"))
+            # The sample goes first, so the supervisor knows about a recycle
+            # before the reply frees the worker for another job
+            write_json(replies, {"memory": sample})
+            write_json(replies, reply)
+            if sample["recycle"]:
+                print(f"Pool worker {os.getpid()} at {sample['rss_mb']} MB; recycling", file=sys.stderr)
+                return
+
+
+def serve_pool(workers: int):
+    """Warm up, fork the pool and serve until stdin closes or a shutdown op arrives."""
+    for error in warm_up():
+        print(f"Warm-up failed: {error}", file=sys.stderr)
+    # Nothing the warm-up documents left in the MuPDF store is reused
+    trim_store()
+    pool = WorkerPool(workers)
+    pool.start()
+    pool.serve()
+
+
+def main():
+    """Main entry point - serves jobs until stdin closes or a shutdown op arrives."""
+    if "--check" in sys.argv[1:]:
+        # Cached fills would skip the fill paths being checked
+        os.environ["FORM_FILL_CACHE_ENTRIES"] = "0"
+        os.environ["FORM_FILL_CACHE_DIR"] = ""
+        errors = warm_up()
+        for error in errors:
+            print(f"Check failed: {error}", file=sys.stderr)
+        print(f"Fill modes checked: {', '.join(FILL_MODES)}; {len(errors)} errors", file=sys.stderr)
+        sys.exit(1 if errors else 0)
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--workers="):
+            workers = pool_size(arg.split("=", 1)[1])
+            if hasattr(os, "fork"):
+                serve_pool(workers)
+                return
+            print("Pool mode needs os.fork(); serving from one process", file=sys.stderr)
+
+    global _memory_guard
+    _memory_guard = MemoryGuard()
+    write_reply({"id": None, "ok": True, "ready": True, "pid": os.getpid()})
+
+    for line in sys.stdin.buffer:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            write_reply({"id": None, "ok": False, "error": f"Invalid JSON: {e}"})
+            continue
+        del line  # an inline PDF is held by the job alone
+
+        if not isinstance(job, dict):
+            write_reply({"id": None, "ok": False, "error": "Job must be a JSON object"})
+            continue
+
+        if job.get("op") == "shutdown":
+            write_reply({"id": job.get("id"), "ok": True})
+            break
+
+        _memory_guard.start_job()
+        reply = handle_job(job)
+        sample = _memory_guard.end_job(job.get("op"))
+        write_reply(reply)
+        if sample["recycle"]:
+            # Queued requests would be lost on exit; only a pool recycles
+            print(f"Worker at {sample['rss_mb']} MB, above FORM_WORKER_MAX_RSS_MB "
+                  f"(run with --workers to recycle)", file=sys.stderr)
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-Phase Instrumentation for the DISC-001/DISC-002 Scripts
+Collects wall-clock milliseconds per phase (template load, document open,
+widget scan, mapping, appearance update, save, ...) and counters (pages
+touched, widgets visited, ...) for a single fill or read, so slow requests
+can be attributed in production.
+
+Per-widget diagnostics go through the "forms" logger at DEBUG level. Callers
+check log.isEnabledFor(logging.DEBUG) once per call, so they cost nothing
+when disabled. The fillers log their per-fill progress and metrics at INFO
+and unmapped sections at WARNING. The level is set with FORM_LOG_LEVEL
+(default WARNING).
+"""
+
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+_root_logger = logging.getLogger("forms")
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(os.environ.get("FORM_LOG_LEVEL", "WARNING").upper())
+    _root_logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a child of the "forms" logger (e.g. "forms.fill_disc001")."""
+    return _root_logger.getChild(name)
+
+
+class PhaseTimer:
+    """Accumulates per-phase timings and counters for one fill or read."""
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block and add it to a phase (phases may be entered repeatedly)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self) -> dict:
+        """
+        Return the collected metrics.
+
+        Returns:
+            Dictionary with:
+            - total_ms: Wall time since the timer was created
+            - timings_ms: Phase name -> milliseconds
+            - counters: Counter name -> count
+        """
+        return {
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "timings_ms": {name: round(seconds * 1000, 3) for name, seconds in self.timings.items()},
+            "counters": dict(self.counters),
+        }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Canonical Interrogatory Catalog for DISC-001/DISC-002
+Every interrogatory printed on each form, in form order, plus the legacy UI
+numbers still used by the DISC-001 UI ("2" for 2.1, "17" for 4.1, ...).
+
+A selection can be held as a fixed-width bitmask (bit i = the i-th
+interrogatory in form order). Membership, union and intersection are then
+integer operations, and a selection serializes to a short hex string:
+
+    mask = DISC001.to_mask(["1", "16.10", "16.2"])
+    DISC001.from_mask(mask)          # ['1.1', '16.2', '16.10']
+    DISC001.to_hex(mask)             # fixed width, 22 hex digits for DISC-001
+
+Numbers sort as tuples of integers, so "16.10" comes after "16.9".
+"""
+
+
+def _numbers(section: int, count: int) -> list:
+    return [f"{section}.{n}" for n in range(1, count + 1)]
+
+
+# Interrogatories printed on the forms (section -> last number), in form order
+DISC001_SECTIONS = {
+    1: 1, 2: 13, 3: 7, 4: 2, 6: 7, 7: 3, 8: 8, 9: 2, 10: 3, 11: 2, 12: 7,
+    13: 2, 14: 2, 15: 1, 16: 10, 17: 1, 20: 11, 50: 6,
+}
+
+DISC002_SECTIONS = {
+    200: 6, 201: 7, 202: 2, 203: 1, 204: 7, 205: 1, 206: 3, 207: 2, 208: 2,
+    209: 2, 210: 6, 211: 3, 212: 7, 213: 2, 214: 2, 215: 2, 216: 1, 217: 1,
+}
+
+# Legacy DISC-001 UI numbers -> interrogatory number
+DISC001_UI_ALIASES = {
+    "1": "1.1", "2": "2.1", "3": "2.2", "4": "2.3", "5": "2.4",
+    "6": "2.5", "7": "2.6", "8": "2.7", "9": "2.8", "10": "2.9",
+    "11": "2.10", "12": "2.11", "17": "4.1",
+}
+
+
+def number_key(number: str) -> tuple:
+    """
+    Sort key ordering interrogatory numbers numerically ("16.2" < "16.10").
+
+    Non-numeric values sort after every number, in string order.
+    """
+    try:
+        return (0, tuple(int(part) for part in number.split(".")), "")
+    except (AttributeError, ValueError):
+        return (1, (), str(number))
+
+
+class InterrogatoryCatalog:
+    """Ordered interrogatory numbers of one form with bitmask conversion."""
+
+    def __init__(self, form_id: str, sections: dict, aliases: dict = None):
+        """
+        Build the catalog.
+
+        Args:
+            form_id: Template id ("disc001" or "disc002")
+            sections: Section number -> number of interrogatories in it
+            aliases: Legacy UI number -> interrogatory number
+        """
+        self.form_id = form_id
+        self.numbers = tuple(n for section, count in sections.items() for n in _numbers(section, count))
+        self.aliases = dict(aliases or {})
+        self.width = len(self.numbers)
+        self._bits = {number: i for i, number in enumerate(self.numbers)}
+        for alias, number in self.aliases.items():
+            if alias in self._bits or number not in self._bits:
+                raise ValueError(f"Bad alias {alias!r} -> {number!r} for {form_id}")
+            self._bits[alias] = self._bits[number]
+
+    def canonical(self, number: str):
+        """Return the interrogatory number for a number or legacy alias, or None."""
+        bit = self._bits.get(number)
+        return None if bit is None else self.numbers[bit]
+
+    def bit(self, number: str):
+        """Return the bit position of a number or alias, or None if unknown."""
+        return self._bits.get(number)
+
+    def to_mask(self, numbers, strict: bool = True) -> int:
+        """
+        Convert numbers (or aliases) to a bitmask.
+
+        Args:
+            numbers: Interrogatory numbers or legacy aliases
+            strict: Raise on numbers not on the form (otherwise skip them)
+
+        Raises:
+            ValueError: If strict and a number is not on the form
+        """
+        mask = 0
+        for number in numbers:
+            bit = self._bits.get(number)
+            if bit is None:
+                if strict:
+                    raise ValueError(f"Unknown {self.form_id} interrogatory {number!r}")
+                continue
+            mask |= 1 << bit
+        return mask
+
+    def from_mask(self, mask: int) -> list:
+        """Return the interrogatory numbers set in a bitmask, in form order."""
+        return [number for i, number in enumerate(self.numbers) if mask >> i & 1]
+
+    def contains(self, mask: int, number: str) -> bool:
+        """Return True if a number (or alias) is selected in a bitmask."""
+        bit = self._bits.get(number)
+        return bit is not None and bool(mask >> bit & 1)
+
+    def to_hex(self, mask: int) -> str:
+        """Serialize a bitmask as fixed-width hex."""
+        return format(mask, f"0{(self.width + 3) // 4}x")
+
+    def from_hex(self, text: str) -> int:
+        """Parse a bitmask serialized with to_hex()."""
+        mask = int(text, 16)
+        if mask >> self.width:
+            raise ValueError(f"Mask has bits beyond the {self.width} {self.form_id} interrogatories")
+        return mask
+
+    def sort_key(self, number: str) -> tuple:
+        """Form order for known numbers and aliases; unknown numbers follow numerically."""
+        bit = self._bits.get(number)
+        if bit is not None:
+            return (0, bit, number_key(number))
+        return (1, 0, number_key(number))
+
+    def sort(self, numbers) -> list:
+        """Sort numbers (and aliases) in form order."""
+        return sorted(numbers, key=self.sort_key)
+
+
+DISC001 = InterrogatoryCatalog("disc001", DISC001_SECTIONS, DISC001_UI_ALIASES)
+DISC002 = InterrogatoryCatalog("disc002", DISC002_SECTIONS)
+
+CATALOGS = {
+    "disc001": DISC001,
+    "disc002": DISC002,
+}
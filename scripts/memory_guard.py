@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Memory Guardrails for Long-Lived DISC-001/DISC-002 Workers
+Documents are opened from in-memory bytes and closed after every job, but
+MuPDF keeps what it decoded for them (images, fonts, parsed streams) in its
+resource store until the store reaches its compiled-in limit (256 MB by
+default). A worker that reads scanned forms grows by several MB per job.
+Nothing in the store is reused by later jobs, because every job opens its
+documents anew.
+
+PyMuPDF cannot set or read the store limit, so the cap is enforced from the
+outside. RSS is sampled after every job, and once the worker holds more than
+STORE_LIMIT_MB above its warm baseline, the store is emptied, garbage is
+collected and freed heap is returned to the OS (glibc malloc_trim, where
+available). A worker still above RECYCLE_RSS_MB after that asks to be
+recycled; the pool supervisor (form_worker.py --workers) replaces it with a
+fresh fork.
+
+The peak RSS of each job is read from VmHWM after resetting it through
+/proc/self/clear_refs (Linux). Elsewhere the RSS after the job is used, and
+where RSS cannot be read at all the guard only empties the store.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import gc
+import os
+import re
+
+try:
+    import ctypes
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (ImportError, OSError, AttributeError):  # not glibc
+    _malloc_trim = None
+
+# Memory (MB) a worker may hold above its warm baseline before the MuPDF
+# store is emptied (0 = empty it after every job)
+STORE_LIMIT_MB = float(os.environ.get("FORM_STORE_LIMIT_MB") or 32)
+
+# RSS (MB) after which a worker is recycled once its store was emptied (0 = never)
+RECYCLE_RSS_MB = float(os.environ.get("FORM_WORKER_MAX_RSS_MB") or 0)
+
+_MB = 1 << 20
+_HWM = re.compile(r"VmHWM:\s+(\d+) kB")
+
+
+def rss_bytes():
+    """Return the resident set size of this process, or None if it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _reset_peak() -> bool:
+    """Reset VmHWM to the current RSS (Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            match = _HWM.search(f.read())
+    except OSError:
+        return None
+    return int(match.group(1)) * 1024 if match else None
+
+
+def trim_store():
+    """Empty the MuPDF store, collect garbage and return freed heap to the OS."""
+    fitz.TOOLS.store_shrink(100)
+    gc.collect()
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+class MemoryGuard:
+    """Per-job RSS sampling, store trimming and recycle decisions for one worker."""
+
+    def __init__(self, store_limit_mb: float = STORE_LIMIT_MB, recycle_rss_mb: float = RECYCLE_RSS_MB):
+        """
+        Start guarding this process (call once it is warm, e.g. after fork).
+
+        Args:
+            store_limit_mb: MB above the baseline before the store is emptied
+            recycle_rss_mb: RSS in MB that asks for a recycle (0 = never)
+        """
+        self.store_limit = store_limit_mb * _MB
+        self.recycle_rss = recycle_rss_mb * _MB
+        self.baseline = rss_bytes()
+        self._before = self.baseline
+        self.peak_tracking = False
+        self.trims = 0
+        # op -> {"jobs", "peak_mb", "growth_peak_mb"}
+        self.jobs = {}
+
+    def start_job(self):
+        """Mark the start of a job (resets the peak RSS)."""
+        self.peak_tracking = _reset_peak()
+        self._before = rss_bytes()
+
+    def end_job(self, op: str) -> dict:
+        """
+        Sample memory after a job and trim the store if it is over the limit.
+
+        Args:
+            op: Job type the sample is recorded under
+
+        Returns:
+            Dictionary with op, rss_mb, peak_mb (this job's high-water mark),
+            trimmed (whether the store was emptied) and recycle (whether the
+            worker should be replaced)
+        """
+        rss = rss_bytes()
+        peak = _peak_bytes() if self.peak_tracking else None
+        if rss is None:
+            trim_store()
+            return {"op": op, "rss_mb": None, "peak_mb": None, "trimmed": True, "recycle": False}
+        peak = max(peak or 0, rss)
+
+        stats = self.jobs.setdefault(op, {"jobs": 0, "peak_mb": 0.0, "growth_peak_mb": 0.0})
+        stats["jobs"] += 1
+        stats["peak_mb"] = max(stats["peak_mb"], round(peak / _MB, 1))
+        stats["growth_peak_mb"] = max(stats["growth_peak_mb"], round((peak - self._before) / _MB, 1))
+
+        # Over either threshold: empty the store first, recycle only if that was not enough
+        trimmed = rss - self.baseline > self.store_limit or bool(self.recycle_rss) and rss > self.recycle_rss
+        if trimmed:
+            trim_store()
+            self.trims += 1
+            rss = rss_bytes() or rss
+        return {
+            "op": op,
+            "rss_mb": round(rss / _MB, 1),
+            "peak_mb": round(peak / _MB, 1),
+            "trimmed": trimmed,
+            "recycle": bool(self.recycle_rss) and rss > self.recycle_rss,
+        }
+
+    def stats(self) -> dict:
+        rss = rss_bytes()
+        return {
+            "baseline_mb": round(self.baseline / _MB, 1) if self.baseline else None,
+            "rss_mb": round(rss / _MB, 1) if rss else None,
+            "store_trims": self.trims,
+            "jobs": {op: dict(stats) for op, stats in self.jobs.items()},
+        }
+
+
+def merge_job_stats(total: dict, sample: dict):
+    """Fold one end_job() sample into op -> {"jobs", "peak_mb"} totals (for a supervisor)."""
+    if sample.get("peak_mb") is None:
+        return
+    stats = total.setdefault(sample["op"], {"jobs": 0, "peak_mb": 0.0})
+    stats["jobs"] += 1
+    stats["peak_mb"] = max(stats["peak_mb"], sample["peak_mb"])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Output Optimization for Filled DISC-001/DISC-002 PDFs
+Serializes a filled document with a selectable size/speed profile:
+
+    none     Plain save (fastest, ~430 KB for DISC-001)
+    compact  Garbage-collect and de-duplicate objects, deflate streams and
+             pack objects into object streams (~200 KB)
+    max      compact + deflate images and fonts, subset embedded fonts and
+             drop the XFA packets (~100 KB)
+
+The XFA packets are the bulk of the Judicial Council templates. The fill
+scripts only set the AcroForm widgets, so the XFA datasets in a filled PDF
+are stale anyway; dropping them makes every viewer render the AcroForm.
+
+The default profile is taken from FORM_OUTPUT_PROFILE (default "none", so a
+plain fill is saved as before). "compact" costs roughly 100-200 ms more per
+save for about half the size; callers opt in per fill with --profile= or a
+job's "profile", or for a whole deployment through the environment.
+
+    python3 scripts/pdf_output.py <input_pdf> [output_pdf] [--profile=max]
+
+reports the size of a PDF under every profile and optionally writes it out.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import os
+import sys
+import time
+
+from form_io import split_args
+
+# profile name -> save() options and extra document passes
+OUTPUT_PROFILES = {
+    "none": {
+        "save": {},
+        "subset_fonts": False,
+        "drop_xfa": False,
+    },
+    "compact": {
+        "save": {"garbage": 4, "deflate": True, "use_objstms": 1},
+        "subset_fonts": False,
+        "drop_xfa": False,
+    },
+    "max": {
+        "save": {"garbage": 4, "deflate": True, "deflate_images": True,
+                 "deflate_fonts": True, "use_objstms": 1},
+        "subset_fonts": True,
+        "drop_xfa": True,
+    },
+}
+
+# Profile used when a caller names none (FORM_OUTPUT_PROFILE)
+DEFAULT_PROFILE = os.environ.get("FORM_OUTPUT_PROFILE") or "none"
+
+
+def resolve_profile(profile: str = None) -> str:
+    """Return a valid profile name, falling back to the configured default."""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile {profile!r} (choose from {', '.join(OUTPUT_PROFILES)})")
+    return profile
+
+
+def profile_from_flags(flags: set) -> str:
+    """Return the profile named by a --profile=<name> flag, or the default."""
+    for flag in flags:
+        if flag.startswith("--profile="):
+            return resolve_profile(flag.split("=", 1)[1])
+    return resolve_profile()
+
+
+def drop_xfa(doc):
+    """Remove the XFA packets so viewers render the AcroForm widgets."""
+    catalog = doc.pdf_catalog()
+    if doc.xref_get_key(catalog, "AcroForm/XFA")[0] != "null":
+        doc.xref_set_key(catalog, "AcroForm/XFA", "null")
+
+
+def optimize_pdf(doc, profile: str = None) -> bytes:
+    """
+    Serialize a document with an output profile.
+
+    The document is modified in place by the "max" profile (fonts subset,
+    XFA removed), so call this last, right before closing it.
+
+    Args:
+        doc: Document to serialize
+        profile: Profile name from OUTPUT_PROFILES (default: FORM_OUTPUT_PROFILE)
+
+    Returns:
+        The PDF as bytes
+    """
+    options = OUTPUT_PROFILES[resolve_profile(profile)]
+    if options["drop_xfa"]:
+        drop_xfa(doc)
+    if options["subset_fonts"]:
+        doc.subset_fonts()
+    return doc.tobytes(**options["save"])
+
+
+def compare_profiles(pdf_bytes: bytes) -> dict:
+    """
+    Report the size and save time of a PDF under every profile.
+
+    Args:
+        pdf_bytes: PDF to measure
+
+    Returns:
+        Dictionary mapping profile name to {"bytes", "ratio", "seconds"}
+    """
+    report = {}
+    for profile in OUTPUT_PROFILES:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        start = time.perf_counter()
+        size = len(optimize_pdf(doc, profile))
+        elapsed = time.perf_counter() - start
+        doc.close()
+        report[profile] = {
+            "bytes": size,
+            "ratio": round(size / len(pdf_bytes), 3),
+            "seconds": round(elapsed, 3),
+        }
+    return report
+
+
+def main():
+    """Main entry point - compare profiles for a PDF and optionally write it out."""
+    args, flags = split_args(sys.argv[1:])
+    if not args:
+        print("Usage: pdf_output.py <input_pdf> [output_pdf] [--profile=none|compact|max]", file=sys.stderr)
+        sys.exit(1)
+
+    with open(args[0], "rb") as f:
+        pdf_bytes = f.read()
+
+    print(f"{args[0]}: {len(pdf_bytes):,} bytes")
+    for profile, result in compare_profiles(pdf_bytes).items():
+        print(f"  {profile:8} {result['bytes']:>10,} bytes  ({result['ratio']:.1%}, {result['seconds']:.3f}s)")
+
+    if len(args) > 1:
+        profile = profile_from_flags(flags)
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        output = optimize_pdf(doc, profile)
+        doc.close()
+        with open(args[1], "wb") as f:
+            f.write(output)
+        print(f"Wrote {args[1]} with profile '{profile}': {len(pdf_bytes):,} -> {len(output):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Raster Checkbox Reader for Scanned DISC-001/DISC-002 PDFs
+Scanned forms carry neither widgets nor vector marks: each page is an image.
+This module decides every checkbox from the share of dark pixels inside it.
+
+  1. Each page with checkboxes is rendered once, in grayscale at RENDER_DPI,
+     onto the template's pixel grid (scaled to the template page size).
+  2. Registration: the dark-pixel row and column profiles of the page (rules,
+     text lines, boxes) are cross-correlated with the blank template's to
+     find the scan's offset.
+  3. The dark-pixel share inside every box (border trimmed), shifted by that
+     offset, is computed for all boxes of the page at once by gathering one
+     equal-sized pixel window per box, minus the same share on the blank
+     template.
+
+The page is rendered whole rather than one clip per box: a scanned page is a
+single image, and every render decodes all of it again, so one render per
+page is the cheapest way to reach the boxes.
+
+The blank template's side of steps 2 and 3 (its profiles and box shares) is
+precompiled into <form_id>-<revision>.rastermap next to the template
+(compile_reference(), run by `form_map.py compile`), so a fresh process does
+not render the template pages before its first scanned read. A missing or
+stale file is rebuilt in-process.
+
+NumPy is optional and imported on the first scanned read only, since most
+reads never render a page. Without it the same steps run in pure Python on
+the pixmap bytes, several times slower.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import marshal
+import os
+import sys
+
+from flattened_marks import checkbox_regions
+from interrogatory_catalog import CATALOGS
+from template_store import TEMPLATE_DIR, current_revision, load_template, template_sha256
+
+# DPI of the page renders (a 9pt checkbox is 9 pixels wide)
+RENDER_DPI = 72
+
+# Largest scan offset searched for, in points
+MAX_SHIFT = 36
+
+# Share of the box trimmed from each side so the printed border is not counted
+BORDER_TRIM = 0.25
+
+# Gray level below which a pixel counts as ink
+DARK_LEVEL = 128
+
+# Extra dark-pixel share (over the blank template) that means "checked"
+FILL_THRESHOLD = 0.12
+
+# An image of at least this many pixels per page point counts as a page scan
+# (0.5 of the page at 100 DPI)
+SCAN_PIXELS_PER_POINT = 0.5 * (100 / 72) ** 2
+
+# Bump when the layout of the .rastermap files changes
+RASTER_MAP_FORMAT = 1
+RASTER_MAP_MAGIC = b"RASTERMAP\n"
+
+# (form id, template sha256) -> page -> (registration profiles, blank box shares)
+_template_cache = {}
+
+# NumPy once _numpy() has imported it (None before, or when it is not installed)
+np = None
+_numpy_checked = False
+
+
+def _numpy():
+    """Import NumPy on first use and return it (None: use the pure-Python path)."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # pure-Python pixel counts
+            pass
+    return np
+
+
+def is_scanned_page(page) -> bool:
+    """Return True if the page holds an image large enough to be a scan of it."""
+    needed = SCAN_PIXELS_PER_POINT * page.rect.get_area()
+    return any(image[2] * image[3] >= needed for image in page.get_images())
+
+
+def is_scanned_form(doc, form_id: str, revision: str = None) -> bool:
+    """Return True if every page of the document that carries checkboxes is a scan."""
+    _page_rects, template_regions = checkbox_regions(form_id, revision)
+    pages = [page_idx for page_idx in template_regions if page_idx < len(doc)]
+    return bool(pages) and all(is_scanned_page(doc[page_idx]) for page_idx in pages)
+
+
+def _render(page, sx: float = 1.0, sy: float = 1.0):
+    """Render a page in grayscale on the template's pixel grid."""
+    zoom = RENDER_DPI / 72
+    return page.get_pixmap(matrix=fitz.Matrix(zoom / sx, zoom / sy), colorspace=fitz.csGRAY, annots=False)
+
+
+def _box_pixels(regions: list, dx: int, dy: int, width: int, height: int) -> list:
+    """Return (number, x0, y0, x1, y1) pixel boxes (border trimmed, shifted, clamped)."""
+    zoom = RENDER_DPI / 72
+    boxes = []
+    for number, rect in regions:
+        trim_x = rect.width * BORDER_TRIM
+        trim_y = rect.height * BORDER_TRIM
+        x0 = min(max(int((rect.x0 + trim_x) * zoom) + dx, 0), width - 1)
+        y0 = min(max(int((rect.y0 + trim_y) * zoom) + dy, 0), height - 1)
+        x1 = min(max(int((rect.x1 - trim_x) * zoom) + dx, x0 + 1), width)
+        y1 = min(max(int((rect.y1 - trim_y) * zoom) + dy, y0 + 1), height)
+        boxes.append((number, x0, y0, x1, y1))
+    return boxes
+
+
+# Byte translation table mapping ink pixels to 1 and paper to 0 (pure-Python path)
+_INK = bytes(1 if level < DARK_LEVEL else 0 for level in range(256))
+
+
+def _ink(pixmap):
+    """Return a pixmap's ink mask: a 2-D bool array, or 0/1 bytes without NumPy."""
+    if np is not None:
+        rows = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+        return rows[:, :pixmap.width] < DARK_LEVEL
+    return pixmap.samples.translate(_INK)
+
+
+def _profiles(pixmap, ink) -> tuple:
+    """Return the ink count of every pixel row and column."""
+    if np is not None:
+        return ink.sum(axis=1).astype(float), ink.sum(axis=0).astype(float)
+    width, height, stride = pixmap.width, pixmap.height, pixmap.stride
+    rows = [ink[y * stride:y * stride + width].count(1) for y in range(height)]
+    columns = [ink[x:height * stride:stride].count(1) for x in range(width)]
+    return rows, columns
+
+
+def _best_lag(reference, current) -> int:
+    """Pixel lag of current relative to reference with the highest correlation."""
+    size = min(len(reference), len(current))
+    max_lag = int(MAX_SHIFT * RENDER_DPI / 72)
+    if np is not None:
+        reference = reference[:size] - reference[:size].mean()
+        current = current[:size] - current[:size].mean()
+        correlation = np.correlate(current, reference, mode="full")
+        lags = np.arange(len(correlation)) - (size - 1)
+        window = np.abs(lags) <= max_lag
+        return int(lags[window][np.argmax(correlation[window])])
+
+    ref_mean = sum(reference[:size]) / size
+    cur_mean = sum(current[:size]) / size
+    reference = [v - ref_mean for v in reference[:size]]
+    current = [v - cur_mean for v in current[:size]]
+    return max(range(-max_lag, max_lag + 1), key=lambda lag: sum(
+        reference[i] * current[i + lag] for i in range(max(0, -lag), min(size, size - lag))))
+
+
+def _shares(pixmap, ink, boxes: list) -> dict:
+    """Return number -> dark-pixel share for pixel boxes."""
+    if np is not None:
+        # Gather one equal-sized window per box and average them all at once
+        _numbers, x0, y0, x1, y1 = (np.array(column) for column in zip(*boxes))
+        height = max(1, int(np.min(y1 - y0)))
+        width = max(1, int(np.min(x1 - x0)))
+        rows = np.minimum(y0[:, None] + np.arange(height), ink.shape[0] - 1)
+        columns = np.minimum(x0[:, None] + np.arange(width), ink.shape[1] - 1)
+        windows = ink[rows[:, :, None], columns[:, None, :]]
+        return {box[0]: float(share) for box, share in zip(boxes, windows.mean(axis=(1, 2)))}
+
+    stride = pixmap.stride
+    shares = {}
+    for number, x0, y0, x1, y1 in boxes:
+        count = sum(ink[y * stride + x0:y * stride + x1].count(1) for y in range(y0, y1))
+        shares[number] = count / ((x1 - x0) * (y1 - y0))
+    return shares
+
+
+def raster_map_path(form_id: str, revision: str) -> str:
+    """Return where the precompiled reference of a template revision is stored."""
+    return os.path.join(TEMPLATE_DIR, f"{form_id}-{revision}.rastermap")
+
+
+def _reference_key(form_id: str, revision: str) -> tuple:
+    """Everything a stored reference depends on: its format, the template and the pixel settings."""
+    return (RASTER_MAP_FORMAT, form_id, revision, template_sha256(form_id, revision),
+            RENDER_DPI, BORDER_TRIM, DARK_LEVEL)
+
+
+def compile_reference(form_id: str, revision: str = None, save: bool = True) -> dict:
+    """
+    Render the blank template and compute its registration profiles and box shares.
+
+    Args:
+        form_id: Template id ("disc001" or "disc002")
+        revision: Template revision (default: the current revision)
+        save: Write the reference next to the template
+
+    Returns:
+        Page -> ((row profile, column profile), {number: blank dark-pixel share})
+    """
+    revision = revision or current_revision(form_id)
+    _numpy()
+    _page_rects, template_regions = checkbox_regions(form_id, revision)
+    doc = fitz.open(stream=load_template(form_id, revision), filetype="pdf")
+    reference = {}
+    for page_idx, regions in template_regions.items():
+        pixmap = _render(doc[page_idx])
+        ink = _ink(pixmap)
+        boxes = _box_pixels(regions, 0, 0, pixmap.width, pixmap.height)
+        rows, columns = _profiles(pixmap, ink)
+        reference[page_idx] = ((list(map(float, rows)), list(map(float, columns))),
+                               _shares(pixmap, ink, boxes))
+    doc.close()
+
+    if save:
+        path = raster_map_path(form_id, revision)
+        with open(path + ".tmp", "wb") as f:
+            f.write(RASTER_MAP_MAGIC + marshal.dumps((_reference_key(form_id, revision), reference)))
+        os.replace(path + ".tmp", path)
+    return reference
+
+
+def _load_reference(form_id: str, revision: str):
+    """Load a precompiled reference, or return None if it is missing, stale or unreadable."""
+    try:
+        with open(raster_map_path(form_id, revision), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(RASTER_MAP_MAGIC):
+        return None
+    try:
+        key, reference = marshal.loads(data[len(RASTER_MAP_MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return reference if key == _reference_key(form_id, revision) else None
+
+
+def _template_reference(form_id: str, revision: str = None) -> dict:
+    """Return page -> (registration profiles, blank box shares) for the template."""
+    revision = revision or current_revision(form_id)
+    key = (form_id, template_sha256(form_id, revision))
+    cached = _template_cache.get(key)
+    if cached is not None:
+        return cached
+
+    reference = _load_reference(form_id, revision)
+    if reference is None:
+        print(f"Raster reference for {form_id} ({revision}) is missing or stale; rendering the template "
+              f"(run: python3 scripts/form_map.py compile {form_id} --revision {revision})", file=sys.stderr)
+        reference = compile_reference(form_id, revision, save=False)
+    if _numpy() is not None:
+        reference = {page_idx: ((np.array(rows), np.array(columns)), shares)
+                     for page_idx, ((rows, columns), shares) in reference.items()}
+
+    _template_cache[key] = reference
+    return reference
+
+
+def prepare(form_id: str, revision: str = None):
+    """Import NumPy and load a template's reference ahead of the first scanned read."""
+    _template_reference(form_id, revision)
+
+
+def read_scanned_checkboxes(doc, form_id: str, metrics=None, revision: str = None) -> dict:
+    """
+    Decide every checkbox of a scanned form from its pixels.
+
+    Args:
+        doc: Opened PDF document (pages in template order)
+        form_id: Template id ("disc001" or "disc002")
+        metrics: Optional PhaseTimer ("pages_touched", "registration_shift_px")
+        revision: Template revision the form was made from (default: current)
+
+    Returns:
+        Interrogatory number -> {"checked", "fill", "confidence"} in form
+        order, where fill is the dark-pixel share above the blank template and
+        confidence (0-1) grows with the distance of fill from FILL_THRESHOLD
+    """
+    page_rects, template_regions = checkbox_regions(form_id, revision)
+    reference = _template_reference(form_id, revision)
+    boxes = {}
+    for page_idx, regions in sorted(template_regions.items()):
+        if page_idx >= len(doc):
+            break
+        page = doc[page_idx]
+        sx = page.rect.width / page_rects[page_idx].width
+        sy = page.rect.height / page_rects[page_idx].height
+        template_profiles, blank_shares = reference[page_idx]
+        if metrics is not None:
+            metrics.count("pages_touched")
+
+        pixmap = _render(page, sx, sy)
+        ink = _ink(pixmap)
+        rows, columns = _profiles(pixmap, ink)
+        dx = _best_lag(template_profiles[1], columns)
+        dy = _best_lag(template_profiles[0], rows)
+        if metrics is not None:
+            metrics.count("registration_shift_px", abs(dx) + abs(dy))
+
+        pixel_boxes = _box_pixels(regions, dx, dy, pixmap.width, pixmap.height)
+        for number, share in _shares(pixmap, ink, pixel_boxes).items():
+            fill = max(0.0, share - blank_shares.get(number, 0.0))
+            boxes[number] = {
+                "checked": fill >= FILL_THRESHOLD,
+                "fill": round(fill, 3),
+                "confidence": round(min(1.0, abs(fill - FILL_THRESHOLD) / FILL_THRESHOLD), 2),
+            }
+
+    return {number: boxes[number] for number in CATALOGS[form_id].sort(boxes)}
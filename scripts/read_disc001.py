@@ -7,10 +7,27 @@ and extracts which interrogatories were selected (checked).
 This script reads PDF form checkboxes without requiring OCR.
 """
 
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
 import sys
 import json
 import os
+import hashlib
+import logging
+
+from field_matcher import FieldMatcher, is_checked
+from field_tree import iter_fields
+from flattened_marks import find_marked_checkboxes
+from form_map import match_form_map, registry_version
+from form_io import claim_stdout, map_file, read_stdin_bytes, split_args, write_json
+from instrumentation import PhaseTimer, get_logger
+from interrogatory_catalog import DISC001, DISC001_UI_ALIASES
+from raster_marks import is_scanned_form, read_scanned_checkboxes
+from result_cache import get_read_cache, table_version
+
+log = get_logger("read_disc001")
 
 # =====================================================
 # MAPPING FROM PDF CHECKBOX FIELD NAMES TO UI INTERROGATORY NUMBERS
@@ -74,234 +91,325 @@ CHECKBOX_FIELD_TO_UI = {
     "MedHist3": "10.3",       # 10.3
     
     # Section 11.x - Other Claims
-    "OtherClaims[0]": "11.1", # 11.1
-    "OtherClaims2": "11.2",   # 11.2
+    "List11\\.1[0].OthPrvClaims": "11.1",  # 11.1 (both widgets are named OthPrvClaims)
+    "List11\\.2[0].OthPrvClaims": "11.2",  # 11.2
     
     # Section 12.x - Investigation General
-    "InvestGen[0]": "12.1",   # 12.1
-    "InvestGen2": "12.2",     # 12.2
-    "InvestGen3": "12.3",     # 12.3
-    "InvestGen4": "12.4",     # 12.4
-    "InvestGen5": "12.5",     # 12.5
-    "InvestGen6": "12.6",     # 12.6
-    "InvestGen7": "12.7",     # 12.7
+    "List12\\.1[0].InvestigatGen": "12.1",  # 12.1 (12.4 is also InvestigatGen[0])
+    "InvestigatGen2": "12.2",  # 12.2
+    "InvestigatGen3": "12.3",  # 12.3
+    "List12\\.4[0].InvestigatGen": "12.4",  # 12.4
+    "CheckBox34": "12.5",     # 12.5
+    "CheckBox35": "12.6",     # 12.6
+    "CheckBox36": "12.7",     # 12.7
     
     # Section 13.x - Contentions
-    "Content[0]": "13.1",     # 13.1
-    "Content2": "13.2",       # 13.2
+    "CheckBox37": "13.1",     # 13.1
+    "CheckBox38": "13.2",     # 13.2
     
     # Section 14.x - Application of statutes
-    "StatApp[0]": "14.1",     # 14.1
-    "StatApp2": "14.2",       # 14.2
+    "StatRegViolation[0]": "14.1",  # 14.1
+    "StatRegViolation2": "14.2",    # 14.2
     
     # Section 15.x - Denials/special or affirmative defenses
-    "Denials[0]": "15.1",     # 15.1
+    "DSADefenses": "15.1",    # 15.1
     
     # Section 16.x - Defendant's contentions
-    "DefContent[0]": "16.1",  # 16.1
-    "DefContent2": "16.2",    # 16.2
-    "DefContent3": "16.3",    # 16.3
-    "DefContent4": "16.4",    # 16.4
-    "DefContent5": "16.5",    # 16.5
-    "DefContent6": "16.6",    # 16.6
-    "DefContent7": "16.7",    # 16.7
-    "DefContent8": "16.8",    # 16.8
-    "DefContent9": "16.9",    # 16.9
-    "DefContent10": "16.10",  # 16.10
+    "DefContend[0]": "16.1",  # 16.1
+    "DefContend2": "16.2",    # 16.2
+    "DefContend3": "16.3",    # 16.3
+    "DefContend4": "16.4",    # 16.4
+    "DefContend5": "16.5",    # 16.5
+    "DefContend6": "16.6",    # 16.6
+    "DefContend7": "16.7",    # 16.7
+    "DefContend8": "16.8",    # 16.8
+    "DefContend9": "16.9",    # 16.9
+    "DefContend10": "16.10",  # 16.10
     
     # Section 17.x - Response to request
-    "Response[0]": "17.1",    # 17.1
+    "RespReqAd": "17.1",      # 17.1
 }
 
 
-def read_disc001(pdf_path: str) -> dict:
+# Compiled once at import: exact/suffix lookup with deterministic longest match
+CHECKBOX_MATCHER = FieldMatcher(CHECKBOX_FIELD_TO_UI)
+
+# Bump when the reader's output changes for the same PDF
+READER_VERSION = "6"
+
+# Part of every cache key, so editing the mapping table invalidates cached reads
+MAPPING_VERSION = table_version(CHECKBOX_FIELD_TO_UI, READER_VERSION)
+
+# UI numbers of the interrogatories this reader maps; limits the form-map
+# lookup and the marks accepted from flattened and scanned forms
+MAPPED_INTERROGATORIES = frozenset(CHECKBOX_FIELD_TO_UI.values())
+
+# Form map version -> template checkbox path -> UI number (see _field_lookup())
+_field_lookups = {}
+
+# DISC-001 number -> the legacy UI number this reader reports (e.g. "4.1" -> "17")
+DISC_TO_UI = {number: ui for ui, number in DISC001_UI_ALIASES.items()}
+
+
+def _field_lookup(form_map) -> dict:
+    """
+    Return template checkbox path -> UI number for one template revision.
+
+    Names of the revision are mapped through the interrogatory numbers of
+    its compiled form map; CHECKBOX_MATCHER only handles names it does not
+    have (forms of an unregistered revision).
+    """
+    lookup = _field_lookups.get(form_map.version)
+    if lookup is None:
+        lookup = form_map.checkbox_lookup(MAPPED_INTERROGATORIES, DISC_TO_UI)
+        _field_lookups[form_map.version] = lookup
+    return lookup
+
+
+def read_disc001(pdf_path: str, all_checkboxes: bool = False) -> dict:
     """
     Read a DISC-001 PDF and extract which interrogatories are selected.
     
     Args:
         pdf_path: Path to the DISC-001 PDF file
+        all_checkboxes: Include the per-checkbox dump in the result
         
     Returns:
         Dictionary containing:
-        - selected_interrogatories: List of selected interrogatory numbers
+        - selected_interrogatories: List of selected interrogatory numbers, in form order
+        - selection_mask: The selection as fixed-width hex (see interrogatory_catalog)
+        - form_revision: Template revision the form was matched to, or None
+          when it matches no registered revision
+        - read_method: "widgets", or "flattened" when the PDF has no widgets and
+          the selections come from marks drawn in the checkbox squares, or
+          "scanned" when they come from the pixels of a scanned page
+        - box_confidence: Only for "scanned" reads: interrogatory number ->
+          confidence (0-1) of that box's checked/unchecked decision
         - form_data: Dictionary of extracted text field values
-        - all_checkboxes: List of all checkbox field names found (for debugging)
+        - all_checkboxes: Every checkbox with its page and state (only when
+          all_checkboxes=True; for debugging)
     """
-    result = {
-        "success": True,
-        "selected_interrogatories": [],
-        "form_data": {},
-        "all_checkboxes": [],
-        "error": None
-    }
-    
-    try:
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-        print(f"Opened PDF with {len(doc)} pages", file=sys.stderr)
-        
-        selected = []
-        all_checkboxes = []
-        form_data = {}
-        
-        # Iterate through all pages
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
-            
-            # Get all widgets (form fields) on this page
-            for widget in page.widgets():
-                field_name = widget.field_name or ""
-                field_type = widget.field_type
-                
-                # Handle checkboxes
-                if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                    all_checkboxes.append({
-                        "name": field_name,
-                        "page": page_idx + 1,
-                        "checked": widget.field_value
-                    })
-                    
-                    # Check if this checkbox is checked
-                    if widget.field_value:
-                        # Try to map this field to a UI interrogatory number
-                        for pattern, ui_num in CHECKBOX_FIELD_TO_UI.items():
-                            if pattern in field_name:
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked: {field_name} -> {ui_num}", file=sys.stderr)
-                                break
-                
-                # Handle text fields (extract case info if available)
-                elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                    value = widget.field_value
-                    if value:
-                        # Store with a simplified key
-                        simple_name = field_name.split("[")[-1].rstrip("]") if "[" in field_name else field_name
-                        form_data[simple_name] = value
-        
-        doc.close()
-        
-        # Sort selected interrogatories numerically
-        def sort_key(x):
-            try:
-                return float(x)
-            except ValueError:
-                return float('inf')
-        
-        result["selected_interrogatories"] = sorted(selected, key=sort_key)
-        result["form_data"] = form_data
-        result["all_checkboxes"] = all_checkboxes
-        
-        print(f"Found {len(selected)} selected interrogatories", file=sys.stderr)
-        
-    except Exception as e:
-        result["success"] = False
-        result["error"] = str(e)
-        print(f"Error reading PDF: {e}", file=sys.stderr)
-    
-    return result
+    return _read_pdf(pdf_path=pdf_path, all_checkboxes=all_checkboxes)
 
 
-def read_disc001_from_bytes(pdf_bytes: bytes) -> dict:
+def read_disc001_from_bytes(pdf_bytes: bytes, doc=None, all_checkboxes: bool = False,
+                            sha256: str = None) -> dict:
     """
     Read DISC-001 from bytes (for in-memory processing).
     
     Args:
-        pdf_bytes: PDF file content as bytes
+        pdf_bytes: PDF file content (bytes, or a buffer such as form_io.map_file())
+        doc: Document already opened from pdf_bytes (used instead of
+            reopening it; the caller keeps ownership and closes it)
+        all_checkboxes: Include the per-checkbox dump in the result
+        sha256: Hex SHA-256 of pdf_bytes, when the caller already has it
         
     Returns:
         Same as read_disc001()
     """
+    return _read_pdf(pdf_bytes=pdf_bytes, doc=doc, all_checkboxes=all_checkboxes, sha256=sha256)
+
+
+def _read_pdf(pdf_path: str = None, pdf_bytes: bytes = None, doc=None, all_checkboxes: bool = False,
+              sha256: str = None) -> dict:
+    """
+    Open a DISC-001 PDF from a path or bytes and read its selections.
+    
+    Results are cached by the SHA-256 of the PDF bytes, MAPPING_VERSION and
+    the versions of every registered template revision's form map, so a
+    repeat read of the same served form never opens MuPDF. Every result
+    carries "metrics" with per-phase timings and counters for this call.
+    """
+    metrics = PhaseTimer()
+    verbose = log.isEnabledFor(logging.DEBUG)
     result = {
         "success": True,
         "selected_interrogatories": [],
         "form_data": {},
-        "all_checkboxes": [],
+        "selection_mask": None,
+        "form_revision": None,
+        "read_method": None,
         "error": None
     }
     
+    cache = get_read_cache()
+    
     try:
-        # Open from bytes
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        if pdf_bytes is None:
+            with metrics.phase("file_read"):
+                pdf_bytes = map_file(pdf_path)
+        
+        with metrics.phase("cache_lookup"):
+            cache_key = (f"disc001:{MAPPING_VERSION}:{registry_version('disc001')}:"
+                         f"{sha256 or hashlib.sha256(pdf_bytes).hexdigest()}")
+            if all_checkboxes:
+                cache_key += ":all"
+            cached = cache.get_json(cache_key)
+        if cached is not None:
+            metrics.count("cache_hit")
+            print("Read result served from cache", file=sys.stderr)
+            cached["metrics"] = metrics.as_dict()
+            return cached
+        
+        # Open the PDF (unless the caller already has it open)
+        owns_doc = doc is None
+        if owns_doc:
+            with metrics.phase("document_open"):
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         print(f"Opened PDF with {len(doc)} pages", file=sys.stderr)
         
         selected = []
-        all_checkboxes = []
+        selected_set = set()
+        checkbox_dump = [] if all_checkboxes else None
         form_data = {}
+        widgets_visited = 0
+        checkboxes = 0
         
-        # Iterate through all pages
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
+        # Names and values come straight from the AcroForm field tree; pages
+        # are only loaded when the tree is missing or does not match them
+        with metrics.phase("widget_scan"):
+            # Match the form to a template revision by its trailer /ID, or
+            # else by the checkbox names it shares with each revision
+            fields = iter_fields(doc, metrics)
+            form_map = match_form_map(doc, "disc001")
+            if form_map is None:
+                fields = list(fields)
+                form_map = match_form_map(doc, "disc001", [field[1] for field in fields
+                                                           if field[2] == fitz.PDF_WIDGET_TYPE_CHECKBOX])
+            field_lookup = _field_lookup(form_map) if form_map is not None else {}
+            result["form_revision"] = form_map.revision if form_map is not None else None
             
-            for widget in page.widgets():
-                field_name = widget.field_name or ""
-                field_type = widget.field_type
+            for page_idx, field_name, field_type, value in fields:
+                widgets_visited += 1
                 
+                # Handle checkboxes
                 if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                    all_checkboxes.append({
-                        "name": field_name,
-                        "page": page_idx + 1,
-                        "checked": widget.field_value
-                    })
+                    checkboxes += 1
+                    checked = is_checked(value)
+                    if checkbox_dump is not None:
+                        checkbox_dump.append({
+                            "name": field_name,
+                            "page": page_idx + 1,
+                            "checked": checked
+                        })
                     
-                    if widget.field_value:
-                        for pattern, ui_num in CHECKBOX_FIELD_TO_UI.items():
-                            if pattern in field_name:
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked: {field_name} -> {ui_num}", file=sys.stderr)
-                                break
+                    # Map checked boxes to a UI interrogatory number
+                    if checked:
+                        with metrics.phase("mapping"):
+                            if field_name in field_lookup:
+                                ui_num = field_lookup[field_name]
+                            else:
+                                ui_num = CHECKBOX_MATCHER.match(field_name)
+                        if ui_num and ui_num not in selected_set:
+                            selected_set.add(ui_num)
+                            selected.append(ui_num)
+                            if verbose:
+                                log.debug(f"Found checked: {field_name} -> {ui_num}")
                 
+                # Handle text fields (extract case info if available)
                 elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                    value = widget.field_value
                     if value:
+                        # Store with a simplified key
                         simple_name = field_name.split("[")[-1].rstrip("]") if "[" in field_name else field_name
                         form_data[simple_name] = value
         
-        doc.close()
+        # The field-tree walk and mapping run inside the scan loop; report the scan without them
+        metrics.timings["widget_scan"] -= metrics.timings.get("field_tree", 0.0) + metrics.timings.get("mapping", 0.0)
+        metrics.count("widgets_visited", widgets_visited)
+        metrics.count("checkboxes", checkboxes)
         
-        def sort_key(x):
-            try:
-                return float(x)
-            except ValueError:
-                return float('inf')
+        # Flattened, printed-to-PDF or scanned forms have no widgets left;
+        # look for marks in the template's checkbox squares instead
+        result["read_method"] = "widgets"
+        if widgets_visited == 0:
+            if is_scanned_form(doc, "disc001", result["form_revision"]):
+                result["read_method"] = "scanned"
+                with metrics.phase("raster_scan"):
+                    boxes = read_scanned_checkboxes(doc, "disc001", metrics, result["form_revision"])
+                marked = [number for number, box in boxes.items() if box["checked"]]
+                result["box_confidence"] = {number: box["confidence"] for number, box in boxes.items()}
+            else:
+                result["read_method"] = "flattened"
+                with metrics.phase("flattened_scan"):
+                    marked = find_marked_checkboxes(doc, "disc001", metrics, result["form_revision"])
+            metrics.count("flattened_marks", len(marked))
+            for number in marked:
+                ui_num = DISC_TO_UI.get(number, number)
+                if ui_num in MAPPED_INTERROGATORIES and ui_num not in selected_set:
+                    selected_set.add(ui_num)
+                    selected.append(ui_num)
+                    if verbose:
+                        log.debug(f"Found mark: {number} -> {ui_num}")
         
-        result["selected_interrogatories"] = sorted(selected, key=sort_key)
+        if owns_doc:
+            doc.close()
+        
+        # Form order ("16.2" before "16.10"), plus the selection as a fixed-width bitmask
+        result["selected_interrogatories"] = DISC001.sort(selected)
+        result["selection_mask"] = DISC001.to_hex(DISC001.to_mask(selected, strict=False))
         result["form_data"] = form_data
-        result["all_checkboxes"] = all_checkboxes
+        if checkbox_dump is not None:
+            result["all_checkboxes"] = checkbox_dump
         
         print(f"Found {len(selected)} selected interrogatories", file=sys.stderr)
         
+        cache.put_json(cache_key, result)
+        
     except Exception as e:
         result["success"] = False
+        result["read_method"] = None
         result["error"] = str(e)
         print(f"Error reading PDF: {e}", file=sys.stderr)
     
+    result["metrics"] = metrics.as_dict()
     return result
 
 
 def main():
-    """Main entry point - reads PDF path from argument or stdin."""
-    if len(sys.argv) < 2:
-        print("Usage: read_disc001.py <pdf_path> [output_json_path]", file=sys.stderr)
-        sys.exit(1)
+    """
+    Main entry point - reads PDF path from argument or PDF bytes from stdin.
     
-    pdf_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+    Usage:
+        read_disc001.py <pdf_path> [output_json_path] [--all-checkboxes]
+        read_disc001.py --stdin --stdout    (PDF on stdin, compact JSON on stdout)
+    """
+    args, flags = split_args(sys.argv[1:])
+    all_checkboxes = "--all-checkboxes" in flags
     
-    if not os.path.exists(pdf_path):
-        print(json.dumps({
-            "success": False,
-            "error": f"File not found: {pdf_path}",
-            "selected_interrogatories": [],
-            "form_data": {},
-            "all_checkboxes": []
-        }))
-        sys.exit(1)
+    # Keep stdout clean for the JSON result; diagnostics go to stderr
+    json_out = claim_stdout() if "--stdout" in flags else None
     
-    result = read_disc001(pdf_path)
+    if "--stdin" in flags:
+        result = read_disc001_from_bytes(read_stdin_bytes(), all_checkboxes=all_checkboxes)
+        output_path = args[0] if args else None
+    else:
+        if not args:
+            print("Usage: read_disc001.py <pdf_path> [output_json_path] [--all-checkboxes]", file=sys.stderr)
+            sys.exit(1)
+        
+        pdf_path = args[0]
+        output_path = args[1] if len(args) > 1 else None
+        
+        if not os.path.exists(pdf_path):
+            error_result = {
+                "success": False,
+                "error": f"File not found: {pdf_path}",
+                "selected_interrogatories": [],
+                "form_data": {},
+                "selection_mask": None,
+                "read_method": None
+            }
+            if json_out is not None:
+                write_json(json_out, error_result)
+            else:
+                print(json.dumps(error_result))
+            sys.exit(1)
+        
+        result = read_disc001(pdf_path, all_checkboxes=all_checkboxes)
     
-    if output_path:
+    if json_out is not None:
+        write_json(json_out, result)
+    elif output_path:
         with open(output_path, 'w') as f:
             json.dump(result, f, indent=2)
         print(f"Results written to: {output_path}", file=sys.stderr)
@@ -8,12 +8,27 @@ This script reads PDF form checkboxes without requiring OCR.
 Field names discovered by analyzing the actual DISC-002 PDF structure.
 """
 
-import fitz  # PyMuPDF
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
 import sys
 import json
 import os
+import hashlib
+import logging
 import re
 
+from field_matcher import FieldMatcher, is_checked
+from field_tree import iter_fields
+from form_map import match_form_map, registry_version
+from form_io import claim_stdout, map_file, read_stdin_bytes, split_args, write_json
+from instrumentation import PhaseTimer, get_logger
+from interrogatory_catalog import DISC002
+from result_cache import get_read_cache, table_version
+
+log = get_logger("read_disc002")
+
 # =====================================================
 # MAPPING FROM PDF CHECKBOX FIELD NAMES TO UI INTERROGATORY NUMBERS
 # Field names discovered by analyzing the actual DISC-002 PDF
@@ -116,229 +131,273 @@ CHECKBOX_FIELD_TO_UI = {
 }
 
 
-def read_disc002(pdf_path: str, debug: bool = False) -> dict:
+# Compiled once at import: exact/suffix lookup with deterministic longest match
+CHECKBOX_MATCHER = FieldMatcher(CHECKBOX_FIELD_TO_UI)
+
+# Bump when the reader's output changes for the same PDF
+READER_VERSION = "6"
+
+# Part of every cache key, so editing the mapping table invalidates cached reads
+MAPPING_VERSION = table_version(CHECKBOX_FIELD_TO_UI, READER_VERSION)
+
+# UI numbers of the interrogatories this reader maps; limits the form-map
+# checkbox lookup to them
+MAPPED_INTERROGATORIES = frozenset(CHECKBOX_FIELD_TO_UI.values())
+
+# Form map version -> template checkbox path -> UI number (see _field_lookup())
+_field_lookups = {}
+
+
+def _field_lookup(form_map) -> dict:
+    """
+    Return template checkbox path -> UI number for one template revision.
+
+    Names of the revision are mapped through the interrogatory numbers of
+    its compiled form map; CHECKBOX_MATCHER only handles names it does not
+    have (forms of an unregistered revision).
+    """
+    lookup = _field_lookups.get(form_map.version)
+    if lookup is None:
+        lookup = form_map.checkbox_lookup(MAPPED_INTERROGATORIES, None)
+        _field_lookups[form_map.version] = lookup
+    return lookup
+
+
+def read_disc002(pdf_path: str, debug: bool = False, all_checkboxes: bool = False) -> dict:
     """
     Read a DISC-002 PDF and extract which interrogatories are selected.
     
     Args:
         pdf_path: Path to the DISC-002 PDF file
         debug: If True, print all field names found
+        all_checkboxes: Include the per-checkbox dump in the result
         
     Returns:
         Dictionary containing:
-        - selected_interrogatories: List of selected interrogatory numbers
+        - selected_interrogatories: List of selected interrogatory numbers, in form order
+        - selection_mask: The selection as fixed-width hex (see interrogatory_catalog)
+        - form_revision: Template revision the form was matched to, or None
+          when it matches no registered revision
+        - read_method: "widgets", or None when the read failed
         - form_data: Dictionary of extracted text field values
-        - all_checkboxes: List of all checkbox field names found (for debugging)
+        - all_checkboxes: Every checkbox with its page and state (only when
+          all_checkboxes=True; for debugging)
     """
-    result = {
-        "success": True,
-        "selected_interrogatories": [],
-        "form_data": {},
-        "all_checkboxes": [],
-        "error": None
-    }
-    
-    try:
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-        print(f"Opened PDF with {len(doc)} pages", file=sys.stderr)
-        
-        selected = []
-        all_checkboxes = []
-        form_data = {}
-        
-        # Iterate through all pages
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
-            
-            # Get all widgets (form fields) on this page
-            for widget in page.widgets():
-                field_name = widget.field_name or ""
-                field_type = widget.field_type
-                
-                # Handle checkboxes
-                if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                    all_checkboxes.append({
-                        "name": field_name,
-                        "page": page_idx + 1,
-                        "checked": widget.field_value
-                    })
-                    
-                    if debug:
-                        print(f"  Checkbox: {field_name} = {widget.field_value}", file=sys.stderr)
-                    
-                    # Check if this checkbox is checked
-                    if widget.field_value:
-                        # Try to map this field to a UI interrogatory number
-                        mapped = False
-                        for pattern, ui_num in CHECKBOX_FIELD_TO_UI.items():
-                            if pattern in field_name:
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked: {field_name[:60]} -> {ui_num}", file=sys.stderr)
-                                mapped = True
-                                break
-                        
-                        # If not in our mapping, try to extract number from field name
-                        if not mapped:
-                            # Try to find patterns like "200.1", "201.2", etc.
-                            match = re.search(r'(\d{3}\.\d+)', field_name)
-                            if match:
-                                ui_num = match.group(1)
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked (regex): {field_name} -> {ui_num}", file=sys.stderr)
-                
-                # Handle text fields (extract case info if available)
-                elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                    value = widget.field_value
-                    if value:
-                        # Store with a simplified key
-                        simple_name = field_name.split("[")[-1].rstrip("]") if "[" in field_name else field_name
-                        form_data[simple_name] = value
-                        if debug:
-                            print(f"  Text field: {field_name} = {value[:50]}...", file=sys.stderr)
-        
-        doc.close()
-        
-        # Sort selected interrogatories by section number
-        def sort_key(x):
-            try:
-                parts = x.split('.')
-                return (int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
-            except (ValueError, IndexError):
-                return (999, 999)
-        
-        result["selected_interrogatories"] = sorted(selected, key=sort_key)
-        result["form_data"] = form_data
-        result["all_checkboxes"] = all_checkboxes
-        
-        print(f"Found {len(selected)} selected interrogatories", file=sys.stderr)
-        
-    except Exception as e:
-        result["success"] = False
-        result["error"] = str(e)
-        print(f"Error reading PDF: {e}", file=sys.stderr)
-    
-    return result
+    return _read_pdf(pdf_path=pdf_path, debug=debug, all_checkboxes=all_checkboxes)
 
 
-def read_disc002_from_bytes(pdf_bytes: bytes, debug: bool = False) -> dict:
+def read_disc002_from_bytes(pdf_bytes: bytes, debug: bool = False, doc=None,
+                            all_checkboxes: bool = False, sha256: str = None) -> dict:
     """
     Read DISC-002 from bytes (for in-memory processing).
     
     Args:
-        pdf_bytes: PDF file content as bytes
+        pdf_bytes: PDF file content (bytes, or a buffer such as form_io.map_file())
         debug: If True, print all field names found
+        doc: Document already opened from pdf_bytes (used instead of
+            reopening it; the caller keeps ownership and closes it)
+        all_checkboxes: Include the per-checkbox dump in the result
+        sha256: Hex SHA-256 of pdf_bytes, when the caller already has it
         
     Returns:
         Same as read_disc002()
     """
+    return _read_pdf(pdf_bytes=pdf_bytes, debug=debug, doc=doc, all_checkboxes=all_checkboxes,
+                     sha256=sha256)
+
+
+def _read_pdf(pdf_path: str = None, pdf_bytes: bytes = None, debug: bool = False, doc=None,
+              all_checkboxes: bool = False, sha256: str = None) -> dict:
+    """
+    Open a DISC-002 PDF from a path or bytes and read its selections.
+    
+    Results are cached by the SHA-256 of the PDF bytes, MAPPING_VERSION and
+    the versions of every registered template revision's form map, so a
+    repeat read of the same served form never opens MuPDF. Every result
+    carries "metrics" with per-phase timings and counters for this call.
+    """
+    metrics = PhaseTimer()
+    verbose = log.isEnabledFor(logging.DEBUG)
     result = {
         "success": True,
         "selected_interrogatories": [],
         "form_data": {},
-        "all_checkboxes": [],
+        "selection_mask": None,
+        "form_revision": None,
+        "read_method": None,
         "error": None
     }
     
+    cache = get_read_cache()
+    
     try:
-        # Open from bytes
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        if pdf_bytes is None:
+            with metrics.phase("file_read"):
+                pdf_bytes = map_file(pdf_path)
+        
+        with metrics.phase("cache_lookup"):
+            cache_key = (f"disc002:{MAPPING_VERSION}:{registry_version('disc002')}:"
+                         f"{sha256 or hashlib.sha256(pdf_bytes).hexdigest()}")
+            if all_checkboxes:
+                cache_key += ":all"
+            # Debug runs always scan, so the field dump is printed
+            cached = None if debug else cache.get_json(cache_key)
+        if cached is not None:
+            metrics.count("cache_hit")
+            print("Read result served from cache", file=sys.stderr)
+            cached["metrics"] = metrics.as_dict()
+            return cached
+        
+        # Open the PDF (unless the caller already has it open)
+        owns_doc = doc is None
+        if owns_doc:
+            with metrics.phase("document_open"):
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         print(f"Opened PDF with {len(doc)} pages", file=sys.stderr)
         
         selected = []
-        all_checkboxes = []
+        selected_set = set()
+        checkbox_dump = [] if all_checkboxes else None
         form_data = {}
+        widgets_visited = 0
+        checkboxes = 0
         
-        # Iterate through all pages
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
+        # Names and values come straight from the AcroForm field tree; pages
+        # are only loaded when the tree is missing or does not match them
+        with metrics.phase("widget_scan"):
+            # Match the form to a template revision by its trailer /ID, or
+            # else by the checkbox names it shares with each revision
+            fields = iter_fields(doc, metrics)
+            form_map = match_form_map(doc, "disc002")
+            if form_map is None:
+                fields = list(fields)
+                form_map = match_form_map(doc, "disc002", [field[1] for field in fields
+                                                           if field[2] == fitz.PDF_WIDGET_TYPE_CHECKBOX])
+            field_lookup = _field_lookup(form_map) if form_map is not None else {}
+            result["form_revision"] = form_map.revision if form_map is not None else None
             
-            for widget in page.widgets():
-                field_name = widget.field_name or ""
-                field_type = widget.field_type
+            for page_idx, field_name, field_type, value in fields:
+                widgets_visited += 1
                 
+                # Handle checkboxes
                 if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                    all_checkboxes.append({
-                        "name": field_name,
-                        "page": page_idx + 1,
-                        "checked": widget.field_value
-                    })
+                    checkboxes += 1
+                    checked = is_checked(value)
+                    if checkbox_dump is not None:
+                        checkbox_dump.append({
+                            "name": field_name,
+                            "page": page_idx + 1,
+                            "checked": checked
+                        })
                     
                     if debug:
-                        print(f"  Checkbox: {field_name} = {widget.field_value}", file=sys.stderr)
+                        print(f"  Checkbox: {field_name} = {value}", file=sys.stderr)
                     
-                    if widget.field_value:
-                        mapped = False
-                        for pattern, ui_num in CHECKBOX_FIELD_TO_UI.items():
-                            if pattern in field_name:
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked: {field_name[:60]} -> {ui_num}", file=sys.stderr)
-                                mapped = True
-                                break
+                    # Map checked boxes to a UI interrogatory number
+                    if checked:
+                        with metrics.phase("mapping"):
+                            if field_name in field_lookup:
+                                ui_num = field_lookup[field_name]
+                            else:
+                                ui_num = CHECKBOX_MATCHER.match(field_name)
+                            if not ui_num:
+                                # If not in our mapping, try to find patterns like "200.1", "201.2", etc.
+                                match = re.search(r'(\d{3}\.\d+)', field_name)
+                                if match:
+                                    ui_num = match.group(1)
+                                    metrics.count("regex_fallbacks")
                         
-                        if not mapped:
-                            match = re.search(r'(\d{3}\.\d+)', field_name)
-                            if match:
-                                ui_num = match.group(1)
-                                if ui_num not in selected:
-                                    selected.append(ui_num)
-                                    print(f"  Found checked (regex): {field_name} -> {ui_num}", file=sys.stderr)
+                        if ui_num and ui_num not in selected_set:
+                            selected_set.add(ui_num)
+                            selected.append(ui_num)
+                            if verbose:
+                                log.debug(f"Found checked: {field_name[:60]} -> {ui_num}")
                 
+                # Handle text fields (extract case info if available)
                 elif field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                    value = widget.field_value
                     if value:
+                        # Store with a simplified key
                         simple_name = field_name.split("[")[-1].rstrip("]") if "[" in field_name else field_name
                         form_data[simple_name] = value
+                        if debug:
+                            print(f"  Text field: {field_name} = {value[:50]}...", file=sys.stderr)
+            
+            if owns_doc:
+                doc.close()
         
-        doc.close()
-        
-        def sort_key(x):
-            try:
-                parts = x.split('.')
-                return (int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
-            except (ValueError, IndexError):
-                return (999, 999)
+        # The field-tree walk and mapping run inside the scan loop; report the scan without them
+        metrics.timings["widget_scan"] -= metrics.timings.get("field_tree", 0.0) + metrics.timings.get("mapping", 0.0)
+        metrics.count("widgets_visited", widgets_visited)
+        metrics.count("checkboxes", checkboxes)
         
-        result["selected_interrogatories"] = sorted(selected, key=sort_key)
+        # Form order ("16.2" before "16.10"), plus the selection as a fixed-width bitmask
+        result["selected_interrogatories"] = DISC002.sort(selected)
+        result["selection_mask"] = DISC002.to_hex(DISC002.to_mask(selected, strict=False))
         result["form_data"] = form_data
-        result["all_checkboxes"] = all_checkboxes
+        result["read_method"] = "widgets"
+        if checkbox_dump is not None:
+            result["all_checkboxes"] = checkbox_dump
         
         print(f"Found {len(selected)} selected interrogatories", file=sys.stderr)
         
+        cache.put_json(cache_key, result)
+        
     except Exception as e:
         result["success"] = False
+        result["read_method"] = None
         result["error"] = str(e)
         print(f"Error reading PDF: {e}", file=sys.stderr)
     
+    result["metrics"] = metrics.as_dict()
     return result
 
 
 def main():
-    """Main entry point - reads PDF path from argument or stdin."""
-    if len(sys.argv) < 2:
-        print("Usage: read_disc002.py <pdf_path> [output_json_path] [--debug]", file=sys.stderr)
-        sys.exit(1)
+    """
+    Main entry point - reads PDF path from argument or PDF bytes from stdin.
     
-    pdf_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
-    debug = '--debug' in sys.argv
+    Usage:
+        read_disc002.py <pdf_path> [output_json_path] [--debug] [--all-checkboxes]
+        read_disc002.py --stdin --stdout    [--debug]    (PDF on stdin, compact JSON on stdout)
+    """
+    args, flags = split_args(sys.argv[1:])
+    debug = "--debug" in flags
+    all_checkboxes = "--all-checkboxes" in flags
     
-    if not os.path.exists(pdf_path):
-        print(json.dumps({
-            "success": False,
-            "error": f"File not found: {pdf_path}",
-            "selected_interrogatories": [],
-            "form_data": {},
-            "all_checkboxes": []
-        }))
-        sys.exit(1)
+    # Keep stdout clean for the JSON result; diagnostics go to stderr
+    json_out = claim_stdout() if "--stdout" in flags else None
     
-    result = read_disc002(pdf_path, debug=debug)
+    if "--stdin" in flags:
+        result = read_disc002_from_bytes(read_stdin_bytes(), debug=debug, all_checkboxes=all_checkboxes)
+        output_path = args[0] if args else None
+    else:
+        if not args:
+            print("Usage: read_disc002.py <pdf_path> [output_json_path] [--debug] [--all-checkboxes]", file=sys.stderr)
+            sys.exit(1)
+        
+        pdf_path = args[0]
+        output_path = args[1] if len(args) > 1 else None
+        
+        if not os.path.exists(pdf_path):
+            error_result = {
+                "success": False,
+                "error": f"File not found: {pdf_path}",
+                "selected_interrogatories": [],
+                "form_data": {},
+                "selection_mask": None,
+                "read_method": None
+            }
+            if json_out is not None:
+                write_json(json_out, error_result)
+            else:
+                print(json.dumps(error_result))
+            sys.exit(1)
+        
+        result = read_disc002(pdf_path, debug=debug, all_checkboxes=all_checkboxes)
     
-    if output_path:
+    if json_out is not None:
+        write_json(json_out, result)
+    elif output_path:
         with open(output_path, 'w') as f:
             json.dump(result, f, indent=2)
         print(f"Results written to: {output_path}", file=sys.stderr)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Form Interrogatories Reader with Form-Type Detection
+Single entry point for served DISC-001 and DISC-002 PDFs: fingerprints the
+document cheaply, reports the detected form and revision, and dispatches to
+the matching reader.
+
+Detection never scans every widget. It tries, in order:
+
+  1. Catalog metadata title ("DISC-001 Form Interrogatories - General")
+  2. The first widget name on page 1 ("DISC-002[0]....")
+  3. The footer form number ("DISC-001 [Rev. January 1, 2024]")
+
+The printed revision date comes from the page-1 footer and is reported as
+"footer_revision"; "form_revision" stays the template revision the reader
+matched. Detections are cached by the SHA-256 of the PDF in the read cache,
+like read results, and the reader is handed the same digest.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import sys
+import json
+import os
+import re
+import hashlib
+
+from form_io import claim_stdout, map_file, read_stdin_bytes, split_args, write_json
+from read_disc001 import read_disc001_from_bytes
+from read_disc002 import read_disc002_from_bytes
+from result_cache import get_read_cache
+
+FORM_READERS = {
+    "disc001": read_disc001_from_bytes,
+    "disc002": read_disc002_from_bytes,
+}
+
+# Form number as it appears in titles, footers and widget names
+FORM_NUMBER_PATTERN = re.compile(r"\bDISC-00([12])\b")
+
+# Footer form number with revision, e.g. "DISC-001 [Rev. January 1, 2024]"
+FOOTER_PATTERN = re.compile(r"DISC-00([12])\s*\[Rev\.\s*([^\]]+)\]")
+
+# Fraction of the first page height (from the bottom) holding the footer
+FOOTER_HEIGHT = 0.12
+
+# Bump when detection changes (invalidates cached detections)
+DETECTOR_VERSION = "2"
+
+
+def _form_id(number: str) -> str:
+    return f"disc00{number}"
+
+
+def _read_footer(page):
+    """Return (form id, footer revision) from the page footer, or (None, None)."""
+    rect = page.rect
+    clip = fitz.Rect(rect.x0, rect.y1 - rect.height * FOOTER_HEIGHT, rect.x1, rect.y1)
+    match = FOOTER_PATTERN.search(page.get_text("text", clip=clip))
+    if match:
+        return _form_id(match.group(1)), " ".join(match.group(2).split())
+    return None, None
+
+
+def _error_result(error: str) -> dict:
+    return {
+        "success": False,
+        "error": error,
+        "form": None,
+        "footer_revision": None,
+        "detection": None,
+        "selected_interrogatories": [],
+        "form_data": {},
+        "selection_mask": None,
+        "read_method": None,
+    }
+
+
+def detect_form(doc) -> dict:
+    """
+    Identify the form type and revision of an open document.
+
+    Args:
+        doc: Opened PDF document
+
+    Returns:
+        Dictionary with:
+        - form: "disc001", "disc002" or None
+        - footer_revision: Revision printed in the footer (e.g. "January 1, 2024") or None
+        - method: "metadata", "widget_prefix", "footer" or None
+    """
+    detection = {"form": None, "footer_revision": None, "method": None}
+
+    match = FORM_NUMBER_PATTERN.search((doc.metadata or {}).get("title") or "")
+    if match:
+        detection["form"] = _form_id(match.group(1))
+        detection["method"] = "metadata"
+
+    if len(doc) == 0:
+        return detection
+    page = doc[0]
+
+    if detection["form"] is None:
+        widget = page.first_widget
+        match = FORM_NUMBER_PATTERN.match(widget.field_name or "") if widget else None
+        if match:
+            detection["form"] = _form_id(match.group(1))
+            detection["method"] = "widget_prefix"
+
+    footer_form, footer_revision = _read_footer(page)
+    detection["footer_revision"] = footer_revision
+    if detection["form"] is None and footer_form:
+        detection["form"] = footer_form
+        detection["method"] = "footer"
+
+    return detection
+
+
+def read_form(pdf_path: str = None, pdf_bytes: bytes = None, form: str = None,
+              all_checkboxes: bool = False) -> dict:
+    """
+    Read a served DISC-001 or DISC-002 PDF without knowing its type in advance.
+
+    Args:
+        pdf_path: Path to the PDF file
+        pdf_bytes: PDF file content, bytes or a buffer (instead of pdf_path)
+        form: Skip detection and use this reader ("disc001" or "disc002")
+        all_checkboxes: Include the per-checkbox dump in the result
+
+    Returns:
+        The reader's result (see read_disc001()) plus:
+        - form: Detected form id (or the one given), or None if the PDF is not
+          a recognized form
+        - footer_revision: Revision printed in the page-1 footer, or None
+        - detection: How the form was identified ("caller" when form is given)
+    """
+    try:
+        if form is not None and form not in FORM_READERS:
+            raise ValueError(f"Unknown form {form!r}")
+        if pdf_bytes is None:
+            pdf_bytes = map_file(pdf_path)
+
+        # Hashed once: the reader's own cache key reuses the digest
+        sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        cache = get_read_cache()
+        cache_key = f"detect:{DETECTOR_VERSION}:{sha256}"
+        detection = cache.get_json(cache_key)
+        doc = None
+        if detection is None:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            detection = detect_form(doc)
+            cache.put_json(cache_key, detection)
+        if form is not None:
+            detection = dict(detection, form=form, method="caller")
+
+        try:
+            if detection["form"] is None:
+                raise ValueError("Not a recognized DISC-001/DISC-002 form")
+            print(f"Detected {detection['form']} (rev. {detection['footer_revision']}) "
+                  f"via {detection['method']}", file=sys.stderr)
+            # The reader reuses the document opened for detection
+            result = FORM_READERS[detection["form"]](pdf_bytes, doc=doc, all_checkboxes=all_checkboxes,
+                                                     sha256=sha256)
+        finally:
+            if doc is not None:
+                doc.close()
+
+        result.update({
+            "form": detection["form"],
+            "footer_revision": detection["footer_revision"],
+            "detection": detection["method"],
+        })
+        return result
+
+    except Exception as e:
+        print(f"Error reading PDF: {e}", file=sys.stderr)
+        return _error_result(str(e))
+
+
+def main():
+    """
+    Main entry point - reads PDF path from argument or PDF bytes from stdin.
+
+    Usage:
+        read_form.py <pdf_path> [output_json_path] [--all-checkboxes]
+        read_form.py --stdin --stdout    (PDF on stdin, compact JSON on stdout)
+    """
+    args, flags = split_args(sys.argv[1:])
+    all_checkboxes = "--all-checkboxes" in flags
+
+    # Keep stdout clean for the JSON result; diagnostics go to stderr
+    json_out = claim_stdout() if "--stdout" in flags else None
+
+    if "--stdin" in flags:
+        result = read_form(pdf_bytes=read_stdin_bytes(), all_checkboxes=all_checkboxes)
+        output_path = args[0] if args else None
+    else:
+        if not args:
+            print("Usage: read_form.py <pdf_path> [output_json_path] [--all-checkboxes]", file=sys.stderr)
+            sys.exit(1)
+
+        output_path = args[1] if len(args) > 1 else None
+        if os.path.exists(args[0]):
+            result = read_form(pdf_path=args[0], all_checkboxes=all_checkboxes)
+        else:
+            result = _error_result(f"File not found: {args[0]}")
+
+    if json_out is not None:
+        write_json(json_out, result)
+    elif output_path:
+        with open(output_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to: {output_path}", file=sys.stderr)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if not result["success"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
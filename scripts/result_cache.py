@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Result Cache for the DISC-001/DISC-002 Scripts
+Two tiers: an in-memory LRU and an optional on-disk store with size-based
+eviction. Keys are strings built from content hashes (e.g. the SHA-256 of a
+served PDF plus the mapping-table version); values are bytes.
+
+Both caches are configured from the environment:
+
+    FORM_READ_CACHE_ENTRIES       In-memory read results (default 256, 0 disables)
+    FORM_READ_CACHE_DIR           Directory for the on-disk read tier (unset disables)
+    FORM_READ_CACHE_MAX_BYTES     Size cap of the on-disk read tier (default 256 MB)
+
+    FORM_FILL_CACHE_ENTRIES       In-memory filled PDFs (default 32, 0 disables)
+    FORM_FILL_CACHE_MEMORY_BYTES  Size cap of the in-memory fill tier (default 64 MB)
+    FORM_FILL_CACHE_DIR           Directory for the on-disk fill tier (unset disables)
+    FORM_FILL_CACHE_MAX_BYTES     Size cap of the on-disk fill tier (default 512 MB)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+DEFAULT_FILL_MEMORY_ENTRIES = 32
+DEFAULT_FILL_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_FILL_DISK_MAX_BYTES = 512 * 1024 * 1024
+
+_read_cache = None
+_fill_cache = None
+
+
+def table_version(*tables) -> str:
+    """
+    Return a short, stable version string for mapping tables.
+
+    Any change to a table (or to an extra version marker passed alongside
+    it) changes the version and so invalidates cached results.
+    """
+    digest = hashlib.sha256()
+    for table in tables:
+        digest.update(json.dumps(table, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def canonical_fill_data(data: dict) -> dict:
+    """
+    Return the canonical form of fill input for the cache key.
+
+    selected_sections is de-duplicated and sorted, since the order and
+    repeats of sections do not change the filled PDF. Text values are kept
+    as they are: the fill writes them verbatim, so inputs that differ only
+    in whitespace produce different PDFs.
+    """
+    canonical = dict(data)
+    if "selected_sections" in canonical:
+        canonical["selected_sections"] = sorted({str(s) for s in canonical["selected_sections"] or []})
+    return canonical
+
+
+def fill_cache_key(form_id: str, template_hash: str, fill_version: str, data: dict) -> str:
+    """Build the fill cache key from the canonical form of the input and the template hash."""
+    payload = json.dumps(canonical_fill_data(data), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return f"fill:{form_id}:{template_hash}:{fill_version}:{hashlib.sha256(payload).hexdigest()}"
+
+
+class ResultCache:
+    """In-memory LRU in front of an optional size-capped on-disk store."""
+
+    def __init__(self, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 disk_dir: str = None, disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+                 memory_max_bytes: int = None):
+        self.memory_entries = memory_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+        self._disk_sizes = None  # path -> size, loaded on first disk write
+        self._disk_total = 0
+
+    # ---------- in-memory tier ----------
+
+    def _memory_get(self, key: str):
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: bytes):
+        if self.memory_entries <= 0:
+            return
+        if self.memory_max_bytes is not None and len(value) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = value
+        self._memory_bytes += len(value)
+        while len(self._memory) > self.memory_entries or (
+            self.memory_max_bytes is not None and self._memory_bytes > self.memory_max_bytes
+        ):
+            _key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    # ---------- on-disk tier ----------
+
+    def _disk_path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, name[:2], name)
+
+    def _load_disk_index(self):
+        """Scan the cache directory once to learn what is stored and how big it is."""
+        self._disk_sizes = {}
+        self._disk_total = 0
+        for root, _dirs, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                self._disk_sizes[path] = size
+                self._disk_total += size
+
+    def _disk_get(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except OSError:
+            return None
+        # Refresh the mtime so eviction drops the least recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _disk_put(self, key: str, value: bytes):
+        if not self.disk_dir or len(value) > self.disk_max_bytes:
+            return
+        if self._disk_sizes is None:
+            self._load_disk_index()
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Result cache write failed: {e}", file=sys.stderr)
+            return
+
+        self._disk_total += len(value) - self._disk_sizes.get(path, 0)
+        self._disk_sizes[path] = len(value)
+        if self._disk_total > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used files until the store fits its size cap."""
+        entries = []
+        for path in self._disk_sizes:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                entries.append((0, path))
+        entries.sort()
+
+        # Evict down to 90% of the cap so we don't evict on every write
+        target = self.disk_max_bytes * 0.9
+        for _mtime, path in entries:
+            if self._disk_total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._disk_total -= self._disk_sizes.pop(path)
+            self._stats["evictions"] += 1
+
+    # ---------- public API ----------
+
+    def get(self, key: str):
+        """Return cached bytes for a key, or None."""
+        value = self._memory_get(key)
+        if value is not None:
+            self._stats["memory_hits"] += 1
+            return value
+
+        value = self._disk_get(key)
+        if value is not None:
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, value)
+        else:
+            self._stats["misses"] += 1
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Store bytes under a key in both tiers."""
+        self._stats["puts"] += 1
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_json(self, key: str):
+        """Return a cached JSON value (a fresh copy), or None."""
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def put_json(self, key: str, obj):
+        """Store a JSON-serializable value."""
+        self.put(key, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+
+    def clear(self):
+        """Drop the in-memory tier (the on-disk tier is left in place)."""
+        self._memory.clear()
+        self._memory_bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and current tier sizes.
+
+        Returns:
+            Dictionary with memory_hits, disk_hits, misses, puts, evictions,
+            hit_rate, memory_entries, memory_bytes and disk_bytes
+        """
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return dict(
+            self._stats,
+            hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+            memory_entries=len(self._memory),
+            memory_bytes=self._memory_bytes,
+            disk_bytes=self._disk_total,
+        )
+
+
+def get_read_cache() -> ResultCache:
+    """Return the process-wide cache for served-form read results."""
+    global _read_cache
+    if _read_cache is None:
+        _read_cache = ResultCache(
+            memory_entries=int(os.environ.get("FORM_READ_CACHE_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+            disk_dir=os.environ.get("FORM_READ_CACHE_DIR") or None,
+            disk_max_bytes=int(os.environ.get("FORM_READ_CACHE_MAX_BYTES", DEFAULT_DISK_MAX_BYTES)),
+        )
+    return _read_cache
+
+
+def get_fill_cache() -> ResultCache:
+    """Return the process-wide cache for filled PDFs."""
+    global _fill_cache
+    if _fill_cache is None:
+        _fill_cache = ResultCache(
+            memory_entries=int(os.environ.get("FORM_FILL_CACHE_ENTRIES", DEFAULT_FILL_MEMORY_ENTRIES)),
+            memory_max_bytes=int(os.environ.get("FORM_FILL_CACHE_MEMORY_BYTES", DEFAULT_FILL_MEMORY_BYTES)),
+            disk_dir=os.environ.get("FORM_FILL_CACHE_DIR") or None,
+            disk_max_bytes=int(os.environ.get("FORM_FILL_CACHE_MAX_BYTES", DEFAULT_FILL_DISK_MAX_BYTES)),
+        )
+    return _fill_cache
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+DISC-001/DISC-002 Template Store
+Loads the official Judicial Council form templates from a local directory,
+verifies each one by SHA-256 against the pinned manifest and keeps it mapped
+in-process, so fills never depend on courts.ca.gov being reachable. Templates
+are memory-mapped rather than read, so every worker process (forked or not)
+shares the page cache copy instead of holding its own.
+
+The manifest can hold several revisions of each form ("2024-11", ...):
+fills use the form's "current" revision, and readers pick the revision a
+served form was made from (form_map.match_form_map()). Older revisions are
+kept so that forms served on them still read through their own field map.
+
+    {"disc001": {"current": "2024-11",
+                 "revisions": {"2024-11": {"file": ..., "sha256": ..., "url": ...}}}}
+
+A manifest entry holding "file"/"sha256"/"url" directly is read as a form
+with a single revision named "current".
+
+The manifest is re-read when it changes on disk (checked at most every
+RELOAD_INTERVAL seconds), so a long-running process picks up a revision
+registered with `add` without restarting. The network fetch is an explicit
+offline step:
+
+    python3 scripts/template_store.py verify
+    python3 scripts/template_store.py refresh [disc001] [disc002]
+    python3 scripts/template_store.py add disc001 old-disc001.pdf 2019-01 [--current]
+
+`refresh` downloads the current revisions from the URLs in the manifest,
+writes them to the template directory and re-pins their hashes in the
+manifest. `add` copies a local PDF into the template directory as a new
+revision and pins it. Both then recompile the form maps (form_map.py) and
+exit non-zero when the fill/read mapping tables no longer fit a revision.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import copy
+import hashlib
+import json
+import os
+import sys
+import time
+
+from form_io import map_file
+
+# Directory holding the template PDFs and manifest.json
+# (override with FORM_TEMPLATE_DIR, e.g. for a read-only container image)
+TEMPLATE_DIR = os.environ.get("FORM_TEMPLATE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "forms"
+)
+MANIFEST_NAME = "manifest.json"
+
+# Seconds between checks of the manifest for changes (0 = check on every call)
+RELOAD_INTERVAL = float(os.environ.get("FORM_TEMPLATE_RELOAD_SECONDS") or 2)
+
+# Revision name of a manifest entry without "revisions"
+LEGACY_REVISION = "current"
+
+# (form_id, revision) -> verified, memory-mapped template
+_template_cache = {}
+# (form_id, revision, pinned SHA-256) -> the template re-saved by MuPDF (see open_template())
+_resaved_cache = {}
+_manifest_cache = None
+# (mtime_ns, size) of the loaded manifest and the time it was last checked
+_manifest_stamp = None
+_manifest_checked = 0.0
+
+
+class TemplateError(Exception):
+    """Raised when a template is missing or does not match its pinned hash."""
+
+
+def _normalize(entry: dict) -> dict:
+    """Return a manifest entry in the {"current", "revisions"} form."""
+    if "revisions" in entry:
+        return entry
+    return {"current": LEGACY_REVISION, "revisions": {LEGACY_REVISION: entry}}
+
+
+def load_manifest() -> dict:
+    """
+    Load the pinned template manifest, re-reading it if it changed on disk.
+
+    Returns:
+        Dictionary mapping form id ("disc001", "disc002") to its entry with
+        "current" (revision name) and "revisions" (revision name -> entry
+        with "file", "sha256" and "url")
+    """
+    global _manifest_cache, _manifest_stamp, _manifest_checked
+    now = time.monotonic()
+    if _manifest_cache is not None and now - _manifest_checked < RELOAD_INTERVAL:
+        return _manifest_cache
+    _manifest_checked = now
+
+    manifest_path = os.path.join(TEMPLATE_DIR, MANIFEST_NAME)
+    try:
+        stat = os.stat(manifest_path)
+    except FileNotFoundError:
+        if _manifest_cache is not None:
+            return _manifest_cache
+        raise TemplateError(f"Template manifest not found: {manifest_path}")
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _manifest_cache is None or stamp != _manifest_stamp:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        _manifest_cache = {form_id: _normalize(entry) for form_id, entry in manifest.items()}
+        _manifest_stamp = stamp
+        # Templates are re-mapped, re-verified and re-parsed against the new pins on next use
+        _template_cache.clear()
+        _resaved_cache.clear()
+    return _manifest_cache
+
+
+def _form_entry(form_id: str) -> dict:
+    manifest = load_manifest()
+    if form_id not in manifest:
+        raise TemplateError(f"Unknown form template: {form_id}")
+    return manifest[form_id]
+
+
+def _manifest_entry(form_id: str, revision: str = None) -> dict:
+    entry = _form_entry(form_id)
+    revision = revision or entry["current"]
+    if revision not in entry["revisions"]:
+        raise TemplateError(f"Unknown revision {revision!r} of form template {form_id}")
+    return entry["revisions"][revision]
+
+
+def current_revision(form_id: str) -> str:
+    """Return the name of the revision fills use by default."""
+    return _form_entry(form_id)["current"]
+
+
+def template_revisions(form_id: str) -> list:
+    """Return the revision names of a form, the current one first."""
+    entry = _form_entry(form_id)
+    return [entry["current"]] + [revision for revision in entry["revisions"] if revision != entry["current"]]
+
+
+def template_sha256(form_id: str, revision: str = None) -> str:
+    """Return the pinned SHA-256 of a form template (default: its current revision)."""
+    return _manifest_entry(form_id, revision)["sha256"]
+
+
+def load_template(form_id: str, revision: str = None) -> memoryview:
+    """
+    Load a form template from the local template directory.
+
+    The file is memory-mapped (form_io.map_file()), verified against the
+    pinned SHA-256 on first use and kept mapped until the manifest changes.
+
+    Args:
+        form_id: Template id from the manifest ("disc001" or "disc002")
+        revision: Revision name (default: the current revision)
+
+    Returns:
+        Read-only view of the template PDF (pass it to fitz.open(stream=...);
+        use bytes() where a bytes object is needed)
+    """
+    revision = revision or current_revision(form_id)
+    cached = _template_cache.get((form_id, revision))
+    if cached is not None:
+        return cached
+
+    entry = _manifest_entry(form_id, revision)
+    template_path = os.path.join(TEMPLATE_DIR, entry["file"])
+    try:
+        pdf_view = map_file(template_path)
+    except FileNotFoundError:
+        raise TemplateError(
+            f"Template {form_id} not found at {template_path} "
+            f"(run: python3 scripts/template_store.py refresh {form_id})"
+        )
+
+    digest = hashlib.sha256(pdf_view).hexdigest()
+    if digest != entry["sha256"]:
+        raise TemplateError(
+            f"Template {form_id} ({revision}) hash mismatch: expected {entry['sha256']}, got {digest}"
+        )
+
+    _template_cache[(form_id, revision)] = pdf_view
+    return pdf_view
+
+
+def open_template(form_id: str, revision: str = None):
+    """
+    Open a form template as a new document to fill.
+
+    The published templates are linearized with an update section, which
+    MuPDF resolves again on every open (~25-65 ms). The first call per
+    template opens it once and keeps a plain re-save of it (same objects and
+    object numbers); every later call opens that copy, in under a
+    millisecond. Fills save the whole document anyway, so their output does
+    not change.
+
+    Args:
+        form_id: Template id from the manifest ("disc001" or "disc002")
+        revision: Revision name (default: the current revision)
+
+    Returns:
+        A new fitz.Document the caller owns and closes
+    """
+    revision = revision or current_revision(form_id)
+    # The pin is part of the key, so a re-pinned revision is never served stale
+    key = (form_id, revision, template_sha256(form_id, revision))
+    resaved = _resaved_cache.get(key)
+    if resaved is None:
+        doc = fitz.open(stream=load_template(form_id, revision), filetype="pdf")
+        resaved = doc.tobytes()
+        doc.close()
+        _resaved_cache[key] = resaved
+    return fitz.open(stream=resaved, filetype="pdf")
+
+
+def clear_cache():
+    """Forget cached templates and the manifest (e.g. after a refresh)."""
+    global _manifest_cache, _manifest_stamp
+    _template_cache.clear()
+    _resaved_cache.clear()
+    _manifest_cache = None
+    _manifest_stamp = None
+
+
+def _write_file(path: str, data: bytes):
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _write_manifest(manifest: dict):
+    """Write the manifest atomically and drop the cached copy."""
+    text = json.dumps(manifest, indent=2) + "\n"
+    _write_file(os.path.join(TEMPLATE_DIR, MANIFEST_NAME), text.encode("utf-8"))
+    clear_cache()
+
+
+def refresh_templates(form_ids=None) -> dict:
+    """
+    Download the current templates from the court website and re-pin their hashes.
+
+    This is the only code path that touches the network.
+
+    Args:
+        form_ids: Form ids to refresh (default: every form in the manifest)
+
+    Returns:
+        Dictionary mapping form id to {"revision", "sha256", "changed"}
+    """
+    from urllib.request import urlopen
+
+    manifest = copy.deepcopy(load_manifest())
+    results = {}
+
+    for form_id in form_ids or list(manifest):
+        if form_id not in manifest:
+            raise TemplateError(f"Unknown form template: {form_id}")
+        revision = manifest[form_id]["current"]
+        entry = manifest[form_id]["revisions"][revision]
+        print(f"Downloading {form_id} ({revision}) from {entry['url']}...", file=sys.stderr)
+        with urlopen(entry["url"]) as response:
+            pdf_bytes = response.read()
+
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        _write_file(os.path.join(TEMPLATE_DIR, entry["file"]), pdf_bytes)
+
+        results[form_id] = {"revision": revision, "sha256": digest, "changed": digest != entry["sha256"]}
+        entry["sha256"] = digest
+        print(f"  {form_id}: {len(pdf_bytes)} bytes, sha256 {digest}", file=sys.stderr)
+
+    _write_manifest(manifest)
+    return results
+
+
+def add_revision(form_id: str, pdf_bytes: bytes, revision: str, url: str = None,
+                 current: bool = False) -> str:
+    """
+    Register a template revision: copy it to the template directory and pin it.
+
+    Running processes pick the revision up on their next manifest check.
+
+    Args:
+        form_id: Form id from the manifest
+        pdf_bytes: The revision's blank template PDF
+        revision: Revision name, e.g. the publication month "2019-01"
+        url: Where the revision was published (kept for reference)
+        current: Make it the revision fills use
+
+    Returns:
+        The SHA-256 of the revision
+    """
+    if not revision or not all(c.isalnum() or c in "-._" for c in revision):
+        raise TemplateError(f"Bad revision name {revision!r} (use letters, digits, '-', '.' and '_')")
+    manifest = copy.deepcopy(load_manifest())
+    if form_id not in manifest:
+        raise TemplateError(f"Unknown form template: {form_id}")
+
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    file_name = f"{form_id}-{revision}.pdf"
+    _write_file(os.path.join(TEMPLATE_DIR, file_name), pdf_bytes)
+
+    entry = manifest[form_id]
+    entry["revisions"][revision] = {"file": file_name, "sha256": digest, "url": url}
+    if current:
+        entry["current"] = revision
+    _write_manifest(manifest)
+    print(f"Added {form_id} revision {revision}: {len(pdf_bytes)} bytes, sha256 {digest}", file=sys.stderr)
+    return digest
+
+
+def verify_templates() -> dict:
+    """
+    Verify every template in the manifest.
+
+    Returns:
+        Dictionary mapping "form_id@revision" to an error message, or None
+        when valid
+    """
+    results = {}
+    for form_id in load_manifest():
+        for revision in template_revisions(form_id):
+            try:
+                load_template(form_id, revision)
+                results[f"{form_id}@{revision}"] = None
+            except TemplateError as e:
+                results[f"{form_id}@{revision}"] = str(e)
+    return results
+
+
+def main():
+    """Main entry point - verify or refresh the local templates."""
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+
+    if command == "verify":
+        results = verify_templates()
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if all(error is None for error in results.values()) else 1)
+    elif command == "refresh":
+        results = refresh_templates(sys.argv[2:] or None)
+        print(json.dumps(results, indent=2))
+        # Imported here: the compiler loads the fill/read mapping tables
+        from form_map import compile_and_check
+        drift_errors = sum(compile_and_check(form_id, result["revision"]) for form_id, result in results.items())
+        sys.exit(1 if drift_errors else 0)
+    elif command == "add" and len(sys.argv) >= 5:
+        form_id, pdf_path, revision = sys.argv[2:5]
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+        digest = add_revision(form_id, pdf_bytes, revision, current="--current" in sys.argv[5:])
+        print(json.dumps({form_id: {"revision": revision, "sha256": digest}}, indent=2))
+        from form_map import compile_and_check
+        sys.exit(1 if compile_and_check(form_id, revision) else 0)
+    else:
+        print("Usage: template_store.py [verify | refresh [form_id ...] | "
+              "add <form_id> <pdf_path> <revision> [--current]]", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
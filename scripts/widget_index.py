@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Precompiled Widget Index for DISC-001/DISC-002 Templates
+Maps each UI section (e.g. "6.1", "204.3") and each text field key directly
+to the (page number, widget xref) pairs it controls.
+
+The index is built from the template's compiled form map (form_map.py) once
+per template hash and is then reused by every fill, which only loads the
+pages it touches and only sets the widgets it needs. No template page is
+scanned: sections are bound through the interrogatory numbers in the
+checkbox tooltips, and the fill scripts' patterns are only consulted for
+checkboxes whose tooltip carries no number.
+
+Widget values are written in one of the FILL_MODES. "widgets" loads every
+widget and regenerates its appearance stream (widget.update()). "deferred"
+writes checkbox /V and /AS straight into the field objects: every template
+checkbox already carries its "on" appearance under /AP /N, so checking a box
+is two key writes and no new stream. Text appearances are still regenerated,
+in one pass. "viewer" also writes text values as plain /V and sets the
+AcroForm's /NeedAppearances so the viewer draws them; use it only where the
+consumer renders forms itself (browsers, Acrobat), not for flattening.
+"""
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except ImportError:
+    import fitz  # PyMuPDF
+import os
+
+from form_map import field_xref, get_form_map
+from interrogatory_catalog import CATALOGS
+from template_store import template_sha256
+
+# How widget values are written (see the module docstring)
+FILL_MODES = ("widgets", "deferred", "viewer")
+
+DEFAULT_FILL_MODE = os.environ.get("FORM_FILL_MODE") or "widgets"
+
+# (form_id, template sha256) -> index
+_index_cache = {}
+
+
+def resolve_fill_mode(mode: str = None) -> str:
+    """Return a valid fill mode, falling back to the configured default."""
+    mode = mode or DEFAULT_FILL_MODE
+    if mode not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode {mode!r} (choose from {', '.join(FILL_MODES)})")
+    return mode
+
+
+def fill_mode_from_flags(flags: set) -> str:
+    """Return the fill mode named by a --fill-mode=<name> flag, or the default."""
+    for flag in flags:
+        if flag.startswith("--fill-mode="):
+            return resolve_fill_mode(flag.split("=", 1)[1])
+    return resolve_fill_mode()
+
+
+def build_widget_index(form_map, checkbox_patterns: dict, text_patterns: dict = None) -> dict:
+    """
+    Build the section -> widget index from a compiled form map.
+
+    A section is bound to the checkboxes whose tooltip carries its
+    interrogatory number. Without one, matching follows the fill scripts:
+    a checkbox pattern matches every checkbox whose field name contains it.
+    Each text widget is assigned to the first text pattern it contains.
+
+    Args:
+        form_map: Compiled map of the template (form_map.FormMap)
+        checkbox_patterns: UI section -> checkbox field name pattern
+        text_patterns: Text field key -> text field name pattern
+
+    Returns:
+        Dictionary with:
+        - checkboxes: UI section -> list of (page, xref, field_name)
+        - text: text field key -> list of (page, xref, field_name)
+        - on_states: checkbox widget xref -> (on state name, field xref)
+    """
+    catalog = CATALOGS[form_map.form_id]
+    checkboxes = {}
+    for section, pattern in checkbox_patterns.items():
+        bound = form_map.by_number.get(catalog.canonical(section))
+        if not bound:
+            bound = [(page_idx, xref, path)
+                     for path, xref, page_idx, _rect, _type, _number in form_map.of_type(fitz.PDF_WIDGET_TYPE_CHECKBOX)
+                     if pattern in path]
+        checkboxes[section] = list(bound)
+
+    text = {key: [] for key in (text_patterns or {})}
+    if text_patterns:
+        for path, xref, page_idx, _rect, _type, _number in form_map.of_type(fitz.PDF_WIDGET_TYPE_TEXT):
+            for key, pattern in text_patterns.items():
+                if pattern in path:
+                    text[key].append((page_idx, xref, path))
+                    break
+
+    return {"checkboxes": checkboxes, "text": text, "on_states": form_map.on_states}
+
+
+def get_widget_index(form_id: str, checkbox_patterns: dict, text_patterns: dict = None,
+                     revision: str = None) -> dict:
+    """
+    Return the widget index for a template, building it on first use.
+
+    Args:
+        form_id: Template id ("disc001" or "disc002")
+        checkbox_patterns: UI section -> checkbox field name pattern
+        text_patterns: Text field key -> text field name pattern
+        revision: Template revision (default: the current revision)
+
+    Returns:
+        Same as build_widget_index()
+    """
+    key = (form_id, template_sha256(form_id, revision))
+    index = _index_cache.get(key)
+    if index is None:
+        index = build_widget_index(get_form_map(form_id, revision), checkbox_patterns, text_patterns)
+        _index_cache[key] = index
+    return index
+
+
+def set_widget_values(doc, assignments: list, mode: str = "widgets", index: dict = None, metrics=None) -> int:
+    """
+    Set widget values, loading only the pages that are touched.
+
+    Args:
+        doc: Document to modify
+        assignments: List of (page, xref, value); True/False for checkboxes,
+            strings for text fields
+        mode: Fill mode from FILL_MODES
+        index: Widget index of the template (required for checkboxes unless
+            mode is "widgets")
+        metrics: Optional PhaseTimer ("object_writes" counter for direct writes)
+
+    Returns:
+        Number of widgets updated
+    """
+    by_page = {}
+    for page_idx, xref, value in assignments:
+        # A widget is only set once, even if several sections map to it
+        by_page.setdefault(page_idx, {}).setdefault(xref, value)
+
+    updated = 0
+    writes = 0
+    need_appearances = False
+    for page_idx in sorted(by_page):
+        page = None
+        for xref, value in by_page[page_idx].items():
+            if mode != "widgets" and isinstance(value, bool):
+                # Point /V and /AS at the on (or Off) appearance the template already has
+                on_state, value_xref = index["on_states"][xref]
+                state = "/" + (on_state if value else "Off")
+                doc.xref_set_key(value_xref, "V", state)
+                doc.xref_set_key(xref, "AS", state)
+                writes += 2
+            elif mode == "viewer":
+                doc.xref_set_key(field_xref(doc, xref), "V", fitz.get_pdf_str(str(value)))
+                writes += 1
+                need_appearances = True
+            else:
+                if page is None:
+                    page = doc[page_idx]
+                widget = page.load_widget(xref)
+                widget.field_value = value
+                widget.update()
+            updated += 1
+
+    if need_appearances:
+        doc.need_appearances(True)
+        writes += 1
+    if metrics is not None and writes:
+        metrics.count("object_writes", writes)
+    return updated